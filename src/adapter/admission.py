@@ -0,0 +1,151 @@
+"""
+Admission Control Module
+
+This module decides whether new chat messages and tasks are accepted when the host
+is busy, so load spikes are shed with a friendly reply instead of exhausting memory
+and processes.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from src.config import (
+    ADMISSION_MAX_CHAT_WAITING,
+    ADMISSION_MAX_QUEUE_LENGTH,
+    ADMISSION_MAX_SUBPROCESSES,
+    ADMISSION_MIN_FREE_MEMORY_MB,
+)
+
+
+def available_memory_mb() -> Optional[float]:
+    """Read the memory available to new processes.
+
+    Returns:
+        The available memory in MiB, or None if it cannot be determined.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed because the system is saturated."""
+
+
+class AdmissionController:
+    """Global limits on subprocesses, queue length and memory headroom."""
+
+    def __init__(
+        self,
+        max_subprocesses: int = ADMISSION_MAX_SUBPROCESSES,
+        max_queue_length: int = ADMISSION_MAX_QUEUE_LENGTH,
+        max_chat_waiting: int = ADMISSION_MAX_CHAT_WAITING,
+        min_free_memory_mb: float = ADMISSION_MIN_FREE_MEMORY_MB,
+        memory_probe: Callable[[], Optional[float]] = available_memory_mb,
+    ) -> None:
+        """Initialize the admission controller.
+
+        Args:
+            max_subprocesses: OpenHands processes allowed to run at once.
+            max_queue_length: Pending tasks allowed before new tasks are rejected.
+            max_chat_waiting: Chat messages allowed to wait for a free chat slot.
+            min_free_memory_mb: Memory headroom required to accept new work.
+                Zero disables the check.
+            memory_probe: Function returning the available memory in MiB.
+        """
+        self.max_subprocesses = max_subprocesses
+        self.max_queue_length = max_queue_length
+        self.max_chat_waiting = max_chat_waiting
+        self.min_free_memory_mb = min_free_memory_mb
+        self.memory_probe = memory_probe
+        self._slots = asyncio.Semaphore(max_subprocesses)
+        self.active_subprocesses = 0
+        self.chat_waiting = 0
+        self.rejections: Dict[str, int] = {"queue": 0, "memory": 0, "chat": 0}
+
+    def _check_memory(self) -> None:
+        """Reject new work when memory headroom is too low."""
+        if self.min_free_memory_mb <= 0:
+            return
+        available = self.memory_probe()
+        if available is not None and available < self.min_free_memory_mb:
+            self.rejections["memory"] += 1
+            raise AdmissionRejected(
+                "The server is running low on memory right now. "
+                "Please try again in a few minutes."
+            )
+
+    def admit_task(self, queue_length: int, count: int = 1) -> None:
+        """Check whether new tasks can be queued.
+
+        Args:
+            queue_length: The number of tasks currently waiting.
+            count: The number of tasks submitted together. They are admitted or
+                rejected as a whole.
+
+        Raises:
+            AdmissionRejected: If the tasks must be rejected.
+        """
+        if queue_length + count > self.max_queue_length:
+            self.rejections["queue"] += 1
+            raise AdmissionRejected(
+                f"The task queue is full ({queue_length} tasks waiting). "
+                "Please try again in a few minutes."
+            )
+        self._check_memory()
+
+    def admit_chat(self, session_busy: bool = False) -> None:
+        """Check whether a chat message can be answered now.
+
+        Args:
+            session_busy: Whether the session of the message is still answering an
+                earlier one. Messages are not queued behind it, so one user cannot
+                pile up turns that the waiting count never sees.
+
+        Raises:
+            AdmissionRejected: If the message must be rejected.
+        """
+        if session_busy:
+            self.rejections["chat"] += 1
+            raise AdmissionRejected(
+                "Still answering your last message. "
+                "Please wait for the reply before sending another."
+            )
+        # Chat waits for a slot of its own route before a global one, so the
+        # waiting messages are bounded however many global slots are free
+        if self.chat_waiting >= self.max_chat_waiting:
+            self.rejections["chat"] += 1
+            raise AdmissionRejected(
+                "OpenHands is busy answering other requests. "
+                "Please try again in a moment."
+            )
+        self._check_memory()
+
+    @asynccontextmanager
+    async def subprocess_slot(self) -> AsyncIterator[None]:
+        """Hold one of the global subprocess slots while an OpenHands process runs."""
+        async with self._slots:
+            self.active_subprocesses += 1
+            try:
+                yield
+            finally:
+                self.active_subprocesses -= 1
+
+    def stats(self) -> dict:
+        """Get the current admission state.
+
+        Returns:
+            Active subprocesses, waiting chat messages and rejection counters.
+        """
+        return {
+            "active_subprocesses": self.active_subprocesses,
+            "max_subprocesses": self.max_subprocesses,
+            "chat_waiting": self.chat_waiting,
+            "rejections": dict(self.rejections),
+        }
@@ -0,0 +1,163 @@
+"""
+Workspace Affinity Module
+
+This module routes the runs of a workspace to the worker that last served it, so
+caches that live with the worker, such as installed dependencies, the page cache of
+a node or the imports of a worker process, are reused instead of rebuilt.
+
+A run whose worker is busy waits a bounded time for it before falling back to any
+free worker.
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, Optional
+
+from src.config import AFFINITY_WAIT_SECONDS
+
+# Workspaces whose last worker is remembered
+AFFINITY_MAX_KEYS = 10000
+
+
+class AffinityScheduler:
+    """Lease workers with a fixed number of slots, preferring the last one used."""
+
+    def __init__(
+        self,
+        capacity: Dict[Hashable, int],
+        wait_seconds: float = AFFINITY_WAIT_SECONDS,
+        max_keys: int = AFFINITY_MAX_KEYS,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            capacity: Runs each worker may serve at once.
+            wait_seconds: Longest wait for the preferred worker before another
+                free worker is used. Zero only uses it if it is free right away.
+            max_keys: Workspaces whose last worker is remembered.
+
+        Raises:
+            ValueError: If there are no workers, as every lease would wait forever.
+        """
+        if not capacity:
+            raise ValueError("The scheduler needs at least one worker")
+        self.free = {worker: max(slots, 1) for worker, slots in capacity.items()}
+        self.wait_seconds = wait_seconds
+        self.max_keys = max_keys
+        self.last_worker: "OrderedDict[str, Hashable]" = OrderedDict()
+        # Preferred worker -> runs waiting for it
+        self.waiting: Dict[Hashable, int] = {}
+        # Worker -> number of the lease it last served, to spread new workspaces
+        self.last_lease: Dict[Hashable, int] = {worker: 0 for worker in self.free}
+        self.leases = 0
+        self.hits = 0
+        self.misses = 0
+        self.cold = 0
+        self._changed = asyncio.Condition()
+
+    def _pick_free(self, preferred: Optional[Hashable]) -> Optional[Hashable]:
+        """Get a free worker, or None if every worker is busy."""
+        candidates = [worker for worker, free in self.free.items() if free > 0]
+        if not candidates:
+            return None
+        if preferred in candidates:
+            return preferred
+        # Otherwise the least loaded, least recently used worker nobody waits for
+        return max(
+            candidates,
+            key=lambda worker: (
+                not self.waiting.get(worker),
+                self.free[worker],
+                -self.last_lease[worker],
+            ),
+        )
+
+    async def _wait_for_preferred(self, preferred: Hashable) -> bool:
+        """Wait until the preferred worker is free. Must hold the lock."""
+        if self.free[preferred] > 0:
+            return True
+        if self.wait_seconds <= 0:
+            return False
+        self.waiting[preferred] = self.waiting.get(preferred, 0) + 1
+        try:
+            await asyncio.wait_for(
+                self._changed.wait_for(lambda: self.free[preferred] > 0),
+                self.wait_seconds,
+            )
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting[preferred] -= 1
+
+    async def acquire(self, key: str) -> Hashable:
+        """Lease a worker for a run.
+
+        Args:
+            key: The workspace of the run.
+
+        Returns:
+            The worker, which must be given back with ``release``.
+        """
+        async with self._changed:
+            preferred = self.last_worker.get(key)
+            if preferred not in self.free:
+                preferred = None
+            worker: Optional[Hashable] = None
+            if preferred is not None and await self._wait_for_preferred(preferred):
+                worker = preferred
+            while worker is None:
+                worker = self._pick_free(preferred)
+                if worker is None:
+                    await self._changed.wait()
+
+            if preferred is None:
+                self.cold += 1
+            elif worker == preferred:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.free[worker] -= 1
+            self.leases += 1
+            self.last_lease[worker] = self.leases
+            self.last_worker[key] = worker
+            self.last_worker.move_to_end(key)
+            while len(self.last_worker) > self.max_keys:
+                self.last_worker.popitem(last=False)
+            return worker
+
+    async def release(self, worker: Hashable) -> None:
+        """Give back a worker leased with ``acquire``.
+
+        Args:
+            worker: The worker.
+        """
+        async with self._changed:
+            self.free[worker] += 1
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def lease(self, key: str) -> AsyncIterator[Hashable]:
+        """Lease a worker for the duration of a run."""
+        worker = await self.acquire(key)
+        try:
+            yield worker
+        finally:
+            await self.release(worker)
+
+    def stats(self) -> dict:
+        """Get the scheduling metrics.
+
+        Returns:
+            Runs served by their preferred worker, runs that fell back to another
+            worker, runs of workspaces seen for the first time, and the hit rate.
+        """
+        routed = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cold": self.cold,
+            "hit_rate": round(self.hits / routed, 3) if routed else 0.0,
+            "free_slots": sum(self.free.values()),
+        }
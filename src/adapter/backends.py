@@ -0,0 +1,725 @@
+"""
+Execution Backend Module
+
+This module runs OpenHands for a prompt and streams its output back to the adapter.
+
+Backends differ only in where the CLI module runs:
+
+- ``subprocess`` starts a new ``python -m`` process for every run
+- ``thread`` calls the module in this process, one run at a time; it changes the
+  process-wide environment and standard streams, so it must be opted into
+- ``process`` calls the module in a pool of worker processes that stay warm
+- ``remote`` sends the run to a worker started with ``python -m src.adapter.worker``
+
+Parsing, spooling, tracing and admission stay in the adapter, so every backend is
+interchangeable and can be compared on the same workload.
+"""
+
+import asyncio
+import base64
+import importlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+
+import aiohttp
+
+from src.adapter.affinity import AffinityScheduler
+from src.adapter.resources import ResourceLimits, ResourceSampler
+from src.config import (
+    AFFINITY_WAIT_SECONDS,
+    OPENHANDS_BACKEND,
+    OPENHANDS_BACKEND_WORKERS,
+    OPENHANDS_CLI_PATH,
+    OPENHANDS_REMOTE_TOKEN,
+    OPENHANDS_REMOTE_URL,
+    OPENHANDS_THREAD_BACKEND_ENABLED,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Bytes read from a worker pipe at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+# Seconds a remote worker gets beyond the run timeout to report a timeout itself
+REMOTE_TIMEOUT_GRACE_SECONDS = 10
+
+# Receives a chunk of the output of a run
+OutputSink = Callable[[bytes], None]
+# Exit status, standard output, standard error and resource usage of a module call
+ModuleResult = Tuple[int, bytes, bytes, Dict[str, float]]
+
+
+@dataclass
+class ExecutionRequest:
+    """A prompt to run with OpenHands."""
+
+    prompt: str
+    workspace: str
+    # Variables set for the run on top of the environment of the backend
+    env: Dict[str, str] = field(default_factory=dict)
+    timeout: float = 0
+
+    def cli_args(self) -> List[str]:
+        """Get the command line arguments of the CLI module.
+
+        Returns:
+            The arguments, without the interpreter and module.
+        """
+        return ["--workspace", self.workspace, "--task", self.prompt]
+
+
+@dataclass
+class ExecutionOutcome:
+    """How a run ended. The output was already passed to the sinks."""
+
+    returncode: Optional[int]
+    timed_out: bool = False
+    # Wall time, CPU time and peak resident memory of the run
+    resources: Dict[str, float] = field(default_factory=dict)
+
+
+class ExecutionBackend(ABC):
+    """Runs the OpenHands CLI module for a request."""
+
+    name = ""
+
+    async def start(self) -> None:
+        """Warm the backend up. Backends also start lazily on their first run."""
+
+    async def stop(self) -> None:
+        """Release the resources of the backend."""
+
+    @abstractmethod
+    async def run(
+        self,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Run a request to completion.
+
+        The run is stopped when it exceeds ``request.timeout`` or the calling task
+        is cancelled.
+
+        Args:
+            request: The request.
+            on_stdout: Receives the standard output as it is produced.
+            on_stderr: Receives the standard error as it is produced.
+
+        Returns:
+            How the run ended.
+        """
+
+    def stats(self) -> dict:
+        """Get the backend metrics.
+
+        Returns:
+            The backend name and backend-specific counters.
+        """
+        return {"backend": self.name}
+
+
+async def pump(stream: asyncio.StreamReader, sink: OutputSink) -> None:
+    """Pass everything read from a stream to a sink until the stream closes."""
+    while True:
+        chunk = await stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        sink(chunk)
+
+
+class SubprocessBackend(ExecutionBackend):
+    """Start a new CLI process for every run, under the configured limits."""
+
+    name = "subprocess"
+
+    def __init__(
+        self,
+        cli_path: Optional[str] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+    ) -> None:
+        """Initialize the backend.
+
+        Args:
+            cli_path: The CLI module. Defaults to ``OPENHANDS_CLI_PATH``.
+            resource_limits: Limits applied to every process. Defaults to the
+                configured limits.
+        """
+        self.cli_path = cli_path or OPENHANDS_CLI_PATH
+        self.resource_limits = resource_limits or ResourceLimits.from_config()
+        self.spawned = 0
+
+    async def run(
+        self,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Spawn the process and stream its output until it exits."""
+        process = await asyncio.create_subprocess_exec(
+            "python",
+            "-m",
+            self.cli_path,
+            *request.cli_args(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, **request.env},
+        )
+        self.spawned += 1
+        try:
+            self.resource_limits.apply(process.pid)
+        except OSError as e:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"Could not apply resource limits: {e}") from e
+        sampler = ResourceSampler(process.pid)
+        sampler.start()
+        stdout, stderr = process.stdout, process.stderr
+        if stdout is None or stderr is None:
+            raise RuntimeError("OpenHands process has no output pipes")
+
+        async def finish() -> None:
+            await asyncio.gather(pump(stdout, on_stdout), pump(stderr, on_stderr))
+            # The output closes as the process exits, before it is reaped
+            sampler.finish()
+            await process.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(finish(), timeout=request.timeout)
+        except asyncio.TimeoutError:
+            # Kill process if it times out
+            timed_out = True
+            process.kill()
+            await process.wait()
+        except asyncio.CancelledError:
+            # Never leave the process running unmanaged when the run is stopped
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        finally:
+            resources = await sampler.stop()
+
+        return ExecutionOutcome(process.returncode, timed_out, resources)
+
+    def stats(self) -> dict:
+        """Get the number of processes spawned."""
+        return {"backend": self.name, "spawned": self.spawned}
+
+
+def run_module(
+    module: str, args: List[str], env: Dict[str, str], per_thread: bool
+) -> ModuleResult:
+    """Call the ``main`` function of a CLI module as if it was run with ``python -m``.
+
+    The arguments, environment and standard streams are process-wide, so only one
+    call may run per process at a time.
+
+    Args:
+        module: The CLI module.
+        args: The command line arguments.
+        env: Variables set for the duration of the call.
+        per_thread: Whether to measure the CPU time of the calling thread only,
+            because the process is shared with other work.
+
+    Returns:
+        The exit status, standard output, standard error and resource usage.
+    """
+    clock = time.thread_time if per_thread else time.process_time
+    saved_argv = sys.argv
+    # Only the variables of the run are restored, so changes made elsewhere in the
+    # meantime are kept
+    saved_env = {name: os.environ.get(name) for name in env}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    started, cpu_started = time.monotonic(), clock()
+    sys.argv = [module, *args]
+    os.environ.update(env)
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                status: Any = importlib.import_module(module).main()
+            except SystemExit as e:
+                status = e.code
+            except Exception:
+                traceback.print_exc()
+                status = 1
+    finally:
+        sys.argv = saved_argv
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    # Same conventions as the exit status of the interpreter
+    if status is None:
+        returncode = 0
+    elif isinstance(status, int):
+        returncode = status
+    else:
+        stderr.write(f"{status}\n")
+        returncode = 1
+    resources = {
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "cpu_seconds": round(clock() - cpu_started, 3),
+        "max_rss_mb": 0.0,
+    }
+    if resource is not None and not per_thread:
+        resources["max_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        )
+    return (
+        returncode,
+        stdout.getvalue().encode("utf-8"),
+        stderr.getvalue().encode("utf-8"),
+        resources,
+    )
+
+
+def _serve_runs(connection: Connection, module: str) -> None:
+    """Answer run requests in a worker process until told to stop."""
+    try:
+        # Importing up front is what keeps the worker warm
+        importlib.import_module(module)
+    except Exception:
+        traceback.print_exc()
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        args, env = job
+        connection.send(run_module(module, args, env, per_thread=False))
+
+
+class _Worker:
+    """A worker process and the pipe it receives runs on."""
+
+    def __init__(self, process: BaseProcess, connection: Connection) -> None:
+        self.process = process
+        self.connection = connection
+
+    def kill(self) -> None:
+        """Stop the worker at once."""
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class InProcessBackend(ExecutionBackend):
+    """Call the CLI module directly instead of starting an interpreter per run.
+
+    The ``thread`` mode runs in the bot process on a single thread: there is no
+    start-up cost, but runs are serialized, and the environment, arguments and
+    standard streams of the whole bot are changed while one is in progress. A run
+    past its timeout cannot be stopped, so it fails the backend for good. The
+    ``process`` mode keeps up to
+    ``max_workers`` worker processes with the module imported; a run past its
+    timeout kills its worker, which is replaced on the next run. Runs of a
+    workspace prefer the worker process that served it last.
+    """
+
+    def __init__(
+        self,
+        mode: str = "process",
+        cli_path: Optional[str] = None,
+        max_workers: int = OPENHANDS_BACKEND_WORKERS,
+        affinity_wait_seconds: float = AFFINITY_WAIT_SECONDS,
+    ) -> None:
+        """Initialize the backend.
+
+        Args:
+            mode: ``thread`` or ``process``.
+            cli_path: The CLI module. Defaults to ``OPENHANDS_CLI_PATH``.
+            max_workers: Worker processes of the ``process`` mode; the ``thread``
+                mode only takes one.
+            affinity_wait_seconds: Longest wait of a run for the worker process
+                that last served its workspace.
+
+        Raises:
+            ValueError: If the mode is unknown, or the ``thread`` mode is given
+                more than one worker.
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown in-process mode: {mode}")
+        if mode == "thread" and max_workers != 1:
+            raise ValueError(
+                "The thread backend runs one run at a time in the bot process; "
+                "use the process backend for more workers"
+            )
+        self.name = mode
+        self.cli_path = cli_path or OPENHANDS_CLI_PATH
+        self.max_workers = max(max_workers, 1)
+        self.started_workers = 0
+        self.killed_workers = 0
+        # Set once a run of the thread mode outlives its timeout
+        self.stuck = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Worker slot -> its process, started on first use
+        self._workers: List[Optional[_Worker]] = [None] * self.max_workers
+        self.scheduler = AffinityScheduler(
+            {slot: 1 for slot in range(self.max_workers)}, affinity_wait_seconds
+        )
+        self._context = multiprocessing.get_context("spawn")
+
+    async def start(self) -> None:
+        """Import the module, or start the worker processes, ahead of the first run."""
+        if self.name == "thread":
+            await asyncio.to_thread(importlib.import_module, self.cli_path)
+            return
+        for slot in range(self.max_workers):
+            await self._ensure_worker(slot)
+
+    async def stop(self) -> None:
+        """Stop the thread or the idle worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        for slot, worker in enumerate(self._workers):
+            if worker is None or self.scheduler.free[slot] == 0:
+                continue
+            self._workers[slot] = None
+            worker.connection.send(None)
+            await asyncio.to_thread(worker.process.join)
+            worker.connection.close()
+
+    def _start_worker(self) -> _Worker:
+        """Start a worker process."""
+        connection, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve_runs,
+            args=(child, self.cli_path),
+            name="openhands-worker",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        self.started_workers += 1
+        return _Worker(process, connection)
+
+    async def _ensure_worker(self, slot: int) -> _Worker:
+        """Get the process of a worker slot, starting it if needed."""
+        worker = self._workers[slot]
+        if worker is not None:
+            return worker
+        started = await asyncio.to_thread(self._start_worker)
+        worker = self._workers[slot]
+        if worker is not None:
+            # Started by someone else in the meantime
+            started.kill()
+            return worker
+        self._workers[slot] = started
+        return started
+
+    async def run(
+        self,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Run the module and pass its output on once it returns."""
+        result: Optional[ModuleResult]
+        if self.name == "thread":
+            result = await self._run_on_thread(request)
+        else:
+            result = await self._run_on_worker(request)
+        if result is None:
+            return ExecutionOutcome(None, timed_out=True)
+
+        returncode, stdout, stderr, resources = result
+        if stdout:
+            on_stdout(stdout)
+        if stderr:
+            on_stderr(stderr)
+        return ExecutionOutcome(returncode, resources=resources)
+
+    async def _run_on_thread(self, request: ExecutionRequest) -> ModuleResult:
+        """Run the module on the backend thread.
+
+        Raises:
+            RuntimeError: If the run times out, or an earlier one did and still
+                holds the thread.
+        """
+        if self.stuck:
+            raise RuntimeError(
+                "The thread backend is still busy with a timed-out run; "
+                "restart the bot"
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="openhands")
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            run_module,
+            self.cli_path,
+            request.cli_args(),
+            request.env,
+            True,
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=request.timeout)
+        except asyncio.TimeoutError:
+            # The thread cannot be stopped, and its changes to the environment and
+            # standard streams stay in place until the run returns
+            self.stuck = True
+            logger.error("In-process run timed out and keeps its thread busy")
+            raise RuntimeError(
+                f"Run timed out after {request.timeout:.0f} seconds and cannot be "
+                "stopped; the thread backend takes no more runs until a restart"
+            )
+
+    async def _run_on_worker(self, request: ExecutionRequest) -> Optional[ModuleResult]:
+        """Run the module on a worker process. Returns None on timeout."""
+        async with self.scheduler.lease(request.workspace) as slot:
+            worker = await self._ensure_worker(cast(int, slot))
+            try:
+                worker.connection.send((request.cli_args(), request.env))
+                result: ModuleResult = await asyncio.wait_for(
+                    asyncio.to_thread(worker.connection.recv), timeout=request.timeout
+                )
+            except asyncio.TimeoutError:
+                self._kill(cast(int, slot))
+                return None
+            except BaseException:
+                # Cancelled, or the worker died: it can't be trusted with another run
+                self._kill(cast(int, slot))
+                raise
+            return result
+
+    def _kill(self, slot: int) -> None:
+        """Kill the worker of a slot that must not run anything else."""
+        worker, self._workers[slot] = self._workers[slot], None
+        if worker is not None:
+            worker.kill()
+            self.killed_workers += 1
+
+    def stats(self) -> dict:
+        """Get the number of idle, started and killed workers, and their affinity."""
+        if self.name == "thread":
+            return {"backend": self.name, "stuck": self.stuck}
+        return {
+            "backend": self.name,
+            "idle_workers": sum(
+                1
+                for slot, worker in enumerate(self._workers)
+                if worker is not None and self.scheduler.free[slot] > 0
+            ),
+            "started_workers": self.started_workers,
+            "killed_workers": self.killed_workers,
+            "affinity": self.scheduler.stats(),
+        }
+
+
+def encode_frame(frame: dict) -> bytes:
+    """Encode a frame of the remote worker protocol as a JSON line."""
+    return json.dumps(frame, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def output_frame(stream: str, chunk: bytes) -> bytes:
+    """Encode a chunk of output of a run."""
+    return encode_frame(
+        {"stream": stream, "data": base64.b64encode(chunk).decode("ascii")}
+    )
+
+
+def outcome_frame(outcome: ExecutionOutcome) -> bytes:
+    """Encode how a run ended, the last frame of a response."""
+    return encode_frame(
+        {
+            "returncode": outcome.returncode,
+            "timed_out": outcome.timed_out,
+            "resources": outcome.resources,
+        }
+    )
+
+
+class RemoteBackend(ExecutionBackend):
+    """Send runs to remote workers over HTTP.
+
+    A worker answers ``POST /run`` with JSON-lines frames: output chunks as they
+    are produced, then the outcome. Workspaces are passed as paths, so workers
+    must see them at the same location, e.g. on a shared volume. Runs of a
+    workspace prefer the worker that served it last.
+    """
+
+    name = "remote"
+
+    def __init__(
+        self,
+        urls: str = OPENHANDS_REMOTE_URL,
+        token: Optional[str] = OPENHANDS_REMOTE_TOKEN,
+        runs_per_worker: int = OPENHANDS_BACKEND_WORKERS,
+        affinity_wait_seconds: float = AFFINITY_WAIT_SECONDS,
+    ) -> None:
+        """Initialize the backend.
+
+        Args:
+            urls: The base URLs of the workers, separated by commas.
+            token: Shared secret sent as a bearer token, if the workers need one.
+            runs_per_worker: Runs sent to a worker at once.
+            affinity_wait_seconds: Longest wait of a run for the worker that last
+                served its workspace.
+
+        Raises:
+            ValueError: If no worker URL is given.
+        """
+        self.urls = [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+        if not self.urls:
+            raise ValueError("The remote backend needs at least one worker URL")
+        self.scheduler = AffinityScheduler(
+            {url: runs_per_worker for url in self.urls}, affinity_wait_seconds
+        )
+        self.token = token
+        self.requests = 0
+        self.failures = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def stop(self) -> None:
+        """Close the connections to the worker."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def run(
+        self,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Post the run and stream the output frames of the answer.
+
+        Raises:
+            RuntimeError: If the worker rejects the run or ends the answer early.
+        """
+        async with self.scheduler.lease(request.workspace) as url:
+            return await self._post(cast(str, url), request, on_stdout, on_stderr)
+
+    async def _post(
+        self,
+        url: str,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Post a run to a worker and stream the output frames of the answer."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        sinks = {"stdout": on_stdout, "stderr": on_stderr}
+        self.requests += 1
+        started = time.monotonic()
+        try:
+            async with self._session.post(
+                f"{url}/run",
+                json={
+                    "prompt": request.prompt,
+                    "workspace": request.workspace,
+                    "env": request.env,
+                    "timeout": request.timeout,
+                },
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(
+                    total=request.timeout + REMOTE_TIMEOUT_GRACE_SECONDS
+                ),
+            ) as response:
+                if response.status != 200:
+                    raise RuntimeError(
+                        f"Remote worker {url} answered {response.status}: "
+                        f"{await response.text()}"
+                    )
+                async for line in response.content:
+                    frame = json.loads(line)
+                    if "stream" in frame:
+                        sinks[frame["stream"]](base64.b64decode(frame["data"]))
+                        continue
+                    return ExecutionOutcome(
+                        frame["returncode"], frame["timed_out"], frame["resources"]
+                    )
+        except asyncio.TimeoutError:
+            self.failures += 1
+            return ExecutionOutcome(
+                None,
+                timed_out=True,
+                resources={"wall_seconds": round(time.monotonic() - started, 3)},
+            )
+        except aiohttp.ClientError as e:
+            self.failures += 1
+            raise RuntimeError(f"Remote worker {url} unavailable: {e}") from e
+        self.failures += 1
+        raise RuntimeError(f"Remote worker {url} ended the run without an outcome")
+
+    def stats(self) -> dict:
+        """Get the number of requests sent and failed, and the worker affinity."""
+        return {
+            "backend": self.name,
+            "requests": self.requests,
+            "failures": self.failures,
+            "affinity": self.scheduler.stats(),
+        }
+
+
+def create_backend(
+    name: str = OPENHANDS_BACKEND,
+    resource_limits: Optional[ResourceLimits] = None,
+    thread_enabled: bool = OPENHANDS_THREAD_BACKEND_ENABLED,
+) -> ExecutionBackend:
+    """Create the execution backend with the given name.
+
+    Args:
+        name: ``subprocess``, ``thread``, ``process`` or ``remote``.
+        resource_limits: Limits of the ``subprocess`` backend. The other backends
+            warn that they do not apply them; remote workers apply their own.
+        thread_enabled: Whether the ``thread`` backend was opted into.
+
+    Returns:
+        The backend.
+
+    Raises:
+        ValueError: If the backend is unknown, or is ``thread`` without the opt-in.
+    """
+    if name == "subprocess":
+        return SubprocessBackend(resource_limits=resource_limits)
+    if name not in ("thread", "process", "remote"):
+        raise ValueError(f"Unknown execution backend: {name}")
+    if name == "thread" and not thread_enabled:
+        raise ValueError(
+            "The thread backend changes the environment of the bot process while "
+            "it runs; set OPENHANDS_THREAD_BACKEND_ENABLED=true to use it, or use "
+            "the process backend"
+        )
+    if resource_limits is not None and resource_limits.is_set():
+        if name == "remote":
+            logger.warning(
+                "Resource limits are not applied by the remote backend; "
+                "configure them on the workers instead"
+            )
+        else:
+            logger.warning(
+                f"Resource limits are ignored by the {name} backend, which does "
+                "not start a process per run; use the subprocess backend to "
+                "enforce them"
+            )
+    if name == "remote":
+        return RemoteBackend()
+    if name == "thread":
+        return InProcessBackend(name, max_workers=1)
+    return InProcessBackend(name)
@@ -0,0 +1,256 @@
+"""
+Events Module
+
+This module parses the output of OpenHands runs into structured events.
+
+Workers are asked to write one JSON object per line, for example::
+
+    {"type": "message", "content": "Created fib.py"}
+    {"type": "action", "action": "run", "command": "python fib.py"}
+    {"type": "file", "path": "fib.py", "change": "created"}
+    {"type": "error", "message": "Command failed"}
+    {"type": "usage", "prompt_tokens": 1200, "completion_tokens": 340}
+
+Lines prefixed with ``🤖`` from the plain text CLI output are still understood as
+messages, and any other line is kept only in a short log tail.
+"""
+
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from src.config import EVENT_LOG_MAX_ITEMS, EVENT_LOG_TAIL_LINES
+
+# Event kinds
+MESSAGE = "message"
+ACTION = "action"
+FILE = "file"
+ERROR = "error"
+USAGE = "usage"
+
+EVENT_KINDS = (MESSAGE, ACTION, FILE, ERROR, USAGE)
+
+# Longest line kept before it is cut off
+MAX_LINE_BYTES = 1024 * 1024
+
+# Keys that may carry the human readable text of an event, in order of preference
+_TEXT_KEYS = ("content", "message", "text", "command", "path", "thought")
+# Keys of usage events counting LLM tokens, as named by different providers: the
+# total if given, otherwise the first pair of input and output names that is present.
+# Providers may send several names for the same count, so they are never added up
+_TOTAL_TOKEN_KEY = "total_tokens"
+_TOKEN_KEY_PAIRS = (
+    ("prompt_tokens", "completion_tokens"),
+    ("input_tokens", "output_tokens"),
+)
+
+
+def _token_count(value: Any) -> Optional[int]:
+    """Read a token count, or None if it is missing or not a number."""
+    if value is None:
+        return None
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _count_tokens(data: Dict[str, Any]) -> int:
+    """Get the LLM tokens of a usage event.
+
+    Args:
+        data: The fields of the usage event.
+
+    Returns:
+        The total tokens, zero if the event has no usable count.
+    """
+    total = _token_count(data.get(_TOTAL_TOKEN_KEY))
+    if total is not None:
+        return total
+    for pair in _TOKEN_KEY_PAIRS:
+        counts = [_token_count(data.get(key)) for key in pair]
+        if any(count is not None for count in counts):
+            return sum(count or 0 for count in counts)
+    return 0
+
+
+@dataclass(frozen=True)
+class OpenHandsEvent:
+    """A single structured event emitted by an OpenHands run."""
+
+    kind: str
+    text: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+def parse_event_line(line: str) -> Optional[OpenHandsEvent]:
+    """Parse one line of worker output.
+
+    Args:
+        line: The decoded line without its trailing newline.
+
+    Returns:
+        The event, or None if the line is plain log output.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    if stripped.startswith("{"):
+        try:
+            payload = json.loads(stripped)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+
+        kind = str(payload.get("type", ""))
+        if kind not in EVENT_KINDS:
+            return None
+        text = next(
+            (str(payload[key]) for key in _TEXT_KEYS if payload.get(key)),
+            "",
+        )
+        return OpenHandsEvent(kind=kind, text=text, data=payload)
+
+    # Plain text CLI output marks assistant messages with a robot prefix
+    if stripped.startswith("🤖"):
+        return OpenHandsEvent(kind=MESSAGE, text=stripped[1:].strip())
+
+    return None
+
+
+class EventLog:
+    """Compact, bounded record of the events of one run."""
+
+    def __init__(
+        self,
+        max_items: int = EVENT_LOG_MAX_ITEMS,
+        tail_lines: int = EVENT_LOG_TAIL_LINES,
+    ) -> None:
+        """Initialize the event log.
+
+        Args:
+            max_items: Messages, actions and errors kept per kind.
+            tail_lines: Plain log lines kept for runs without any events.
+        """
+        self.max_items = max_items
+        self.messages: List[str] = []
+        self.actions: List[str] = []
+        self.errors: List[str] = []
+        self.files: Dict[str, str] = {}
+        self.tokens = 0
+        self.counts: Dict[str, int] = {kind: 0 for kind in EVENT_KINDS}
+        self.log_lines = 0
+        self.log_tail: Deque[str] = deque(maxlen=tail_lines)
+
+    def add(self, event: OpenHandsEvent) -> None:
+        """Add an event to the log.
+
+        Args:
+            event: The event.
+        """
+        self.counts[event.kind] += 1
+        if event.kind == FILE:
+            change = str(event.data.get("change", "modified"))
+            self.files[event.text] = change
+            return
+        if event.kind == USAGE:
+            self.tokens += _count_tokens(event.data)
+            return
+
+        bucket = {
+            MESSAGE: self.messages,
+            ACTION: self.actions,
+            ERROR: self.errors,
+        }[event.kind]
+        if len(bucket) < self.max_items:
+            bucket.append(event.text)
+
+    def add_log_line(self, line: str) -> None:
+        """Keep a plain log line in the bounded tail.
+
+        Args:
+            line: The log line.
+        """
+        self.log_lines += 1
+        if line.strip():
+            self.log_tail.append(line)
+
+    def summary(self) -> str:
+        """Get the text to show to users for this run.
+
+        Returns:
+            The assistant messages, or the log tail if the run emitted none.
+        """
+        if self.messages:
+            return "\n".join(self.messages)
+        return "\n".join(self.log_tail)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the log into a compact dictionary for storage.
+
+        Returns:
+            A dictionary with messages, actions, files, errors, the LLM tokens
+            reported by the run and counts.
+        """
+        return {
+            "messages": list(self.messages),
+            "actions": list(self.actions),
+            "files": dict(self.files),
+            "errors": list(self.errors),
+            "tokens": self.tokens,
+            "counts": dict(self.counts),
+            "log_lines": self.log_lines,
+        }
+
+
+class EventStreamParser:
+    """Incrementally parse raw output chunks into an event log."""
+
+    def __init__(self, log: Optional[EventLog] = None) -> None:
+        """Initialize the parser.
+
+        Args:
+            log: The event log to fill. A new one is created by default.
+        """
+        self.log = log or EventLog()
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse every complete line in a chunk of output.
+
+        Args:
+            chunk: Raw bytes read from the worker.
+        """
+        data = self._buffer + chunk
+        lines = data.split(b"\n")
+        self._buffer = lines.pop()
+        for raw in lines:
+            self._handle(raw)
+
+        # Never let a single unterminated line grow without bound
+        if len(self._buffer) > MAX_LINE_BYTES:
+            self._handle(self._buffer[:MAX_LINE_BYTES])
+            self._buffer = b""
+
+    def close(self) -> EventLog:
+        """Parse any trailing partial line.
+
+        Returns:
+            The completed event log.
+        """
+        if self._buffer:
+            self._handle(self._buffer)
+            self._buffer = b""
+        return self.log
+
+    def _handle(self, raw: bytes) -> None:
+        """Parse a single raw line."""
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+        event = parse_event_line(line)
+        if event is None:
+            self.log.add_log_line(line)
+        else:
+            self.log.add(event)
@@ -0,0 +1,151 @@
+"""
+Model Router Module
+
+This module decides which LLM model, worker pool and timeout budget serve a request.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.config import (
+    CHAT_LLM_API_KEY,
+    CHAT_LLM_MODEL,
+    CHAT_MAX_CONCURRENT,
+    CHAT_TIMEOUT_SECONDS,
+    LONG_TASK_LLM_API_KEY,
+    LONG_TASK_LLM_MODEL,
+    LONG_TASK_MAX_CONCURRENT,
+    LONG_TASK_TIMEOUT_SECONDS,
+    SHORT_TASK_LLM_API_KEY,
+    SHORT_TASK_LLM_MODEL,
+    SHORT_TASK_MAX_CHARS,
+    SHORT_TASK_MAX_CONCURRENT,
+    SHORT_TASK_TIMEOUT_SECONDS,
+)
+
+# Request classes
+CHAT = "chat"
+SHORT_TASK = "short_task"
+LONG_TASK = "long_task"
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """A model together with the worker pool and timeout budget that serve it."""
+
+    name: str
+    model: str
+    api_key: Optional[str]
+    max_concurrent: int
+    timeout_seconds: int
+
+
+def default_routes() -> List[ModelRoute]:
+    """Build the routes described by the environment configuration.
+
+    Returns:
+        The chat, short task and long task routes.
+    """
+    return [
+        ModelRoute(
+            name=CHAT,
+            model=CHAT_LLM_MODEL,
+            api_key=CHAT_LLM_API_KEY,
+            max_concurrent=CHAT_MAX_CONCURRENT,
+            timeout_seconds=CHAT_TIMEOUT_SECONDS,
+        ),
+        ModelRoute(
+            name=SHORT_TASK,
+            model=SHORT_TASK_LLM_MODEL,
+            api_key=SHORT_TASK_LLM_API_KEY,
+            max_concurrent=SHORT_TASK_MAX_CONCURRENT,
+            timeout_seconds=SHORT_TASK_TIMEOUT_SECONDS,
+        ),
+        ModelRoute(
+            name=LONG_TASK,
+            model=LONG_TASK_LLM_MODEL,
+            api_key=LONG_TASK_LLM_API_KEY,
+            max_concurrent=LONG_TASK_MAX_CONCURRENT,
+            timeout_seconds=LONG_TASK_TIMEOUT_SECONDS,
+        ),
+    ]
+
+
+class ModelRouter:
+    """Pick a route for each request based on its class or an explicit user option."""
+
+    def __init__(
+        self,
+        routes: Optional[List[ModelRoute]] = None,
+        short_task_max_chars: int = SHORT_TASK_MAX_CHARS,
+    ) -> None:
+        """Initialize the router.
+
+        Args:
+            routes: The available routes. Defaults to the configured routes.
+            short_task_max_chars: Longest description still treated as a short task.
+        """
+        self.routes: Dict[str, ModelRoute] = {
+            route.name: route for route in (routes or default_routes())
+        }
+        self.short_task_max_chars = short_task_max_chars
+
+    def get(self, name: str) -> ModelRoute:
+        """Get a route by name.
+
+        Args:
+            name: The route name.
+
+        Returns:
+            The route.
+
+        Raises:
+            ValueError: If no route has that name.
+        """
+        if name not in self.routes:
+            raise ValueError(
+                f"Unknown model route '{name}'. "
+                f"Available routes: {', '.join(sorted(self.routes))}"
+            )
+        return self.routes[name]
+
+    def route_chat(self) -> ModelRoute:
+        """Get the route used for chat messages."""
+        return self.get(CHAT)
+
+    def task_routes(self) -> Dict[str, ModelRoute]:
+        """Get the routes that run queued tasks, which are all but the chat route."""
+        return {name: route for name, route in self.routes.items() if name != CHAT}
+
+    def route_task(
+        self, description: str, requested: Optional[str] = None
+    ) -> ModelRoute:
+        """Pick the route for a task.
+
+        Args:
+            description: The task description.
+            requested: A route or model name chosen by the user, if any.
+
+        Returns:
+            The route that should run the task.
+
+        Raises:
+            ValueError: If the requested route or model does not run tasks.
+        """
+        if requested:
+            # Accept either a route name or the model it is configured with. The
+            # chat route is reserved for chat sessions, so its capacity is not
+            # shared with queued tasks
+            if requested in self.routes and requested != CHAT:
+                return self.routes[requested]
+            for route in self.routes.values():
+                if route.name != CHAT and route.model == requested:
+                    return route
+            raise ValueError(
+                f"Unknown model route '{requested}'. "
+                f"Available routes: {', '.join(sorted(self.task_routes()))}"
+            )
+
+        if len(description) <= self.short_task_max_chars:
+            return self.get(SHORT_TASK)
+        return self.get(LONG_TASK)
@@ -5,71 +5,645 @@ This module provides an adapter for interacting with OpenHands.
 """
 
 import asyncio
+import json
+import logging
 import os
+import time
 import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Coroutine, Dict, List, Optional, Union, cast
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
+from src.adapter.admission import AdmissionController, AdmissionRejected
+from src.adapter.backends import ExecutionBackend, ExecutionRequest, create_backend
+from src.adapter.events import EventLog, EventStreamParser
+from src.adapter.model_router import ModelRoute, ModelRouter
+from src.adapter.preparation import TaskPreparation
+from src.adapter.records import BatchRecord, SessionRecord, TaskRecord, TaskResult
+from src.adapter.resources import ResourceLimits
+from src.adapter.runtime_stats import RuntimeHistory
+from src.adapter.sandbox import SandboxPool, SandboxRuntime, create_provider
+from src.adapter.spool import SpoolWriter, read_range
+from src.adapter.usage import USER, UsageTracker
+from src.adapter.workspace import WorkspaceIndex
 from src.config import (
-    LLM_API_KEY,
-    LLM_MODEL,
-    OPENHANDS_CLI_PATH,
+    ADAPTIVE_TIMEOUT_ENABLED,
+    ARTIFACT_MAX_BYTES,
+    ARTIFACT_MAX_FILES,
+    CHAT_CONTEXT_MAX_CHARS,
+    CHECKPOINT_FILE,
+    DRAIN_TIMEOUT_SECONDS,
+    LOG_PREVIEW_BYTES,
+    OPENHANDS_OUTPUT_FORMAT,
     OPENHANDS_WORKDIR,
+    SANDBOX_POOL_SIZE,
     SANDBOX_RUNTIME_CONTAINER_IMAGE,
-    TASK_TIMEOUT_SECONDS,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+    SPOOL_DIR,
+    STDERR_TAIL_BYTES,
+    TASK_RETENTION_SECONDS,
+    THREAD_IDLE_TIMEOUT_SECONDS,
+    WORKSPACE_SNAPSHOT_ENABLED,
 )
+from src.utils.tracing import Tracer
+from src.utils.tracing import tracer as default_tracer
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Seconds between checks for in-flight work while draining
+DRAIN_POLL_INTERVAL_SECONDS = 0.1
+
+
+def build_chat_prompt(
+    context: Deque[dict], message: str, max_chars: int = CHAT_CONTEXT_MAX_CHARS
+) -> str:
+    """Build the prompt for a chat message from the recent conversation.
+
+    Args:
+        context: The previous messages of the session, oldest first.
+        message: The new message.
+        max_chars: Character budget for the included history.
+
+    Returns:
+        The message alone, or the message preceded by as much recent history as
+        fits in the budget.
+    """
+    turns: List[str] = []
+    used = 0
+    for entry in reversed(context):
+        turn = f"{entry['role']}: {entry['content']}"
+        if used + len(turn) > max_chars:
+            break
+        turns.append(turn)
+        used += len(turn)
+    if not turns:
+        return message
+
+    history = "\n".join(reversed(turns))
+    return f"Conversation so far:\n{history}\n\nuser: {message}"
+
+
+@dataclass
+class RunResult:
+    """Outcome of a single OpenHands process."""
+
+    returncode: Optional[int]
+    events: EventLog
+    stderr: str
+    timed_out: bool = False
+    resources: Dict[str, float] = field(default_factory=dict)
+    # Stream name -> spool file holding the full output
+    spool: Dict[str, str] = field(default_factory=dict)
+    # Bytes written to stdout and stderr
+    output_bytes: int = 0
+
+    def usage(self) -> Dict[str, float]:
+        """Get what the run consumed, for usage accounting.
+
+        Returns:
+            Amounts per field of ``USAGE_FIELDS``.
+        """
+        return {
+            "runs": 1,
+            "wall_seconds": self.resources.get("wall_seconds", 0),
+            "cpu_seconds": self.resources.get("cpu_seconds", 0),
+            "output_bytes": self.output_bytes,
+            "tokens": self.events.tokens,
+        }
+
+    def error_message(self) -> str:
+        """Get the message describing a failed run.
+
+        Returns:
+            The stderr tail, the reported errors, or a generic message.
+        """
+        return self.stderr or "\n".join(self.events.errors) or "Unknown error"
 
 
 class OpenHandsAdapter:
     """Adapter for interacting with OpenHands."""
 
-    def __init__(self) -> None:
-        """Initialize the OpenHands adapter."""
-        self.active_sessions: Dict[str, dict] = {}
-        self.task_queue: asyncio.Queue = asyncio.Queue()
+    def __init__(
+        self,
+        router: Optional[ModelRouter] = None,
+        runtime_history: Optional[RuntimeHistory] = None,
+        admission: Optional[AdmissionController] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+        sandbox_pool: Optional[SandboxPool] = None,
+        tracer: Optional[Tracer] = None,
+        checkpoint_file: str = CHECKPOINT_FILE,
+        backend: Optional[ExecutionBackend] = None,
+        usage: Optional[UsageTracker] = None,
+        workdir: Optional[str] = None,
+        spool_dir: Optional[str] = None,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        """Initialize the OpenHands adapter.
+
+        Args:
+            router: The model router. Defaults to the configured routes.
+            runtime_history: Runtime history used for adaptive timeouts and ETAs.
+            admission: Global admission controller for chat and tasks.
+            resource_limits: Limits applied to every OpenHands process.
+            sandbox_pool: Pool of sandboxes prepared ahead of the runs. Defaults to
+                the configured pool, or none if ``SANDBOX_POOL_SIZE`` is 0.
+            tracer: The tracer recording request spans. Defaults to the configured
+                tracer.
+            checkpoint_file: File the tasks left over by a drain are saved to and
+                resumed from.
+            backend: The backend running OpenHands. Defaults to the configured
+                backend.
+            usage: Usage accounting and quotas per user and guild.
+            workdir: Directory of the workspaces. Defaults to ``OPENHANDS_WORKDIR``.
+            spool_dir: Directory of the spooled output. Defaults to ``SPOOL_DIR``.
+            spill_dir: Directory large task outputs are spilled to. Defaults to
+                ``RESULT_SPILL_DIR``.
+        """
+        self.active_sessions: Dict[str, TaskRecord] = {}
+        self.router = router or ModelRouter()
+        self.runtime_history = runtime_history or RuntimeHistory()
+        self.admission = admission or AdmissionController()
+        self.resource_limits = resource_limits or ResourceLimits.from_config()
+        self.backend = backend or create_backend(resource_limits=self.resource_limits)
+        self.usage = usage or UsageTracker()
+        self.workdir = Path(workdir or OPENHANDS_WORKDIR)
+        self.spool_dir = Path(spool_dir or SPOOL_DIR)
+        self.spill_dir = spill_dir
+        if sandbox_pool is None and SANDBOX_POOL_SIZE > 0:
+            sandbox_pool = SandboxPool(create_provider())
+        self.sandbox_pool = sandbox_pool
+        self.tracer = tracer or default_tracer
+        # One queue and one worker pool per task route, so cheap requests are never
+        # queued behind slow ones. The chat route only serves chat sessions
+        self.task_queues: Dict[str, asyncio.Queue] = {
+            name: asyncio.Queue() for name in self.router.task_routes()
+        }
+        self.chat_slots: Dict[str, asyncio.Semaphore] = {
+            name: asyncio.Semaphore(route.max_concurrent)
+            for name, route in self.router.routes.items()
+        }
+        self.chat_sessions: Dict[str, SessionRecord] = {}
+        self.task_listeners: List[Callable[[dict], Awaitable[None]]] = []
+        self.batches: Dict[str, BatchRecord] = {}
+        self.batch_listeners: List[Callable[[dict], Awaitable[None]]] = []
+        self.workspace_indexes: Dict[str, WorkspaceIndex] = {}
+        # Runs of one workspace take turns while snapshots are on, so each change
+        # manifest only holds the changes of its own run
+        self.workspace_locks: Dict[str, asyncio.Lock] = {}
+        self.busy_workers: Dict[str, int] = {
+            name: 0 for name in self.router.task_routes()
+        }
         self.running = False
-        self.task_processor: Optional[asyncio.Task] = None
+        self.task_processors: List[asyncio.Task] = []
+        self.checkpoint_file = checkpoint_file
+        # accepting -> draining -> drained
+        self.drain_state = "accepting"
+        self.drain_deadline: Optional[float] = None
+        self.active_chats = 0
+        self.checkpointed = 0
 
     async def start(self) -> None:
-        """Start the task processor."""
+        """Start the task processors and resume the tasks of the last checkpoint."""
+        if self.running or self.drain_state != "accepting":
+            # on_ready fires again after every reconnect
+            return
         self.running = True
-        self.task_processor = asyncio.create_task(self.process_tasks())
+        self._resume_checkpoint()
+        for name, route in self.router.task_routes().items():
+            for _ in range(route.max_concurrent):
+                self.task_processors.append(
+                    asyncio.create_task(self.process_tasks(name))
+                )
+        self.task_processors.append(asyncio.create_task(self._sweep_sessions()))
+        if self.sandbox_pool is not None:
+            # Warming the pool may pull an image, so it must not delay startup
+            self.task_processors.append(asyncio.create_task(self.sandbox_pool.start()))
+        # Worker processes may take a while to import OpenHands
+        self.task_processors.append(asyncio.create_task(self.backend.start()))
 
     async def stop(self) -> None:
-        """Stop the task processor."""
+        """Stop the task processors."""
         self.running = False
-        if self.task_processor:
-            self.task_processor.cancel()
+        for processor in self.task_processors:
+            processor.cancel()
+        for processor in self.task_processors:
             try:
-                await self.task_processor
+                await processor
             except asyncio.CancelledError:
                 pass
+        self.task_processors = []
+        if self.sandbox_pool is not None:
+            await self.sandbox_pool.stop()
+        await self.backend.stop()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> dict:
+        """Stop accepting work, let running work finish and checkpoint the rest.
+
+        Queued tasks are checkpointed right away. Running tasks and chat replies get
+        until the deadline to finish; tasks still running then are interrupted and
+        checkpointed too. The next ``start`` queues checkpointed tasks again.
+
+        Args:
+            timeout: Seconds running work gets to finish.
 
-    async def create_task(self, user_id: str, description: str) -> dict:
+        Returns:
+            The drain status once the adapter is stopped.
+        """
+        if self.drain_state != "accepting":
+            return self.drain_status()
+        self.drain_state = "draining"
+        self.drain_deadline = time.monotonic() + timeout
+        leftover = await self._take_queued_tasks()
+        logger.info(
+            f"Draining {self.in_flight()} running requests, "
+            f"{len(leftover)} queued tasks checkpointed"
+        )
+
+        while self.in_flight() and time.monotonic() < self.drain_deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL_SECONDS)
+
+        # Interrupts what is still running; its processes are killed
+        await self.stop()
+        # Tasks whose creation was under way when the drain started
+        leftover += await self._take_queued_tasks()
+        for task in self.active_sessions.values():
+            if task.status == "interrupted":
+                task.status = "checkpointed"
+                leftover.append(task)
+        self._write_checkpoint(leftover)
+        self.drain_state = "drained"
+        logger.info(f"Drained, {len(leftover)} tasks checkpointed")
+        return self.drain_status()
+
+    def in_flight(self) -> int:
+        """Get the number of running tasks and chat replies."""
+        return sum(self.busy_workers.values()) + self.active_chats
+
+    def drain_status(self) -> dict:
+        """Get the progress of the drain, reported on the health endpoint.
+
+        Returns:
+            The drain state, the work still in flight or queued, the tasks
+            checkpointed and, while draining, the seconds left before the deadline.
+        """
+        status = {
+            "state": self.drain_state,
+            "in_flight": self.in_flight(),
+            "queued": self.queue_length(),
+            "checkpointed": self.checkpointed,
+        }
+        if self.drain_state == "draining" and self.drain_deadline is not None:
+            status["remaining_seconds"] = round(
+                max(self.drain_deadline - time.monotonic(), 0.0), 1
+            )
+        return status
+
+    def _check_accepting(self) -> None:
+        """Reject new work once a drain has started.
+
+        Raises:
+            AdmissionRejected: If the adapter is draining.
+        """
+        if self.drain_state != "accepting":
+            raise AdmissionRejected(
+                "The bot is restarting and not accepting new requests. "
+                "Please try again in a minute."
+            )
+
+    async def _take_queued_tasks(self) -> List[TaskRecord]:
+        """Remove the queued tasks so no worker starts them.
+
+        Returns:
+            The removed tasks, marked as checkpointed.
+        """
+        tasks: List[TaskRecord] = []
+        for queue in self.task_queues.values():
+            while not queue.empty():
+                task = queue.get_nowait()
+                queue.task_done()
+                task.status = "checkpointed"
+                if task.trace is not None:
+                    self.tracer.end_span(task.trace)
+                await self._release_runtime(task)
+                tasks.append(task)
+        return tasks
+
+    def _write_checkpoint(self, tasks: List[TaskRecord]) -> None:
+        """Save the tasks left over by a drain so the next start resumes them.
+
+        Args:
+            tasks: The checkpointed tasks.
+        """
+        self.checkpointed = len(tasks)
+        if not tasks:
+            return
+        path = Path(self.checkpoint_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".tmp")
+        partial.write_text(
+            json.dumps({"tasks": [task.to_checkpoint() for task in tasks]}),
+            encoding="utf-8",
+        )
+        os.replace(partial, path)
+
+    def _resume_checkpoint(self) -> int:
+        """Queue the tasks saved by the last drain again.
+
+        The checkpoint is deleted once all of its tasks are queued. A checkpoint
+        that cannot be read is kept next to it as ``*.bad`` for inspection.
+
+        Returns:
+            The number of resumed tasks.
+        """
+        path = Path(self.checkpoint_file)
+        try:
+            entries = list(json.loads(path.read_text(encoding="utf-8"))["tasks"])
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            bad = path.with_name(f"{path.name}.bad")
+            logger.error(f"Failed to read checkpoint {path}, keeping it as {bad}: {e}")
+            try:
+                os.replace(path, bad)
+            except OSError as e:
+                logger.error(f"Failed to keep checkpoint {path}: {e}")
+            return 0
+
+        resumed = 0
+        for entry in entries:
+            try:
+                task = TaskRecord.from_checkpoint(entry)
+                if task.route not in self.task_queues:
+                    # The routes changed since the checkpoint was written
+                    route = self.router.route_task(task.description)
+                    task.route, task.model = route.name, route.model
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Skipping invalid checkpointed task: {e}")
+                continue
+            task.trace = self.tracer.start_span(
+                "task.queued", task_id=task.id, route=task.route, resumed=True
+            )
+            self.active_sessions[task.id] = task
+            self.task_queues[task.route].put_nowait(task)
+            if task.batch_id is not None:
+                # Tasks of the batch that finished before the restart are gone
+                batch = self.batches.setdefault(
+                    task.batch_id,
+                    BatchRecord(task.batch_id, task.user_id, task.channel_id),
+                )
+                batch.task_ids.append(task.id)
+            resumed += 1
+        # Each checkpoint is resumed once
+        path.unlink(missing_ok=True)
+        logger.info(f"Resumed {resumed} checkpointed tasks")
+        return resumed
+
+    async def create_task(
+        self,
+        user_id: str,
+        description: str,
+        model: Optional[str] = None,
+        channel_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        preparation: Optional[TaskPreparation] = None,
+        guild_id: Optional[str] = None,
+    ) -> dict:
         """Create a new task and add it to the queue.
 
         Args:
             user_id: The Discord user ID.
             description: The task description.
+            model: The route or model requested by the user, if any.
+            channel_id: The Discord channel notified when the task finishes.
+            thread_id: The Discord thread whose workspace the task runs in, if any.
+            guild_id: The Discord guild the task was submitted in, if any. Its
+                usage counts towards the quota of the guild.
+            preparation: Setup started for the task by ``prepare_task``. It is
+                claimed by the task, or cancelled if the task is rejected.
 
         Returns:
-            A dictionary containing the task ID and status.
+            A dictionary containing the task ID, status and queue position, or
+            an ``error`` if the task was rejected.
         """
+        try:
+            self._check_accepting()
+            route = self.router.route_task(description, model)
+            self.admission.admit_task(self.queue_length())
+            self.usage.check(user_id, guild_id)
+        except (AdmissionRejected, ValueError) as e:
+            if preparation is not None:
+                await preparation.cancel()
+            if isinstance(e, ValueError):
+                raise
+            return {"error": str(e), "status": "rejected"}
+
         task_id = f"task_{uuid.uuid4().hex[:8]}"
-        task = {
-            "id": task_id,
-            "user_id": user_id,
-            "description": description,
+        task = TaskRecord(
+            task_id,
+            user_id,
+            description,
+            route.name,
+            route.model,
+            channel_id=channel_id,
+            thread_id=thread_id,
+            guild_id=guild_id,
+        )
+        if preparation is not None:
+            task.runtime = await preparation.claim()
+        queue_position = await self._enqueue(task)
+
+        return {
+            "task_id": task_id,
             "status": "pending",
-            "result": None,
-            "created_at": asyncio.get_event_loop().time(),
+            "model": route.model,
+            "queue_position": queue_position,
+            "trace_id": task.trace.trace_id if task.trace else None,
         }
-        self.active_sessions[task_id] = task
 
-        # Add task to queue
-        await self.task_queue.put(task)
+    async def create_tasks(
+        self,
+        user_id: str,
+        descriptions: List[str],
+        model: Optional[str] = None,
+        channel_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        guild_id: Optional[str] = None,
+    ) -> dict:
+        """Create several tasks at once.
+
+        The batch is admitted or rejected as a whole, the workspace is set up once
+        for all of its tasks, and listeners registered with ``add_batch_listener``
+        are notified once, when every task of the batch has finished.
+
+        Args:
+            user_id: The Discord user ID.
+            descriptions: The task descriptions.
+            model: The route or model requested for every task, if any.
+            channel_id: The Discord channel notified when the batch finishes.
+            thread_id: The Discord thread whose workspace the tasks run in, if any.
+            guild_id: The Discord guild the batch was submitted in, if any.
+
+        Returns:
+            A dictionary containing the batch ID and the ID, model and queue
+            position of each task, or an ``error`` if the batch was rejected.
 
-        return {"task_id": task_id, "status": "pending"}
+        Raises:
+            ValueError: If the batch is empty or the model is unknown.
+        """
+        if not descriptions:
+            raise ValueError("A batch needs at least one task")
+        try:
+            self._check_accepting()
+            routes = [self.router.route_task(text, model) for text in descriptions]
+            self.admission.admit_task(self.queue_length(), len(descriptions))
+            self.usage.check(user_id, guild_id)
+        except AdmissionRejected as e:
+            return {"error": str(e), "status": "rejected"}
+
+        # Shared by every task of the batch, so it is set up once
+        if thread_id:
+            workspace = await asyncio.to_thread(self._thread_workspace, thread_id)
+        else:
+            workspace = await asyncio.to_thread(self._workspace_for, user_id)
+        self._workspace_index(workspace)
+
+        batch = BatchRecord(f"batch_{uuid.uuid4().hex[:8]}", user_id, channel_id)
+        self.batches[batch.id] = batch
+        tasks = []
+        for description, route in zip(descriptions, routes):
+            task = TaskRecord(
+                f"task_{uuid.uuid4().hex[:8]}",
+                user_id,
+                description,
+                route.name,
+                route.model,
+                channel_id=channel_id,
+                thread_id=thread_id,
+                batch_id=batch.id,
+                guild_id=guild_id,
+            )
+            batch.task_ids.append(task.id)
+            tasks.append(
+                {
+                    "task_id": task.id,
+                    "model": route.model,
+                    "queue_position": await self._enqueue(task),
+                }
+            )
+
+        return {"batch_id": batch.id, "status": "pending", "tasks": tasks}
+
+    async def _enqueue(self, task: TaskRecord) -> int:
+        """Register a new task and add it to the queue of its route.
+
+        Returns:
+            The position of the task in the queue.
+        """
+        # Ended by the worker that picks the task up, so it measures the queue wait
+        task.trace = self.tracer.start_span(
+            "task.queued", task_id=task.id, route=task.route
+        )
+        self.active_sessions[task.id] = task
+
+        queue = self.task_queues[task.route]
+        await queue.put(task)
+        return queue.qsize()
+
+    def prepare_task(
+        self,
+        user_id: str,
+        description: str,
+        model: Optional[str] = None,
+        in_thread: bool = False,
+    ) -> TaskPreparation:
+        """Start the setup of a task before it is created.
+
+        Call this as soon as a command is parsed and pass the result to
+        ``create_task``, so the setup overlaps the Discord round-trips.
+
+        Args:
+            user_id: The Discord user ID.
+            description: The task description.
+            model: The route or model requested by the user, if any.
+            in_thread: Whether the task will run in a thread that does not exist yet.
+
+        Returns:
+            The running preparation.
+        """
+        return TaskPreparation(
+            self._prepare(user_id, description, model, in_thread), self.sandbox_pool
+        )
+
+    async def _prepare(
+        self, user_id: str, description: str, model: Optional[str], in_thread: bool
+    ) -> Optional[SandboxRuntime]:
+        """Prepare the workspace and lease a sandbox for a task.
+
+        The sandbox is only leased if a worker of the route is free, so queued
+        tasks never hold sandboxes that running tasks could use.
+
+        Returns:
+            The leased sandbox, if any.
+        """
+        if not in_thread:
+            # The baseline snapshot is still taken when the run starts, so the
+            # change manifest only covers the run itself
+            workspace = await asyncio.to_thread(self._workspace_for, user_id)
+            self._workspace_index(workspace)
+
+        if self.sandbox_pool is None:
+            return None
+        try:
+            route = self.router.route_task(description, model)
+        except ValueError:
+            return None
+        idle = (
+            self.task_queues[route.name].empty()
+            and self.busy_workers[route.name] < route.max_concurrent
+        )
+        if not idle:
+            return None
+        return await self.sandbox_pool.acquire()
+
+    def queue_length(self) -> int:
+        """Get the number of tasks waiting in all route queues.
+
+        Returns:
+            The number of queued tasks.
+        """
+        return sum(queue.qsize() for queue in self.task_queues.values())
+
+    def metrics(self) -> dict:
+        """Get the adapter metrics.
+
+        Returns:
+            Queue lengths per route, the admission controller, execution backend
+            and sandbox pool state.
+        """
+        metrics = {
+            "queues": {name: queue.qsize() for name, queue in self.task_queues.items()},
+            "admission": self.admission.stats(),
+            "usage": self.usage.stats(),
+            "backend": self.backend.stats(),
+        }
+        if self.sandbox_pool is not None:
+            metrics["sandbox_pool"] = self.sandbox_pool.stats()
+        return metrics
 
     async def get_task_status(self, task_id: str) -> dict:
         """Get the status of a task.
@@ -81,9 +655,86 @@ class OpenHandsAdapter:
             A dictionary containing the task status.
         """
         if task_id in self.active_sessions:
-            return self.active_sessions[task_id]
+            task = self.active_sessions[task_id]
+            status = task.to_dict()
+            if task.status in ("pending", "running"):
+                status["eta_seconds"] = self._estimate_eta(task)
+            return status
         return {"error": "Task not found"}
 
+    async def get_tasks_status(self, task_ids: List[str]) -> List[dict]:
+        """Get the status of several tasks at once.
+
+        Args:
+            task_ids: Task IDs, or batch IDs standing for every task of the batch.
+
+        Returns:
+            The status of each task in order. Unknown IDs yield their ``id`` and
+            an ``error``.
+        """
+        statuses = []
+        for task_id in dict.fromkeys(self._expand_batches(task_ids)):
+            status = await self.get_task_status(task_id)
+            if "error" in status:
+                status["id"] = task_id
+            statuses.append(status)
+        return statuses
+
+    def _expand_batches(self, ids: List[str]) -> Iterator[str]:
+        """Replace the batch IDs in a list of IDs by the IDs of their tasks."""
+        for item in ids:
+            batch = self.batches.get(item)
+            if batch is None:
+                yield item
+            else:
+                yield from batch.task_ids
+
+    def _estimate_eta(self, task: TaskRecord) -> Optional[float]:
+        """Estimate the seconds left until a task completes.
+
+        Args:
+            task: The task record.
+
+        Returns:
+            The estimated remaining seconds, or None without enough history.
+        """
+        estimate = self.runtime_history.estimate(str(task.user_id), task.route)
+        if estimate is None:
+            return None
+
+        now = asyncio.get_event_loop().time()
+        if task.status == "running" and task.started_at is not None:
+            elapsed = now - task.started_at
+            return max(estimate - elapsed, 0.0)
+
+        # Pending: wait for the tasks queued ahead on the same route first
+        route = self.router.get(task.route)
+        ahead = sum(
+            1
+            for other in self.active_sessions.values()
+            if other.route == task.route
+            and other.status in ("pending", "running")
+            and other.created_at < task.created_at
+        )
+        waves = ahead // max(route.max_concurrent, 1)
+        return estimate * (waves + 1)
+
+    def _timeout_for(self, user_id: str, route: ModelRoute) -> float:
+        """Get the timeout budget for a run.
+
+        Args:
+            user_id: The Discord user ID.
+            route: The route that serves the run.
+
+        Returns:
+            The timeout in seconds.
+        """
+        if not ADAPTIVE_TIMEOUT_ENABLED:
+            return route.timeout_seconds
+        return self.runtime_history.timeout_for(
+            user_id, route.name, route.timeout_seconds
+        )
+
     async def get_user_tasks(self, user_id: str) -> List[dict]:
         """Get all tasks for a user.
 
@@ -94,226 +745,707 @@ class OpenHandsAdapter:
             A list of task dictionaries.
         """
         return [
-            task for task in self.active_sessions.values() if task["user_id"] == user_id
+            task.to_dict()
+            for task in self.active_sessions.values()
+            if task.user_id == user_id
         ]
 
-    async def chat(self, user_id: str, message: str) -> str:
+    async def get_usage(self, user_id: Optional[str] = None, limit: int = 10) -> dict:
+        """Get the usage report of the accounting window.
+
+        Args:
+            user_id: The Discord user to report on. Defaults to the users and
+                guilds with the most usage.
+            limit: Users and guilds listed.
+
+        Returns:
+            A dictionary with the ``window_seconds`` and the ``users`` and
+            ``guilds`` as (ID, totals) pairs.
+        """
+        if user_id is None:
+            return self.usage.report(limit)
+        return {
+            "window_seconds": self.usage.window_seconds,
+            "users": [(user_id, self.usage.totals(USER, user_id))],
+            "guilds": [],
+        }
+
+    async def get_task_artifacts(self, task_id: str, user_id: str) -> dict:
+        """Get the files a task added or modified, for sending as attachments.
+
+        Args:
+            task_id: The task ID.
+            user_id: The Discord user ID requesting the files.
+
+        Returns:
+            A dictionary with the attachable ``files`` as (relative path, path)
+            pairs and the ``skipped`` relative paths, or an ``error``.
+        """
+        task = self.active_sessions.get(task_id)
+        if task is None or task.user_id != user_id:
+            return {"error": "Task not found"}
+        changes = task.changes
+        if not changes:
+            return {"error": "No file changes were recorded for this task"}
+
+        index = self._workspace_index(self._task_workspace(task))
+        files: List[Tuple[str, Path]] = []
+        skipped: List[str] = []
+        for change in changes["added"] + changes["modified"]:
+            path = index.resolve(change["path"])
+            if (
+                path is None
+                or path.stat().st_size > ARTIFACT_MAX_BYTES
+                or len(files) >= ARTIFACT_MAX_FILES
+            ):
+                skipped.append(change["path"])
+                continue
+            files.append((change["path"], path))
+
+        return {"files": files, "skipped": skipped}
+
+    async def get_task_log(
+        self, task_id: str, user_id: str, stream: str = "stdout"
+    ) -> dict:
+        """Get the spooled output of a task.
+
+        Only the tail is read into memory; the spool file itself is sent as is.
+
+        Args:
+            task_id: The task ID.
+            user_id: The Discord user ID requesting the log.
+            stream: The stream to read, ``stdout`` or ``stderr``.
+
+        Returns:
+            A dictionary with the spool ``path``, its ``size`` and a ``preview`` of
+            its tail, or an ``error``.
+        """
+        if stream not in ("stdout", "stderr"):
+            return {"error": "Stream must be stdout or stderr"}
+        task = self.active_sessions.get(task_id)
+        if task is None or task.user_id != user_id:
+            return {"error": "Task not found"}
+        path = task.result.spool.get(stream) if task.result is not None else None
+        if path is None or not os.path.exists(path):
+            return {"error": f"No {stream} output was recorded for this task"}
+
+        preview = await asyncio.to_thread(
+            read_range, Path(path), -LOG_PREVIEW_BYTES, LOG_PREVIEW_BYTES
+        )
+        return {
+            "task_id": task_id,
+            "stream": stream,
+            "path": Path(path),
+            "size": os.path.getsize(path),
+            "preview": preview.decode("utf-8", errors="replace"),
+        }
+
+    def _workspace_for(self, user_id: str) -> Path:
+        """Get the workspace directory of a user, creating it if needed.
+
+        Args:
+            user_id: The Discord user ID.
+
+        Returns:
+            The workspace path.
+        """
+        user_workspace = self.workdir / user_id
+        user_workspace.mkdir(parents=True, exist_ok=True)
+        return user_workspace
+
+    def _thread_workspace(self, thread_id: str) -> Path:
+        """Get the workspace directory of a Discord thread, creating it if needed.
+
+        Args:
+            thread_id: The Discord thread ID.
+
+        Returns:
+            The workspace path.
+        """
+        thread_workspace = self.workdir / "threads" / thread_id
+        thread_workspace.mkdir(parents=True, exist_ok=True)
+        return thread_workspace
+
+    def _task_workspace(self, task: TaskRecord) -> Path:
+        """Get the workspace a task runs in.
+
+        Args:
+            task: The task record.
+
+        Returns:
+            The thread workspace for thread tasks, otherwise the user workspace.
+        """
+        if task.thread_id:
+            return self._thread_workspace(str(task.thread_id))
+        return self._workspace_for(str(task.user_id))
+
+    def _workspace_index(self, workspace: Path) -> WorkspaceIndex:
+        """Get the change-tracking index of a workspace.
+
+        Args:
+            workspace: The workspace directory.
+
+        Returns:
+            The workspace index, kept across runs so unchanged files are never rehashed.
+        """
+        key = str(workspace)
+        if key not in self.workspace_indexes:
+            self.workspace_indexes[key] = WorkspaceIndex(workspace)
+        return self.workspace_indexes[key]
+
+    async def chat(
+        self,
+        user_id: str,
+        message: str,
+        thread_id: Optional[str] = None,
+        guild_id: Optional[str] = None,
+    ) -> str:
         """Chat with OpenHands.
 
         Args:
             user_id: The Discord user ID.
             message: The message to send to OpenHands.
+            thread_id: The Discord thread of the conversation, if any. Each thread
+                has its own session, context and workspace, so conversations in
+                different threads run in parallel.
+            guild_id: The Discord guild of the message, if any.
 
         Returns:
             The response from OpenHands.
         """
-        # Create or get user session
-        session_id = f"chat_{user_id}"
-        if session_id not in self.active_sessions:
-            self.active_sessions[session_id] = {
-                "id": session_id,
-                "user_id": user_id,
-                "context": [],
-                "status": "active",
-                "created_at": asyncio.get_event_loop().time(),
-            }
+        self.active_chats += 1
+        try:
+            with self.tracer.span("adapter.chat", in_thread=thread_id is not None):
+                return await self._chat(user_id, message, thread_id, guild_id)
+        finally:
+            self.active_chats -= 1
 
-        # Add message to context
-        self.active_sessions[session_id]["context"].append(
-            {"role": "user", "content": message}
-        )
+    async def _chat(
+        self,
+        user_id: str,
+        message: str,
+        thread_id: Optional[str],
+        guild_id: Optional[str],
+    ) -> str:
+        """Answer a chat message within its session. See ``chat``."""
+        existing = self.chat_sessions.get(self._chat_session_id(user_id, thread_id))
+        try:
+            self._check_accepting()
+            self.admission.admit_chat(
+                session_busy=existing is not None and existing.lock.locked()
+            )
+            self.usage.check(user_id, guild_id)
+        except AdmissionRejected as e:
+            return f"🚦 {e}"
 
-        # Send to OpenHands and get response
-        response = await self._send_to_openhands(session_id, message)
+        # Create or get the session
+        session = self._get_chat_session(user_id, thread_id)
 
-        # Add response to context
-        self.active_sessions[session_id]["context"].append(
-            {"role": "assistant", "content": response}
-        )
+        # Messages of one session are answered one at a time
+        async with session.lock:
+            session.last_active = asyncio.get_event_loop().time()
+            prompt = build_chat_prompt(session.context, message)
+
+            # Add message to context
+            session.context.append({"role": "user", "content": message})
+
+            # Send to OpenHands and get response, bounded by the chat worker pool
+            route = self.router.route_chat()
+            self.admission.chat_waiting += 1
+            try:
+                with self.tracer.span("chat.wait", route=route.name):
+                    await self.chat_slots[route.name].acquire()
+            finally:
+                self.admission.chat_waiting -= 1
+            try:
+                response = await self._send_to_openhands(
+                    session, prompt, route, guild_id
+                )
+            finally:
+                self.chat_slots[route.name].release()
+
+            # Add response to context
+            session.context.append({"role": "assistant", "content": response})
+            session.last_active = asyncio.get_event_loop().time()
 
         return response
 
-    async def process_tasks(self) -> None:
-        """Process tasks from the queue."""
+    def _chat_session_id(self, user_id: str, thread_id: Optional[str]) -> str:
+        """Get the ID of the chat session of a user or thread."""
+        return f"thread_{thread_id}" if thread_id else f"chat_{user_id}"
+
+    def _get_chat_session(
+        self, user_id: str, thread_id: Optional[str]
+    ) -> SessionRecord:
+        """Get or create the chat session of a user or thread.
+
+        Args:
+            user_id: The Discord user ID.
+            thread_id: The Discord thread ID, if any.
+
+        Returns:
+            The session record.
+        """
+        session_id = self._chat_session_id(user_id, thread_id)
+        session = self.chat_sessions.get(session_id)
+        if session is None:
+            session = SessionRecord(session_id, user_id, thread_id)
+            self.chat_sessions[session_id] = session
+        return session
+
+    def evict_idle_sessions(self, now: Optional[float] = None) -> int:
+        """Forget thread sessions that have been idle for too long.
+
+        Their workspaces stay on disk, so a thread can be resumed later with a fresh
+        context.
+
+        Args:
+            now: The current event loop time. Defaults to the loop clock.
+
+        Returns:
+            The number of sessions evicted.
+        """
+        now = asyncio.get_event_loop().time() if now is None else now
+        idle = [
+            session_id
+            for session_id, session in self.chat_sessions.items()
+            if session.thread_id is not None
+            and not session.lock.locked()
+            and now - session.last_active >= THREAD_IDLE_TIMEOUT_SECONDS
+        ]
+        for session_id in idle:
+            del self.chat_sessions[session_id]
+        return len(idle)
+
+    async def evict_expired_tasks(self, now: Optional[float] = None) -> int:
+        """Forget finished tasks kept longer than ``TASK_RETENTION_SECONDS``.
+
+        The files holding their output are deleted with them, and so are batches
+        whose tasks are all gone.
+
+        Args:
+            now: The current event loop time. Defaults to the loop clock.
+
+        Returns:
+            The number of tasks evicted.
+        """
+        now = asyncio.get_event_loop().time() if now is None else now
+        expired = [
+            task
+            for task in self.active_sessions.values()
+            if task.status in ("completed", "failed")
+            and task.completed_at is not None
+            and now - task.completed_at >= TASK_RETENTION_SECONDS
+        ]
+        for task in expired:
+            del self.active_sessions[task.id]
+        for batch_id, batch in list(self.batches.items()):
+            if not any(task_id in self.active_sessions for task_id in batch.task_ids):
+                del self.batches[batch_id]
+
+        def discard() -> None:
+            for task in expired:
+                if task.result is not None:
+                    task.result.discard()
+
+        if expired:
+            await asyncio.to_thread(discard)
+        return len(expired)
+
+    async def _sweep_sessions(self) -> None:
+        """Periodically evict idle thread sessions, expired tasks and usage."""
+        while self.running:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+            self.evict_idle_sessions()
+            await self.evict_expired_tasks()
+            self.usage.prune()
+
+    def add_task_listener(self, listener: Callable[[dict], Awaitable[None]]) -> None:
+        """Register a coroutine function called with every finished task.
+
+        Args:
+            listener: The listener, e.g. a Discord notifier.
+        """
+        self.task_listeners.append(listener)
+
+    def add_batch_listener(self, listener: Callable[[dict], Awaitable[None]]) -> None:
+        """Register a coroutine function called with every finished batch.
+
+        Tasks of a batch are reported here, together, instead of to the task
+        listeners.
+
+        Args:
+            listener: The listener, called with the batch ID, user, channel and
+                the dictionaries of its tasks.
+        """
+        self.batch_listeners.append(listener)
+
+    async def _notify_batch_listeners(self, batch_id: str) -> None:
+        """Call the batch listeners once every task of the batch has finished."""
+        batch = self.batches.get(batch_id)
+        if batch is None or batch.notified:
+            return
+        tasks = [
+            self.active_sessions[task_id]
+            for task_id in batch.task_ids
+            if task_id in self.active_sessions
+        ]
+        if any(task.status not in ("completed", "failed") for task in tasks):
+            return
+        batch.notified = True
+        snapshot = {
+            "id": batch.id,
+            "user_id": batch.user_id,
+            "channel_id": batch.channel_id,
+            "tasks": [task.to_dict() for task in tasks],
+        }
+        for listener in self.batch_listeners:
+            try:
+                await listener(snapshot)
+            except Exception as e:
+                logger.error(f"Batch listener failed for {batch.id}: {e}")
+
+    async def _notify_task_listeners(self, task: TaskRecord) -> None:
+        """Call the task listeners, isolating their failures from the worker."""
+        snapshot = task.to_dict()
+        for listener in self.task_listeners:
+            try:
+                await listener(snapshot)
+            except Exception as e:
+                logger.error(f"Task listener failed for {task.id}: {e}")
+
+    async def process_tasks(self, route_name: str) -> None:
+        """Process tasks from the queue of a route.
+
+        Args:
+            route_name: The route whose queue this worker serves.
+        """
+        route = self.router.get(route_name)
+        queue = self.task_queues[route_name]
         while self.running:
+            task = None
             try:
                 # Get task from queue
-                task = await self.task_queue.get()
+                task = await queue.get()
+                self.busy_workers[route_name] += 1
+                if task.trace is not None:
+                    self.tracer.end_span(task.trace)
 
                 # Update task status
-                task["status"] = "running"
+                task.status = "running"
+                task.started_at = asyncio.get_event_loop().time()
+                task.timeout_seconds = self._timeout_for(str(task.user_id), route)
 
                 # Execute OpenHands CLI
-                result = await self._execute_openhands_cli(task)
+                with self.tracer.span(
+                    "task.run", parent=task.trace, task_id=task.id, route=route_name
+                ) as span:
+                    result = await self._execute_openhands_cli(task, route)
+                    span.set("success", bool(result.get("success")))
 
-                # Update task with result
-                task["status"] = "completed" if result.get("success") else "failed"
-                task["result"] = result
-                task["completed_at"] = asyncio.get_event_loop().time()
+                # Update task with result, keeping only a preview in memory. Large
+                # outputs are compressed or spilled to disk, off the event loop
+                task.result = await asyncio.to_thread(
+                    TaskResult.from_dict, result, task.id, self.spill_dir
+                )
+                task.status = "completed" if result.get("success") else "failed"
+                task.completed_at = asyncio.get_event_loop().time()
 
             except asyncio.CancelledError:
-                # Handle cancellation
+                # Stopped mid-task; a drain checkpoints it to run again
+                if task and task.status == "running":
+                    task.status = "interrupted"
                 raise
             except Exception as e:
                 # Handle other exceptions
                 if task:
-                    task["status"] = "failed"
-                    task["error"] = str(e)
-                    task["completed_at"] = asyncio.get_event_loop().time()
+                    task.status = "failed"
+                    task.error = str(e)
+                    task.completed_at = asyncio.get_event_loop().time()
             finally:
                 # Mark task as done
                 if task:
-                    self.task_queue.task_done()
+                    queue.task_done()
+                    self.busy_workers[route_name] -= 1
+                    await self._release_runtime(task)
+
+            if task and task.status in ("completed", "failed"):
+                with self.tracer.span("task.notify", parent=task.trace):
+                    if task.batch_id is None:
+                        await self._notify_task_listeners(task)
+                    else:
+                        await self._notify_batch_listeners(task.batch_id)
 
-    async def _execute_openhands_cli(self, task: dict) -> dict:
+    async def _release_runtime(self, task: TaskRecord) -> None:
+        """Give back a sandbox leased ahead of time that a task never used."""
+        runtime, task.runtime = task.runtime, None
+        if runtime is not None and self.sandbox_pool is not None:
+            await self.sandbox_pool.release(runtime)
+
+    async def _execute_openhands_cli(self, task: TaskRecord, route: ModelRoute) -> dict:
         """Execute the OpenHands CLI.
 
         Args:
-            task: The task dictionary.
+            task: The task record.
+            route: The route that runs the task.
 
         Returns:
             A dictionary containing the result of the execution.
         """
-        # Create user workspace directory
-        user_workspace = Path(OPENHANDS_WORKDIR) / str(task["user_id"])
-        user_workspace.mkdir(parents=True, exist_ok=True)
-
-        # Set environment variables
-        env = os.environ.copy()
-        env["LLM_API_KEY"] = LLM_API_KEY if LLM_API_KEY is not None else ""
-        env["LLM_MODEL"] = LLM_MODEL if LLM_MODEL is not None else ""
-        env["SANDBOX_RUNTIME_CONTAINER_IMAGE"] = (
-            SANDBOX_RUNTIME_CONTAINER_IMAGE
-            if SANDBOX_RUNTIME_CONTAINER_IMAGE is not None
-            else ""
-        )
-
-        # Prepare command
-        cmd = [
-            "python",
-            "-m",
-            OPENHANDS_CLI_PATH,
-            "--workspace",
-            str(user_workspace),
-            "--task",
-            task["description"],
-        ]
+        workspace = self._task_workspace(task)
+        async with self._workspace_run(workspace):
+            index = None
+            if WORKSPACE_SNAPSHOT_ENABLED:
+                # Baseline snapshot: stat only, so changes made outside the run are
+                # absorbed without hashing
+                index = self._workspace_index(workspace)
+                with self.tracer.span("workspace.snapshot", baseline=True):
+                    await asyncio.to_thread(index.refresh, False)
 
-        try:
-            # Run OpenHands CLI with timeout
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-            )
-
-            # Wait for process to complete with timeout
+            # The run gives the sandbox back itself
+            runtime, task.runtime = task.runtime, None
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=TASK_TIMEOUT_SECONDS
+                run = await self._run_openhands(
+                    str(task.user_id),
+                    task.description,
+                    route,
+                    task.timeout_seconds,
+                    workspace,
+                    spool_name=task.id,
+                    runtime=runtime,
                 )
-
-                if process.returncode != 0:
-                    return {
-                        "success": False,
-                        "error": stderr.decode("utf-8"),
-                        "output": stdout.decode("utf-8"),
-                    }
-
-                return {
-                    "success": True,
-                    "output": stdout.decode("utf-8"),
-                }
-            except asyncio.TimeoutError:
-                # Kill process if it times out
-                process.kill()
+            except Exception as e:
                 return {
                     "success": False,
-                    "error": f"Task timed out after {TASK_TIMEOUT_SECONDS} seconds",
+                    "error": str(e),
                 }
-        except Exception as e:
+            finally:
+                if index is not None:
+                    with self.tracer.span("workspace.snapshot", baseline=False):
+                        task.changes = await asyncio.to_thread(index.refresh, True)
+        self.usage.record(str(task.user_id), task.guild_id, run.usage())
+
+        if run.timed_out:
+            return {
+                "success": False,
+                "error": f"Task timed out after {task.timeout_seconds:.0f} seconds",
+                "output": run.events.summary(),
+                "events": run.events.to_dict(),
+                "resources": run.resources,
+                "spool": run.spool,
+            }
+
+        if run.returncode != 0:
             return {
                 "success": False,
-                "error": str(e),
+                "error": run.error_message(),
+                "output": run.events.summary(),
+                "events": run.events.to_dict(),
+                "resources": run.resources,
+                "spool": run.spool,
             }
 
-    async def _send_to_openhands(self, session_id: str, message: str) -> str:
+        return {
+            "success": True,
+            "output": run.events.summary(),
+            "events": run.events.to_dict(),
+            "resources": run.resources,
+            "spool": run.spool,
+        }
+
+    async def _send_to_openhands(
+        self,
+        session: SessionRecord,
+        message: str,
+        route: ModelRoute,
+        guild_id: Optional[str] = None,
+    ) -> str:
         """Send a message to OpenHands and get a response.
 
         Args:
-            session_id: The session ID.
+            session: The chat session.
             message: The message to send.
+            route: The route that serves the message.
+            guild_id: The guild the usage of the run is accounted to, if any.
 
         Returns:
             The response from OpenHands.
         """
         # Get user ID from session
-        user_id = self.active_sessions[session_id]["user_id"]
+        user_id = str(session.user_id)
+        timeout = self._timeout_for(user_id, route)
+        if session.thread_id:
+            workspace = self._thread_workspace(str(session.thread_id))
+        else:
+            workspace = self._workspace_for(user_id)
 
-        # Create user workspace directory
-        user_workspace = Path(OPENHANDS_WORKDIR) / str(user_id)
-        user_workspace.mkdir(parents=True, exist_ok=True)
+        try:
+            async with self._workspace_run(workspace):
+                run = await self._run_openhands(
+                    user_id, message, route, timeout, workspace
+                )
+        except Exception as e:
+            return f"Error: {str(e)}"
+        self.usage.record(user_id, guild_id, run.usage())
 
-        # Set environment variables
-        env = os.environ.copy()
-        env["LLM_API_KEY"] = LLM_API_KEY if LLM_API_KEY is not None else ""
-        env["LLM_MODEL"] = LLM_MODEL if LLM_MODEL is not None else ""
-        env["SANDBOX_RUNTIME_CONTAINER_IMAGE"] = (
-            SANDBOX_RUNTIME_CONTAINER_IMAGE
-            if SANDBOX_RUNTIME_CONTAINER_IMAGE is not None
-            else ""
-        )
+        if run.timed_out:
+            return f"Error: Task timed out after {timeout:.0f} seconds"
+        if run.returncode != 0:
+            return f"Error: {run.error_message()}"
 
-        # Prepare command
-        cmd = [
-            "python",
-            "-m",
-            OPENHANDS_CLI_PATH,
-            "--workspace",
-            str(user_workspace),
-            "--task",
-            message,
-        ]
+        return run.events.summary()
 
-        try:
-            # Run OpenHands CLI with timeout
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
+    async def _run_openhands(
+        self,
+        user_id: str,
+        prompt: str,
+        route: ModelRoute,
+        timeout: float,
+        workspace: Path,
+        spool_name: Optional[str] = None,
+        runtime: Optional[SandboxRuntime] = None,
+    ) -> RunResult:
+        """Run OpenHands for a prompt using the model of a route.
+
+        The runtime of every run is recorded so later timeouts and ETAs for the
+        same user and route can be derived from it.
+
+        Args:
+            user_id: The Discord user ID owning the workspace.
+            prompt: The task or message passed to OpenHands.
+            route: The route whose model and API key are used.
+            timeout: The timeout in seconds.
+            workspace: The workspace directory the run works in.
+            spool_name: Prefix of the spool files keeping the full output, or None
+                to keep only the in-memory tails.
+            runtime: A sandbox leased for the run ahead of time. It is given back
+                to the pool when the run finishes.
+
+        Returns:
+            The outcome of the run.
+        """
+        # Variables set for the run on top of the environment of the backend
+        env = {
+            "LLM_API_KEY": route.api_key if route.api_key is not None else "",
+            "LLM_MODEL": route.model if route.model is not None else "",
+            "SANDBOX_RUNTIME_CONTAINER_IMAGE": (
+                SANDBOX_RUNTIME_CONTAINER_IMAGE
+                if SANDBOX_RUNTIME_CONTAINER_IMAGE is not None
+                else ""
+            ),
+            "OPENHANDS_OUTPUT_FORMAT": OPENHANDS_OUTPUT_FORMAT,
+        }
+        request = ExecutionRequest(prompt, str(workspace), env, timeout)
+
+        with self.tracer.span(
+            "openhands.run", route=route.name, model=route.model
+        ) as span:
+            # Lets an instrumented CLI continue the trace
+            env["TRACEPARENT"] = span.traceparent
+            if self.sandbox_pool is None:
+                async with self._subprocess_slot():
+                    return await self._execute(user_id, route, request, spool_name)
+
+            try:
+                async with self._subprocess_slot():
+                    if runtime is None:
+                        with self.tracer.span("sandbox.lease"):
+                            runtime = await self.sandbox_pool.acquire()
+                    env.update(runtime.env)
+                    return await self._execute(user_id, route, request, spool_name)
+            finally:
+                if runtime is not None:
+                    await self.sandbox_pool.release(runtime)
+
+    @asynccontextmanager
+    async def _workspace_run(self, workspace: Path) -> AsyncIterator[None]:
+        """Hold a workspace for a run while change tracking is on.
+
+        Tasks and chat of a user share a workspace, so overlapping runs would
+        otherwise see each other's changes in their manifests.
+        """
+        if not WORKSPACE_SNAPSHOT_ENABLED:
+            yield
+            return
+        lock = self.workspace_locks.setdefault(str(workspace), asyncio.Lock())
+        async with lock:
+            yield
+
+    @asynccontextmanager
+    async def _subprocess_slot(self) -> AsyncIterator[None]:
+        """Hold a global subprocess slot, tracing the time spent waiting for it."""
+        wait = self.tracer.start_span("admission.wait")
+        async with self.admission.subprocess_slot():
+            self.tracer.end_span(wait)
+            yield
+
+    async def _execute(
+        self,
+        user_id: str,
+        route: ModelRoute,
+        request: ExecutionRequest,
+        spool_name: Optional[str] = None,
+    ) -> RunResult:
+        """Run a request on the execution backend and collect its output.
+
+        Args:
+            user_id: The Discord user ID owning the workspace.
+            route: The route that serves the run.
+            request: The prompt, workspace, environment and timeout of the run.
+            spool_name: Prefix of the spool files, if the output is spooled.
+
+        Returns:
+            The outcome of the run.
+        """
+        # Parse output while the run is in progress and spool the raw streams to
+        # disk instead of buffering them
+        parser = EventStreamParser()
+        spools = {
+            stream: SpoolWriter(
+                self.spool_dir / f"{spool_name}.{stream}.log" if spool_name else None,
+                tail_bytes=STDERR_TAIL_BYTES if stream == "stderr" else 0,
             )
+            for stream in ("stdout", "stderr")
+        }
 
-            # Wait for process to complete with timeout
+        def on_stdout(chunk: bytes) -> None:
+            parser.feed(chunk)
+            spools["stdout"].write(chunk)
+
+        with self.tracer.span("backend.run", backend=self.backend.name) as span:
+            failed = True
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=TASK_TIMEOUT_SECONDS
+                outcome = await self.backend.run(
+                    request, on_stdout, spools["stderr"].write
                 )
+                failed = False
+            finally:
+                # The spools of a run that raised are never referred to
+                for spool in spools.values():
+                    await spool.close(discard=failed)
+                span.set("stdout_bytes", spools["stdout"].size)
+            span.set("returncode", outcome.returncode)
+            span.set("timed_out", outcome.timed_out)
 
-                if process.returncode != 0:
-                    error_msg = stderr.decode("utf-8")
-                    return f"Error: {error_msg}"
-
-                output = stdout.decode("utf-8")
-                # Extract the assistant's response from the output
-                # This is a simplified approach and might need adjustment based on actual output format
-                lines = output.strip().split("\n")
-                response_lines = []
-                for line in lines:
-                    if line.startswith("🤖 "):
-                        response_lines.append(line[2:].strip())
-
-                if response_lines:
-                    return "\n".join(response_lines)
-                return output
-            except asyncio.TimeoutError:
-                # Kill process if it times out
-                process.kill()
-                return f"Error: Task timed out after {TASK_TIMEOUT_SECONDS} seconds"
-        except Exception as e:
-            return f"Error: {str(e)}"
-
+        if outcome.timed_out:
+            # The budget it used still counts as a sample so the next timeout for
+            # this kind of work can grow
+            self.runtime_history.record(user_id, route.name, request.timeout)
+        elif outcome.returncode == 0:
+            self.runtime_history.record(
+                user_id, route.name, outcome.resources["wall_seconds"]
+            )
 
-# Create a singleton instance
-openhands_adapter = OpenHandsAdapter()
+        return RunResult(
+            returncode=outcome.returncode,
+            events=parser.close(),
+            stderr=spools["stderr"].tail,
+            timed_out=outcome.timed_out,
+            resources=outcome.resources,
+            output_bytes=spools["stdout"].size + spools["stderr"].size,
+            spool={
+                stream: str(spool.path)
+                for stream, spool in spools.items()
+                if spool.path is not None
+            },
+        )
@@ -0,0 +1,66 @@
+"""
+Task Preparation Module
+
+This module tracks setup that starts as soon as a task command is parsed, while the
+bot is still talking to Discord, so it is off the critical path of the task.
+
+A preparation is either claimed by the task it was started for or cancelled, which
+gives back everything it acquired.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Optional
+
+from src.adapter.sandbox import SandboxPool, SandboxRuntime
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+
+class TaskPreparation:
+    """Speculative setup for a task that has not been created yet."""
+
+    def __init__(
+        self,
+        work: Awaitable[Optional[SandboxRuntime]],
+        pool: Optional[SandboxPool] = None,
+    ) -> None:
+        """Start the preparation.
+
+        Args:
+            work: The setup coroutine, returning the sandbox it leased, if any.
+            pool: The pool the sandbox is given back to on cancellation.
+        """
+        self.pool = pool
+        self.settled = False
+        self._future = asyncio.ensure_future(work)
+
+    async def _result(self) -> Optional[SandboxRuntime]:
+        """Wait for the setup to finish. Failed setup yields nothing."""
+        try:
+            return await self._future
+        except Exception as e:
+            logger.error(f"Task preparation failed: {e}")
+            return None
+
+    async def claim(self) -> Optional[SandboxRuntime]:
+        """Hand the prepared resources over to the created task.
+
+        Returns:
+            The leased sandbox, if any.
+        """
+        self.settled = True
+        return await self._result()
+
+    async def cancel(self) -> None:
+        """Give back everything the preparation acquired.
+
+        Does nothing if the preparation was already claimed or cancelled. Setup
+        still in progress is allowed to finish first, so nothing it acquires leaks.
+        """
+        if self.settled:
+            return
+        self.settled = True
+        runtime = await self._result()
+        if runtime is not None and self.pool is not None:
+            await self.pool.release(runtime)
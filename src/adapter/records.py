@@ -0,0 +1,403 @@
+"""
+Records Module
+
+This module provides the compact records the adapter keeps for tasks and sessions.
+
+Records use ``__slots__`` instead of per-instance dictionaries, and result bodies are
+kept as a bounded preview plus a compressed copy that is spilled to disk when large,
+so finished tasks cost little memory for the life of the bot.
+"""
+
+import asyncio
+import os
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from src.adapter.sandbox import SandboxRuntime
+from src.adapter.spool import remove_spool
+from src.config import (
+    CHAT_CONTEXT_MAX_MESSAGES,
+    RESULT_COMPRESS_MIN_BYTES,
+    RESULT_PREVIEW_CHARS,
+    RESULT_SPILL_DIR,
+    RESULT_SPILL_MIN_BYTES,
+)
+from src.utils.tracing import Span
+
+
+class TaskResult:
+    """Result of a finished task with a bounded in-memory preview of its output."""
+
+    __slots__ = (
+        "success",
+        "error",
+        "preview",
+        "output_size",
+        "events",
+        "resources",
+        "spool",
+        "_body",
+        "_body_path",
+    )
+
+    def __init__(
+        self,
+        success: bool,
+        output: str = "",
+        error: Optional[str] = None,
+        events: Optional[Dict[str, Any]] = None,
+        resources: Optional[Dict[str, float]] = None,
+        spool: Optional[Dict[str, str]] = None,
+        spill_name: Optional[str] = None,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        """Initialize the result.
+
+        Args:
+            success: Whether the task succeeded.
+            output: The full output text.
+            error: The error message of a failed task.
+            events: The compact event log of the run.
+            resources: The measured resource usage of the run.
+            spool: Stream name -> spool file holding the raw output of the run.
+            spill_name: File name used if the output is spilled to disk.
+            spill_dir: Directory outputs are spilled to. Defaults to
+                ``RESULT_SPILL_DIR``.
+        """
+        self.success = success
+        self.error = error
+        self.events = events
+        self.resources = resources
+        self.spool = spool or {}
+        self.output_size = len(output)
+        self.preview = output[:RESULT_PREVIEW_CHARS]
+        self._body: Optional[bytes] = None
+        self._body_path: Optional[str] = None
+
+        # The preview already holds short outputs completely
+        if len(output) <= RESULT_PREVIEW_CHARS:
+            return
+
+        raw = output.encode("utf-8")
+        body = zlib.compress(raw) if len(raw) >= RESULT_COMPRESS_MIN_BYTES else raw
+        if spill_name and len(body) >= RESULT_SPILL_MIN_BYTES:
+            path = Path(spill_dir or RESULT_SPILL_DIR) / f"{spill_name}.out"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(body)
+            self._body_path = str(path)
+        else:
+            self._body = body
+
+    @classmethod
+    def from_dict(
+        cls,
+        result: Dict[str, Any],
+        spill_name: str,
+        spill_dir: Optional[str] = None,
+    ) -> "TaskResult":
+        """Build a result from the dictionary produced by an execution.
+
+        Args:
+            result: The execution result dictionary.
+            spill_name: File name used if the output is spilled to disk.
+            spill_dir: Directory outputs are spilled to. Defaults to
+                ``RESULT_SPILL_DIR``.
+
+        Returns:
+            The compact result.
+        """
+        return cls(
+            success=bool(result.get("success")),
+            output=result.get("output") or "",
+            error=result.get("error"),
+            events=result.get("events"),
+            resources=result.get("resources"),
+            spool=result.get("spool"),
+            spill_name=spill_name,
+            spill_dir=spill_dir,
+        )
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the preview holds only part of the output."""
+        return self.output_size > len(self.preview)
+
+    @property
+    def output(self) -> str:
+        """Load the full output, decompressing or reading it from disk if needed."""
+        if not self.truncated:
+            return self.preview
+        body = self._body
+        if body is None and self._body_path is not None:
+            body = Path(self._body_path).read_bytes()
+        if body is None:
+            return self.preview
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            # Bodies below the compression threshold are stored as-is
+            pass
+        return body.decode("utf-8")
+
+    def discard(self) -> None:
+        """Delete the files of the result once its task is forgotten."""
+        if self._body_path is not None:
+            try:
+                os.remove(self._body_path)
+            except OSError:
+                pass
+            self._body_path = None
+        for path in self.spool.values():
+            remove_spool(path)
+        self.spool = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the result into the dictionary read by the formatters.
+
+        Returns:
+            The result with the output preview in place of the full output.
+        """
+        result: Dict[str, Any] = {
+            "success": self.success,
+            "output": self.preview,
+            "output_truncated": self.truncated,
+            "output_size": self.output_size,
+        }
+        if self.error is not None:
+            result["error"] = self.error
+        if self.events is not None:
+            result["events"] = self.events
+        if self.resources is not None:
+            result["resources"] = self.resources
+        if self.spool:
+            result["spool"] = sorted(self.spool)
+        return result
+
+
+class TaskRecord:
+    """State of a single task."""
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "description",
+        "status",
+        "route",
+        "model",
+        "channel_id",
+        "thread_id",
+        "created_at",
+        "started_at",
+        "completed_at",
+        "timeout_seconds",
+        "result",
+        "error",
+        "changes",
+        "runtime",
+        "trace",
+        "batch_id",
+        "guild_id",
+        "version",
+    )
+
+    def __init__(
+        self,
+        task_id: str,
+        user_id: str,
+        description: str,
+        route: str,
+        model: str,
+        channel_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        guild_id: Optional[str] = None,
+    ) -> None:
+        """Initialize the task record.
+
+        Args:
+            task_id: The task ID.
+            user_id: The Discord user ID.
+            description: The task description.
+            route: The model route serving the task.
+            model: The model of the route.
+            channel_id: The Discord channel notified when the task finishes.
+            thread_id: The Discord thread whose workspace the task runs in.
+            batch_id: The batch the task was submitted in, if any.
+            guild_id: The Discord guild the task was submitted in, if any.
+        """
+        # Bumped on every change of the record
+        self.version = 0
+        self.id = task_id
+        self.user_id = user_id
+        self.description = description
+        self.status = "pending"
+        self.route = route
+        self.model = model
+        self.channel_id = channel_id
+        self.thread_id = thread_id
+        self.created_at = asyncio.get_event_loop().time()
+        self.started_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.timeout_seconds: float = 0.0
+        self.result: Optional[TaskResult] = None
+        self.error: Optional[str] = None
+        self.changes: Optional[Dict[str, Any]] = None
+        # Sandbox leased for the task ahead of time, if any
+        self.runtime: Optional[SandboxRuntime] = None
+        # Span covering the wait in the queue; the task's spans are its children
+        self.trace: Optional[Span] = None
+        self.batch_id = batch_id
+        self.guild_id = guild_id
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Set an attribute and bump the version of the record.
+
+        Renderings of the task are cached by version, so any change invalidates
+        them.
+        """
+        object.__setattr__(self, name, value)
+        if name != "version":
+            object.__setattr__(self, "version", getattr(self, "version", 0) + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the record into the dictionary read by the formatters.
+
+        Returns:
+            A snapshot of the task with result previews.
+        """
+        task: Dict[str, Any] = {
+            "id": self.id,
+            "user_id": self.user_id,
+            "description": self.description,
+            "status": self.status,
+            "route": self.route,
+            "model": self.model,
+            "channel_id": self.channel_id,
+            "thread_id": self.thread_id,
+            "created_at": self.created_at,
+            "result": self.result.to_dict() if self.result is not None else None,
+            "version": self.version,
+        }
+        for key in (
+            "started_at",
+            "completed_at",
+            "error",
+            "changes",
+            "batch_id",
+            "guild_id",
+        ):
+            value = getattr(self, key)
+            if value is not None:
+                task[key] = value
+        if self.trace is not None:
+            task["trace_id"] = self.trace.trace_id
+        return task
+
+    def to_checkpoint(self) -> Dict[str, Any]:
+        """Get what is needed to run the task again after a restart.
+
+        Returns:
+            The JSON-serializable checkpoint of the task.
+        """
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "description": self.description,
+            "route": self.route,
+            "model": self.model,
+            "channel_id": self.channel_id,
+            "thread_id": self.thread_id,
+            "batch_id": self.batch_id,
+            "guild_id": self.guild_id,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data: Dict[str, Any]) -> "TaskRecord":
+        """Recreate a pending task from its checkpoint.
+
+        Args:
+            data: A checkpoint produced by ``to_checkpoint``.
+
+        Returns:
+            The task record.
+        """
+        return cls(
+            data["id"],
+            data["user_id"],
+            data["description"],
+            data["route"],
+            data["model"],
+            channel_id=data.get("channel_id"),
+            thread_id=data.get("thread_id"),
+            batch_id=data.get("batch_id"),
+            guild_id=data.get("guild_id"),
+        )
+
+
+class BatchRecord:
+    """Tasks submitted together, which share a single notification."""
+
+    __slots__ = ("id", "user_id", "channel_id", "task_ids", "notified")
+
+    def __init__(
+        self,
+        batch_id: str,
+        user_id: str,
+        channel_id: Optional[str] = None,
+        task_ids: Optional[List[str]] = None,
+    ) -> None:
+        """Initialize the batch record.
+
+        Args:
+            batch_id: The batch ID.
+            user_id: The Discord user ID.
+            channel_id: The Discord channel notified when the whole batch finishes.
+            task_ids: The IDs of the tasks of the batch.
+        """
+        self.id = batch_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.task_ids: List[str] = task_ids or []
+        self.notified = False
+
+
+class SessionRecord:
+    """State of a chat session of a user or Discord thread."""
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "thread_id",
+        "context",
+        "lock",
+        "status",
+        "created_at",
+        "last_active",
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        user_id: str,
+        thread_id: Optional[str] = None,
+        max_messages: int = CHAT_CONTEXT_MAX_MESSAGES,
+    ) -> None:
+        """Initialize the session record.
+
+        Args:
+            session_id: The session ID.
+            user_id: The Discord user ID.
+            thread_id: The Discord thread ID, if any.
+            max_messages: Messages kept in the context window.
+        """
+        now = asyncio.get_event_loop().time()
+        self.id = session_id
+        self.user_id = user_id
+        self.thread_id = thread_id
+        self.context: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.lock = asyncio.Lock()
+        self.status = "active"
+        self.created_at = now
+        self.last_active = now
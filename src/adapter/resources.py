@@ -0,0 +1,190 @@
+"""
+Resources Module
+
+This module bounds the resources of OpenHands processes and measures what they use.
+
+Limits are applied by the parent with ``prlimit`` right after the process is spawned,
+because code run in the child between ``fork`` and ``exec`` is unsafe in a threaded
+bot. Usage is sampled from ``/proc`` while the process runs, and once more when its
+output closes, because the event loop reaps children without returning their
+``rusage``.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.config import (
+    OPENHANDS_CGROUP_PATH,
+    OPENHANDS_LIMIT_ADDRESS_SPACE_MB,
+    OPENHANDS_LIMIT_CPU_SECONDS,
+    OPENHANDS_LIMIT_OPEN_FILES,
+    OPENHANDS_LIMIT_PROCESSES,
+    RESOURCE_SAMPLE_INTERVAL_SECONDS,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Per-process limits for OpenHands runs. Zero means unlimited."""
+
+    address_space_mb: int = 0
+    cpu_seconds: int = 0
+    open_files: int = 0
+    # RLIMIT_NPROC counts every process of the user, not only the children of
+    # this process, so leave headroom for the bot itself
+    max_processes: int = 0
+    cgroup_path: Optional[str] = None
+
+    @classmethod
+    def from_config(cls) -> "ResourceLimits":
+        """Build the limits described by the environment configuration.
+
+        Returns:
+            The configured limits.
+        """
+        return cls(
+            address_space_mb=OPENHANDS_LIMIT_ADDRESS_SPACE_MB,
+            cpu_seconds=OPENHANDS_LIMIT_CPU_SECONDS,
+            open_files=OPENHANDS_LIMIT_OPEN_FILES,
+            max_processes=OPENHANDS_LIMIT_PROCESSES,
+            cgroup_path=OPENHANDS_CGROUP_PATH or None,
+        )
+
+    def rlimits(self) -> List[Tuple[int, int]]:
+        """Get the ``(resource, limit)`` pairs to apply.
+
+        Returns:
+            The rlimits, empty if the platform has no ``resource`` module.
+        """
+        if resource is None:
+            return []
+        limits = []
+        if self.address_space_mb > 0:
+            limits.append((resource.RLIMIT_AS, self.address_space_mb * 1024 * 1024))
+        if self.cpu_seconds > 0:
+            limits.append((resource.RLIMIT_CPU, self.cpu_seconds))
+        if self.open_files > 0:
+            limits.append((resource.RLIMIT_NOFILE, self.open_files))
+        if self.max_processes > 0:
+            limits.append((resource.RLIMIT_NPROC, self.max_processes))
+        return limits
+
+    def is_set(self) -> bool:
+        """Check whether any limit or cgroup is configured."""
+        return bool(
+            self.address_space_mb
+            or self.cpu_seconds
+            or self.open_files
+            or self.max_processes
+            or self.cgroup_path
+        )
+
+    def apply(self, pid: int) -> None:
+        """Apply the limits to a process that was just spawned.
+
+        Args:
+            pid: The process ID.
+
+        Raises:
+            OSError: If the process could not be limited; the caller must not
+                let it run unbounded.
+        """
+        if self.cgroup_path:
+            # Join the cgroup first so the limits of the group cover the run
+            with open(os.path.join(self.cgroup_path, "cgroup.procs"), "w") as f:
+                f.write(str(pid))
+        rlimits = self.rlimits()
+        if rlimits and not hasattr(resource, "prlimit"):
+            raise OSError("Resource limits need prlimit, which is Linux only")
+        for limit, value in rlimits:
+            # Never raise a hard limit, which would fail for unprivileged users
+            _, hard = resource.prlimit(pid, limit)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.prlimit(pid, limit, (value, hard))
+
+
+class ResourceSampler:
+    """Sample the CPU time and peak memory of a running process from ``/proc``."""
+
+    def __init__(
+        self, pid: int, interval: float = RESOURCE_SAMPLE_INTERVAL_SECONDS
+    ) -> None:
+        """Initialize the sampler.
+
+        Args:
+            pid: The process ID.
+            interval: Seconds between samples.
+        """
+        self.pid = pid
+        self.interval = interval
+        self.cpu_seconds = 0.0
+        self.max_rss_mb = 0.0
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._started_at = asyncio.get_event_loop().time()
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> None:
+        """Take one sample. Missing ``/proc`` entries are ignored."""
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # The command name may contain spaces; fields follow its ")"
+                fields = f.read().rsplit(")", 1)[1].split()
+            # Own user and system time, plus that of the children it waited for
+            ticks = sum(int(value) for value in fields[11:15])
+            self.cpu_seconds = max(self.cpu_seconds, ticks / self._ticks)
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        self.max_rss_mb = max(
+                            self.max_rss_mb, int(line.split()[1]) / 1024
+                        )
+                        break
+        except (OSError, ValueError, IndexError):
+            pass
+
+    async def _run(self) -> None:
+        """Sample until cancelled, often at first so short runs are measured."""
+        delay = min(0.01, self.interval)
+        while True:
+            self.sample()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.interval)
+
+    def finish(self) -> None:
+        """Take a last sample once the process closed its output.
+
+        The process has exited or is about to, and may not be reaped yet.
+        """
+        self.sample()
+
+    def start(self) -> None:
+        """Start sampling in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        """Stop sampling.
+
+        Returns:
+            The wall time, CPU time and peak resident memory of the process.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return {
+            "wall_seconds": round(
+                asyncio.get_event_loop().time() - self._started_at, 3
+            ),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "max_rss_mb": round(self.max_rss_mb, 1),
+        }
@@ -0,0 +1,130 @@
+"""
+Runtime Statistics Module
+
+This module records how long OpenHands runs take and derives timeouts and ETAs from it.
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from src.config import (
+    ADAPTIVE_TIMEOUT_MAX_SECONDS,
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+    ADAPTIVE_TIMEOUT_MIN_SECONDS,
+    ADAPTIVE_TIMEOUT_MULTIPLIER,
+    ADAPTIVE_TIMEOUT_PERCENTILE,
+    RUNTIME_HISTORY_SIZE,
+)
+
+
+def percentile(samples: Iterable[float], q: float) -> float:
+    """Compute a percentile using linear interpolation between closest ranks.
+
+    Args:
+        samples: The observed values.
+        q: The percentile, between 0 and 100.
+
+    Returns:
+        The percentile value.
+
+    Raises:
+        ValueError: If there are no samples.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError("percentile of empty sample set")
+
+    rank = (len(ordered) - 1) * min(max(q, 0.0), 100.0) / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RuntimeHistory:
+    """Bounded per-kind and per-user runtime history."""
+
+    def __init__(
+        self,
+        size: int = RUNTIME_HISTORY_SIZE,
+        min_samples: int = ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+        timeout_percentile: float = ADAPTIVE_TIMEOUT_PERCENTILE,
+        multiplier: float = ADAPTIVE_TIMEOUT_MULTIPLIER,
+        min_timeout: float = ADAPTIVE_TIMEOUT_MIN_SECONDS,
+        max_timeout: float = ADAPTIVE_TIMEOUT_MAX_SECONDS,
+    ) -> None:
+        """Initialize the history.
+
+        Args:
+            size: Number of samples kept per key.
+            min_samples: Samples needed before history overrides the default.
+            timeout_percentile: Percentile of past runtimes used for timeouts.
+            multiplier: Headroom applied on top of the percentile.
+            min_timeout: Lower bound for adaptive timeouts in seconds.
+            max_timeout: Upper bound for adaptive timeouts in seconds.
+        """
+        self.size = size
+        self.min_samples = min_samples
+        self.timeout_percentile = timeout_percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._by_kind: Dict[str, Deque[float]] = {}
+        self._by_user: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def record(self, user_id: str, kind: str, duration: float) -> None:
+        """Record the duration of a run.
+
+        Args:
+            user_id: The Discord user ID.
+            kind: The request kind (the model route name).
+            duration: The runtime in seconds.
+        """
+        self._by_kind.setdefault(kind, deque(maxlen=self.size)).append(duration)
+        self._by_user.setdefault((user_id, kind), deque(maxlen=self.size)).append(
+            duration
+        )
+
+    def _samples(self, user_id: str, kind: str) -> Optional[Deque[float]]:
+        """Get the most specific history with enough samples."""
+        user_samples = self._by_user.get((user_id, kind))
+        if user_samples is not None and len(user_samples) >= self.min_samples:
+            return user_samples
+        kind_samples = self._by_kind.get(kind)
+        if kind_samples is not None and len(kind_samples) >= self.min_samples:
+            return kind_samples
+        return None
+
+    def timeout_for(self, user_id: str, kind: str, default: float) -> float:
+        """Derive the timeout for a run from past runtimes.
+
+        Args:
+            user_id: The Discord user ID.
+            kind: The request kind.
+            default: The timeout to use while there is not enough history.
+
+        Returns:
+            The timeout in seconds.
+        """
+        samples = self._samples(user_id, kind)
+        if samples is None:
+            return default
+        timeout = percentile(samples, self.timeout_percentile) * self.multiplier
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def estimate(self, user_id: str, kind: str) -> Optional[float]:
+        """Estimate how long a run will take.
+
+        Args:
+            user_id: The Discord user ID.
+            kind: The request kind.
+
+        Returns:
+            The median runtime in seconds, or None without enough history.
+        """
+        samples = self._samples(user_id, kind)
+        if samples is None:
+            return None
+        return percentile(samples, 50)
@@ -0,0 +1,348 @@
+"""
+Sandbox Pool Module
+
+This module keeps sandbox runtimes for ``SANDBOX_RUNTIME_CONTAINER_IMAGE`` started
+ahead of time and leases them to OpenHands runs, so the cold start of a sandbox is
+paid in the background instead of on every task.
+
+Runtimes are created by a pluggable provider: ``docker`` pulls the runtime image
+ahead of the runs, while ``local`` uses plain directories and lets the pool run
+without Docker.
+
+The OpenHands CLI starts the sandbox container of a run itself and has no option to
+attach to a container started by someone else, so the ``docker`` provider only takes
+the image pull off the path of a run. It does not keep idle containers.
+"""
+
+import asyncio
+import logging
+import shutil
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.config import (
+    SANDBOX_POOL_MAX_USES,
+    SANDBOX_POOL_PROVIDER,
+    SANDBOX_POOL_SIZE,
+    SANDBOX_RUNTIME_CONTAINER_IMAGE,
+)
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+
+@dataclass
+class SandboxRuntime:
+    """A started sandbox runtime."""
+
+    id: str
+    # Environment variables that point an OpenHands run at this runtime
+    env: Dict[str, str] = field(default_factory=dict)
+    uses: int = 0
+
+
+class RuntimeProvider(ABC):
+    """Creates, resets and destroys sandbox runtimes."""
+
+    @abstractmethod
+    async def create(self, image: str) -> SandboxRuntime:
+        """Start a runtime from an image.
+
+        Args:
+            image: The sandbox image.
+
+        Returns:
+            The started runtime.
+        """
+
+    @abstractmethod
+    async def reset(self, runtime: SandboxRuntime) -> None:
+        """Return a runtime to a clean state between leases.
+
+        Args:
+            runtime: The runtime to reset.
+        """
+
+    @abstractmethod
+    async def destroy(self, runtime: SandboxRuntime) -> None:
+        """Stop a runtime and release its resources.
+
+        Args:
+            runtime: The runtime to destroy.
+        """
+
+
+class DockerRuntimeProvider(RuntimeProvider):
+    """Pulls the sandbox image ahead of the runs that start containers from it."""
+
+    def __init__(self) -> None:
+        """Initialize the provider."""
+        self._pulled: Dict[str, bool] = {}
+
+    async def _docker(self, *args: str) -> str:
+        """Run a Docker CLI command.
+
+        Returns:
+            The standard output of the command.
+
+        Raises:
+            RuntimeError: If the command fails.
+        """
+        process = await asyncio.create_subprocess_exec(
+            "docker",
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"docker {args[0]} failed: {stderr.decode('utf-8', errors='replace')}"
+            )
+        return stdout.decode("utf-8").strip()
+
+    async def create(self, image: str) -> SandboxRuntime:
+        """Make sure the image is pulled, so the run only starts its container."""
+        if not self._pulled.get(image):
+            await self._docker("pull", "--quiet", image)
+            self._pulled[image] = True
+        # OpenHands names and starts the container itself, so nothing is passed on
+        return SandboxRuntime(id=f"{image}#{uuid.uuid4().hex[:8]}")
+
+    async def reset(self, runtime: SandboxRuntime) -> None:
+        """Nothing to reset: the container of the last run was removed by OpenHands."""
+
+    async def destroy(self, runtime: SandboxRuntime) -> None:
+        """Nothing to destroy: the pulled image stays for the next runs."""
+
+
+class LocalRuntimeProvider(RuntimeProvider):
+    """Uses temporary directories as sandboxes, for development and tests."""
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        """Initialize the provider.
+
+        Args:
+            root: Directory the sandboxes are created in. Defaults to the system
+                temporary directory.
+        """
+        self.root = root
+
+    async def create(self, image: str) -> SandboxRuntime:
+        """Create an empty sandbox directory."""
+        path = await asyncio.to_thread(
+            tempfile.mkdtemp, prefix="openhands-sandbox-", dir=self.root
+        )
+        return SandboxRuntime(id=path, env={"SANDBOX_LOCAL_PATH": path})
+
+    async def reset(self, runtime: SandboxRuntime) -> None:
+        """Empty the sandbox directory."""
+
+        def clear() -> None:
+            for child in Path(runtime.id).iterdir():
+                if child.is_dir():
+                    shutil.rmtree(child)
+                else:
+                    child.unlink()
+
+        await asyncio.to_thread(clear)
+
+    async def destroy(self, runtime: SandboxRuntime) -> None:
+        """Delete the sandbox directory."""
+        await asyncio.to_thread(shutil.rmtree, runtime.id, True)
+
+
+def create_provider(name: str = SANDBOX_POOL_PROVIDER) -> RuntimeProvider:
+    """Create the runtime provider with the given name.
+
+    Args:
+        name: ``docker`` or ``local``.
+
+    Returns:
+        The provider.
+
+    Raises:
+        ValueError: If the provider is unknown.
+    """
+    if name == "docker":
+        return DockerRuntimeProvider()
+    if name == "local":
+        return LocalRuntimeProvider()
+    raise ValueError(f"Unknown sandbox provider: {name}")
+
+
+class SandboxPool:
+    """A pool of started sandbox runtimes leased to OpenHands runs."""
+
+    def __init__(
+        self,
+        provider: RuntimeProvider,
+        image: str = SANDBOX_RUNTIME_CONTAINER_IMAGE,
+        size: int = SANDBOX_POOL_SIZE,
+        max_uses: int = SANDBOX_POOL_MAX_USES,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            provider: The runtime provider.
+            image: The sandbox image.
+            size: Runtimes kept started and idle.
+            max_uses: Leases a runtime serves before it is replaced. Runtimes used
+                fewer times are reset and returned to the pool.
+        """
+        self.provider = provider
+        self.image = image
+        self.size = size
+        self.max_uses = max(max_uses, 1)
+        self.idle: "asyncio.Queue[SandboxRuntime]" = asyncio.Queue()
+        self.leased = 0
+        self.starting = 0
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.destroyed = 0
+        self.running = False
+        self._background: List[asyncio.Task] = []
+        # Destroys of returned runtimes, which are waited for rather than cancelled
+        self._destroying: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the runtimes of the pool."""
+        self.running = True
+        await asyncio.gather(*(self._replenish() for _ in range(self.size)))
+
+    async def stop(self) -> None:
+        """Destroy the idle runtimes and stop replenishing the pool.
+
+        Leased runtimes are destroyed when they are returned.
+        """
+        self.running = False
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+        await asyncio.gather(*self._destroying, return_exceptions=True)
+        while not self.idle.empty():
+            await self._destroy(self.idle.get_nowait())
+
+    async def _create(self) -> SandboxRuntime:
+        """Create a runtime through the provider."""
+        runtime = await self.provider.create(self.image)
+        self.created += 1
+        return runtime
+
+    async def _destroy(self, runtime: SandboxRuntime) -> None:
+        """Destroy a runtime, logging instead of raising on failure."""
+        try:
+            await self.provider.destroy(runtime)
+        except Exception as e:
+            logger.error(f"Failed to destroy sandbox {runtime.id}: {e}")
+        self.destroyed += 1
+
+    async def _replenish(self) -> None:
+        """Start one runtime and add it to the idle pool."""
+        self.starting += 1
+        try:
+            runtime = await self._create()
+        except Exception as e:
+            logger.error(f"Failed to start sandbox: {e}")
+            return
+        finally:
+            self.starting -= 1
+        # A returned runtime may have filled the pool in the meantime
+        if self.running and self.idle.qsize() < self.size:
+            self.idle.put_nowait(runtime)
+        else:
+            await self._destroy(runtime)
+
+    def _replenish_in_background(self) -> None:
+        """Top the pool up without delaying the caller."""
+        managed = self.idle.qsize() + self.starting + self.leased
+        if not self.running or managed >= self.size:
+            return
+        task = asyncio.create_task(self._replenish())
+        self._background.append(task)
+        task.add_done_callback(self._background.remove)
+
+    async def acquire(self) -> SandboxRuntime:
+        """Take a runtime out of the pool.
+
+        An idle runtime is used if there is one; otherwise a runtime is started on
+        demand so runs never wait for another run to finish.
+
+        Returns:
+            The runtime, which must be given back with ``release``.
+        """
+        if not self.idle.empty():
+            runtime = self.idle.get_nowait()
+            self.hits += 1
+        else:
+            runtime = await self._create()
+            self.misses += 1
+        self.leased += 1
+        return runtime
+
+    async def release(self, runtime: SandboxRuntime) -> None:
+        """Give back a runtime taken with ``acquire``.
+
+        Returned runtimes are reset for the next lease, or replaced once they reach
+        ``max_uses``.
+
+        Args:
+            runtime: The runtime.
+        """
+        self.leased -= 1
+        runtime.uses += 1
+        await self._release(runtime)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[SandboxRuntime]:
+        """Lease a runtime for the duration of a run."""
+        runtime = await self.acquire()
+        try:
+            yield runtime
+        finally:
+            await self.release(runtime)
+
+    async def _release(self, runtime: SandboxRuntime) -> None:
+        """Reset a returned runtime into the pool, or replace it."""
+        reusable = (
+            self.running
+            and runtime.uses < self.max_uses
+            and self.idle.qsize() < self.size
+        )
+        if reusable:
+            try:
+                await self.provider.reset(runtime)
+            except Exception as e:
+                logger.error(f"Failed to reset sandbox {runtime.id}: {e}")
+                reusable = False
+        # The pool may have been refilled or stopped while resetting
+        if reusable and self.running and self.idle.qsize() < self.size:
+            self.idle.put_nowait(runtime)
+            return
+        # The run is over, so its worker does not wait for the runtime to go away
+        task = asyncio.create_task(self._destroy(runtime))
+        self._destroying.append(task)
+        task.add_done_callback(self._destroying.remove)
+        self._replenish_in_background()
+
+    def stats(self) -> dict:
+        """Get the pool metrics.
+
+        Returns:
+            Idle and leased runtimes, lease hits and misses, and lifecycle counts.
+        """
+        return {
+            "idle": self.idle.qsize(),
+            "leased": self.leased,
+            "starting": self.starting,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "destroyed": self.destroyed,
+        }
@@ -0,0 +1,177 @@
+"""
+Spool Module
+
+This module streams the output of OpenHands processes into per-task spool files.
+
+Only a capped tail of each stream stays in memory; the full log lives on disk and is
+read back in ranges when a user asks for it.
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from src.config import SPOOL_BUFFER_BYTES, SPOOL_MAX_BYTES
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+
+class SpoolWriter:
+    """Write a process stream to a spool file while keeping its tail in memory.
+
+    Output is buffered in memory and written to the file on a worker thread, so
+    spooling never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path],
+        tail_bytes: int,
+        max_bytes: int = SPOOL_MAX_BYTES,
+        buffer_bytes: int = SPOOL_BUFFER_BYTES,
+    ) -> None:
+        """Initialize the writer.
+
+        Args:
+            path: The spool file, or None to keep only the tail.
+            tail_bytes: Bytes of the most recent output kept in memory.
+            max_bytes: Bytes written to the spool file before the rest is dropped.
+                Zero means unlimited.
+            buffer_bytes: Bytes collected in memory before they are written out.
+        """
+        self.path = path
+        self.tail_bytes = tail_bytes
+        self.max_bytes = max_bytes
+        self.buffer_bytes = buffer_bytes
+        self.size = 0
+        self.written = 0
+        self._tail = bytearray()
+        self._pending = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self._flushing: Optional["asyncio.Future[None]"] = None
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk of output.
+
+        Must be called on the event loop.
+
+        Args:
+            chunk: The bytes read from the stream.
+        """
+        self.size += len(chunk)
+        self._tail.extend(chunk)
+        del self._tail[: max(len(self._tail) - self.tail_bytes, 0)]
+        if self.path is None:
+            return
+        room = len(chunk)
+        if self.max_bytes > 0:
+            room = min(room, self.max_bytes - self.written)
+        if room > 0:
+            self._pending.extend(chunk[:room])
+            self.written += room
+        self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        """Hand a full buffer to a worker thread, one write at a time."""
+        if self._flushing is not None or len(self._pending) < self.buffer_bytes:
+            return
+        data = bytes(self._pending)
+        self._pending.clear()
+        self._flushing = asyncio.get_running_loop().run_in_executor(
+            None, self._write_file, data
+        )
+        self._flushing.add_done_callback(self._flushed)
+
+    def _flushed(self, future: "asyncio.Future[None]") -> None:
+        """Start the next write once the last one is done."""
+        self._flushing = None
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to write spool {self.path}: {future.exception()}")
+        self._flush_if_full()
+
+    def _write_file(self, data: bytes) -> None:
+        """Write to the spool file, creating it on the first write."""
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "wb")
+        self._file.write(data)
+        # Visible to log readers while the run is still going
+        self._file.flush()
+
+    @property
+    def tail(self) -> str:
+        """The most recent output as text."""
+        return self._tail.decode("utf-8", errors="replace")
+
+    @property
+    def truncated(self) -> bool:
+        """Whether output was dropped because the spool file reached its cap."""
+        return self.written < self.size
+
+    async def close(self, discard: bool = False) -> None:
+        """Write out the rest of the output and close the spool file.
+
+        Spools that stayed empty are removed.
+
+        Args:
+            discard: Whether to remove the spool file anyway, e.g. because the run
+                failed and nothing will refer to it.
+        """
+        # A finished write may start the next one before this wakes up
+        while self._flushing is not None:
+            await asyncio.wait([self._flushing])
+        data = bytes(self._pending)
+        self._pending.clear()
+        await asyncio.to_thread(self._finish, data, discard)
+        if discard or self.written == 0:
+            self.path = None
+
+    def _finish(self, data: bytes, discard: bool) -> None:
+        """Write the last output, close the file and remove it if unwanted."""
+        if self.path is None:
+            return
+        if data and not discard:
+            self._write_file(data)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if discard or self.written == 0:
+            remove_spool(str(self.path))
+
+
+def remove_spool(path: str) -> None:
+    """Delete a spool file, ignoring files that are already gone.
+
+    Args:
+        path: The spool file.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def read_range(path: Path, start: int, length: int) -> bytes:
+    """Read part of a spool file.
+
+    Args:
+        path: The spool file.
+        start: Offset of the first byte. Negative offsets count from the end.
+        length: The maximum number of bytes to read.
+
+    Returns:
+        The bytes read, empty if the file is missing.
+    """
+    try:
+        with open(path, "rb") as f:
+            if start < 0:
+                f.seek(0, os.SEEK_END)
+                start = max(f.tell() + start, 0)
+            f.seek(start)
+            return f.read(length)
+    except OSError:
+        return b""
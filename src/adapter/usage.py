@@ -0,0 +1,308 @@
+"""
+Usage Accounting Module
+
+This module sums what every user and guild consumes, runs, wall time, CPU time,
+output volume and the LLM tokens reported by the CLI, over a rolling window, and
+rejects new work from users or guilds that used up their quota.
+
+Usage is kept per subject as a short ring of fixed-width time buckets, so memory
+stays bounded however many runs a subject makes.
+"""
+
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from src.adapter.admission import AdmissionRejected
+from src.config import (
+    GUILD_QUOTA_CPU_SECONDS,
+    GUILD_QUOTA_OUTPUT_BYTES,
+    GUILD_QUOTA_TOKENS,
+    GUILD_QUOTA_WALL_SECONDS,
+    USAGE_BUCKET_SECONDS,
+    USAGE_WINDOW_SECONDS,
+    USER_QUOTA_CPU_SECONDS,
+    USER_QUOTA_OUTPUT_BYTES,
+    USER_QUOTA_TOKENS,
+    USER_QUOTA_WALL_SECONDS,
+)
+
+# Subjects usage is accounted to
+USER = "user"
+GUILD = "guild"
+
+USAGE_FIELDS = ("runs", "wall_seconds", "cpu_seconds", "output_bytes", "tokens")
+
+# How quotas are named to users
+_QUOTA_LABELS = {
+    "wall_seconds": "runtime",
+    "cpu_seconds": "CPU time",
+    "output_bytes": "output",
+    "tokens": "LLM token",
+}
+
+
+class QuotaExceeded(AdmissionRejected):
+    """Raised when a user or guild has used up a quota."""
+
+
+@dataclass(frozen=True)
+class UsageQuota:
+    """Usage allowed per window. Zero means unlimited."""
+
+    wall_seconds: float = 0
+    cpu_seconds: float = 0
+    output_bytes: float = 0
+    tokens: float = 0
+
+    @classmethod
+    def for_users(cls) -> "UsageQuota":
+        """Build the per-user quota described by the environment configuration."""
+        return cls(
+            USER_QUOTA_WALL_SECONDS,
+            USER_QUOTA_CPU_SECONDS,
+            USER_QUOTA_OUTPUT_BYTES,
+            USER_QUOTA_TOKENS,
+        )
+
+    @classmethod
+    def for_guilds(cls) -> "UsageQuota":
+        """Build the per-guild quota described by the environment configuration."""
+        return cls(
+            GUILD_QUOTA_WALL_SECONDS,
+            GUILD_QUOTA_CPU_SECONDS,
+            GUILD_QUOTA_OUTPUT_BYTES,
+            GUILD_QUOTA_TOKENS,
+        )
+
+    def exceeded(self, totals: Dict[str, float]) -> Optional[str]:
+        """Find a quota the totals have used up.
+
+        Args:
+            totals: Usage over the window.
+
+        Returns:
+            The name of the first used-up field, or None.
+        """
+        for name in _QUOTA_LABELS:
+            limit = getattr(self, name)
+            if limit > 0 and totals.get(name, 0) >= limit:
+                return name
+        return None
+
+
+class UsageWindow:
+    """Usage of one subject, summed per bucket."""
+
+    __slots__ = ("buckets",)
+
+    def __init__(self) -> None:
+        """Initialize the window."""
+        # Each bucket holds its index followed by the sums of USAGE_FIELDS
+        self.buckets: Deque[array] = deque()
+
+    def prune(self, oldest: int) -> None:
+        """Drop the buckets older than the window.
+
+        Args:
+            oldest: Index of the oldest bucket still in the window.
+        """
+        while self.buckets and self.buckets[0][0] < oldest:
+            self.buckets.popleft()
+
+    def add(self, bucket: int, usage: Dict[str, float]) -> None:
+        """Add usage to a bucket.
+
+        Args:
+            bucket: Index of the current bucket.
+            usage: Amounts per field.
+        """
+        if not self.buckets or self.buckets[-1][0] != bucket:
+            self.buckets.append(array("d", [bucket] + [0.0] * len(USAGE_FIELDS)))
+        sums = self.buckets[-1]
+        for i, name in enumerate(USAGE_FIELDS, start=1):
+            sums[i] += usage.get(name, 0)
+
+    def totals(self) -> Dict[str, float]:
+        """Sum the buckets.
+
+        Returns:
+            Amounts per field.
+        """
+        return {
+            name: sum(sums[i] for sums in self.buckets)
+            for i, name in enumerate(USAGE_FIELDS, start=1)
+        }
+
+
+class UsageTracker:
+    """Usage per user and guild over a rolling window, with quotas."""
+
+    def __init__(
+        self,
+        window_seconds: int = USAGE_WINDOW_SECONDS,
+        bucket_seconds: int = USAGE_BUCKET_SECONDS,
+        user_quota: Optional[UsageQuota] = None,
+        guild_quota: Optional[UsageQuota] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the tracker.
+
+        Args:
+            window_seconds: Length of the rolling window.
+            bucket_seconds: Width of a bucket; usage expires a bucket at a time.
+            user_quota: Usage allowed per user. Defaults to the configured quota.
+            guild_quota: Usage allowed per guild. Defaults to the configured quota.
+            clock: Function returning the current time in seconds. Wall-clock time,
+                so windows are meaningful across restarts.
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = max(bucket_seconds, 1)
+        self.bucket_count = max(window_seconds // self.bucket_seconds, 1)
+        self.quotas = {
+            USER: user_quota or UsageQuota.for_users(),
+            GUILD: guild_quota or UsageQuota.for_guilds(),
+        }
+        self.clock = clock
+        self.windows: Dict[Tuple[str, str], UsageWindow] = {}
+        self.rejections: Dict[str, int] = {USER: 0, GUILD: 0}
+
+    def _oldest_bucket(self) -> int:
+        """Get the index of the oldest bucket in the window."""
+        return int(self.clock() // self.bucket_seconds) - self.bucket_count + 1
+
+    def record(
+        self, user_id: str, guild_id: Optional[str], usage: Dict[str, float]
+    ) -> None:
+        """Account usage to a user and their guild.
+
+        Args:
+            user_id: The Discord user ID.
+            guild_id: The Discord guild ID, or None for DMs.
+            usage: Amounts per field of ``USAGE_FIELDS``.
+        """
+        bucket = int(self.clock() // self.bucket_seconds)
+        subjects = [(USER, user_id)]
+        if guild_id is not None:
+            subjects.append((GUILD, guild_id))
+        for subject in subjects:
+            window = self.windows.setdefault(subject, UsageWindow())
+            window.prune(bucket - self.bucket_count + 1)
+            window.add(bucket, usage)
+
+    def totals(self, scope: str, subject_id: str) -> Dict[str, float]:
+        """Get the usage of a user or guild over the window.
+
+        Args:
+            scope: ``user`` or ``guild``.
+            subject_id: The Discord user or guild ID.
+
+        Returns:
+            Amounts per field, zero for unknown subjects.
+        """
+        window = self.windows.get((scope, subject_id))
+        if window is None:
+            return {name: 0.0 for name in USAGE_FIELDS}
+        window.prune(self._oldest_bucket())
+        return window.totals()
+
+    def check(self, user_id: str, guild_id: Optional[str] = None) -> None:
+        """Check that a user and their guild may start new work.
+
+        Args:
+            user_id: The Discord user ID.
+            guild_id: The Discord guild ID, or None for DMs.
+
+        Raises:
+            QuotaExceeded: If the user or guild has used up a quota.
+        """
+        hours = self.window_seconds / 3600
+        period = f"{hours:g} hours" if hours != 1 else "hour"
+        exceeded = self.quotas[USER].exceeded(self.totals(USER, user_id))
+        if exceeded is not None:
+            self.rejections[USER] += 1
+            raise QuotaExceeded(
+                f"You have used your {_QUOTA_LABELS[exceeded]} quota for the last "
+                f"{period}. Please try again later."
+            )
+        if guild_id is None:
+            return
+        exceeded = self.quotas[GUILD].exceeded(self.totals(GUILD, guild_id))
+        if exceeded is not None:
+            self.rejections[GUILD] += 1
+            raise QuotaExceeded(
+                f"This server has used its {_QUOTA_LABELS[exceeded]} quota for the "
+                f"last {period}. Please try again later."
+            )
+
+    def top(
+        self, scope: str, field: str = "wall_seconds", limit: int = 10
+    ) -> List[Tuple[str, Dict[str, float]]]:
+        """Get the users or guilds that used the most over the window.
+
+        Subjects without usage left in the window are forgotten.
+
+        Args:
+            scope: ``user`` or ``guild``.
+            field: The field to rank by.
+            limit: The number of subjects returned.
+
+        Returns:
+            Subject IDs and their totals, highest first.
+        """
+        self.prune()
+        ranked = [
+            (subject_id, window.totals())
+            for (window_scope, subject_id), window in self.windows.items()
+            if window_scope == scope
+        ]
+        ranked.sort(key=lambda item: item[1][field], reverse=True)
+        return ranked[:limit]
+
+    def prune(self) -> int:
+        """Forget the users and guilds without usage left in the window.
+
+        Called periodically, so subjects that stop using the bot do not pile up.
+
+        Returns:
+            The number of subjects forgotten.
+        """
+        oldest = self._oldest_bucket()
+        expired = []
+        for key, window in self.windows.items():
+            window.prune(oldest)
+            if not window.buckets:
+                expired.append(key)
+        for key in expired:
+            del self.windows[key]
+        return len(expired)
+
+    def report(self, limit: int = 10) -> dict:
+        """Get the usage report shown to admins.
+
+        Args:
+            limit: Users and guilds listed.
+
+        Returns:
+            The window length and the top users and guilds by wall time.
+        """
+        return {
+            "window_seconds": self.window_seconds,
+            "users": self.top(USER, limit=limit),
+            "guilds": self.top(GUILD, limit=limit),
+        }
+
+    def stats(self) -> dict:
+        """Get the accounting metrics.
+
+        Returns:
+            Tracked users and guilds, and quota rejections per scope.
+        """
+        scopes = [scope for scope, _ in self.windows]
+        return {
+            "users": scopes.count(USER),
+            "guilds": scopes.count(GUILD),
+            "rejections": dict(self.rejections),
+        }
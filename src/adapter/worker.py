@@ -0,0 +1,152 @@
+"""
+Remote Worker Module
+
+This module serves OpenHands runs over HTTP for the ``remote`` execution backend.
+
+Run it on the host that should do the work with ``python -m src.adapter.worker``. It
+runs every request with a local backend and streams the output back as JSON-lines
+frames while the run is in progress.
+
+Anyone who can reach a worker can run OpenHands on its host, so it listens on the
+loopback address unless told otherwise, needs ``OPENHANDS_REMOTE_TOKEN`` on any other
+address, and passes on only the variables of a request that configure OpenHands.
+"""
+
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import logging
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+from src.adapter.backends import (
+    ExecutionBackend,
+    ExecutionRequest,
+    SubprocessBackend,
+    outcome_frame,
+    output_frame,
+)
+from src.config import OPENHANDS_REMOTE_TOKEN, OPENHANDS_WORKDIR
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Variables a request may set for its run: the LLM and sandbox settings of
+# OpenHands, the output format the adapter parses and the trace context
+ALLOWED_ENV_PREFIXES = ("LLM_", "SANDBOX_")
+ALLOWED_ENV_NAMES = ("OPENHANDS_OUTPUT_FORMAT", "TRACEPARENT")
+
+
+def is_allowed_env(name: str) -> bool:
+    """Check whether a request may set a variable for its run."""
+    return name in ALLOWED_ENV_NAMES or name.startswith(ALLOWED_ENV_PREFIXES)
+
+
+def is_loopback(host: str) -> bool:
+    """Check whether a listen address is only reachable from this host."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def create_worker_app(
+    backend: ExecutionBackend,
+    token: Optional[str] = OPENHANDS_REMOTE_TOKEN,
+    workdir: str = OPENHANDS_WORKDIR,
+) -> web.Application:
+    """Build the worker application.
+
+    Args:
+        backend: The backend running the requests on this host.
+        token: Shared secret clients must send as a bearer token, or None to
+            accept every client.
+        workdir: Directory every requested workspace must be inside.
+
+    Returns:
+        The application.
+    """
+    root = Path(workdir).resolve()
+
+    async def run(request: web.Request) -> web.StreamResponse:
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            raise web.HTTPUnauthorized(text="Invalid token")
+        try:
+            body = await request.json()
+            execution = ExecutionRequest(
+                prompt=str(body["prompt"]),
+                workspace=str(body["workspace"]),
+                env={str(k): str(v) for k, v in body.get("env", {}).items()},
+                timeout=float(body["timeout"]),
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise web.HTTPBadRequest(text=f"Invalid run request: {e}")
+        refused = sorted(name for name in execution.env if not is_allowed_env(name))
+        if refused:
+            raise web.HTTPBadRequest(
+                text=f"Variables not allowed: {', '.join(refused)}"
+            )
+        if not Path(execution.workspace).resolve().is_relative_to(root):
+            raise web.HTTPBadRequest(text="Workspace is outside the worker directory")
+
+        response = web.StreamResponse()
+        response.content_type = "application/x-ndjson"
+        await response.prepare(request)
+        # Output is produced by callbacks, so it is handed to the writer in order
+        frames: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+        async def write_frames() -> None:
+            while True:
+                frame = await frames.get()
+                if frame is None:
+                    return
+                await response.write(frame)
+
+        writer = asyncio.create_task(write_frames())
+        try:
+            outcome = await backend.run(
+                execution,
+                lambda chunk: frames.put_nowait(output_frame("stdout", chunk)),
+                lambda chunk: frames.put_nowait(output_frame("stderr", chunk)),
+            )
+            frames.put_nowait(outcome_frame(outcome))
+        finally:
+            frames.put_nowait(None)
+            await writer
+        await response.write_eof()
+        return response
+
+    async def stop_backend(app: web.Application) -> None:
+        await backend.stop()
+
+    app = web.Application()
+    app.router.add_post("/run", run)
+    app.on_cleanup.append(stop_backend)
+    return app
+
+
+def main() -> None:
+    """Serve runs until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve OpenHands runs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    if not OPENHANDS_REMOTE_TOKEN and not is_loopback(args.host):
+        parser.error(
+            f"refusing to listen on {args.host} without OPENHANDS_REMOTE_TOKEN"
+        )
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    web.run_app(create_worker_app(SubprocessBackend()), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Workspace Module
+
+This module tracks which files an OpenHands run changed in a user workspace.
+
+Each workspace keeps an index of ``(mtime_ns, size, sha256)`` per file. Snapshots only
+stat the tree; files are hashed only when their stat changed during a run, so the
+cost of a snapshot grows with the size of the tree listing, not its contents.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config import WORKSPACE_MANIFEST_MAX_ENTRIES, WORKSPACE_SNAPSHOT_IGNORE
+
+# Bytes hashed at a time
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (mtime_ns, size, sha256 or None if never hashed)
+IndexEntry = Tuple[int, int, Optional[str]]
+
+
+def hash_file(path: Path) -> str:
+    """Hash the contents of a file.
+
+    Args:
+        path: The file path.
+
+    Returns:
+        The hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WorkspaceIndex:
+    """Stat index of a workspace used to compute change manifests."""
+
+    def __init__(
+        self,
+        root: Path,
+        ignore: Iterable[str] = WORKSPACE_SNAPSHOT_IGNORE,
+        max_entries: int = WORKSPACE_MANIFEST_MAX_ENTRIES,
+    ) -> None:
+        """Initialize the index.
+
+        Args:
+            root: The workspace directory.
+            ignore: Directory names that are never scanned.
+            max_entries: Entries kept per change list in a manifest.
+        """
+        self.root = root
+        self.ignore = frozenset(ignore)
+        self.max_entries = max_entries
+        self.entries: Dict[str, IndexEntry] = {}
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """Stat every file in the workspace without reading it.
+
+        Returns:
+            A mapping of relative POSIX paths to ``(mtime_ns, size)``.
+        """
+        found: Dict[str, Tuple[int, int]] = {}
+        if not self.root.is_dir():
+            return found
+
+        pending = [str(self.root)]
+        root_len = len(str(self.root)) + 1
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.ignore:
+                                pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            relpath = entry.path[root_len:].replace(os.sep, "/")
+                            found[relpath] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                # Directories can disappear while a run is still writing
+                continue
+        return found
+
+    def refresh(self, hash_changes: bool = True) -> dict:
+        """Rescan the workspace and compare it with the previous snapshot.
+
+        Args:
+            hash_changes: Hash new and changed files to confirm content changes.
+                Baseline snapshots taken before a run skip hashing.
+
+        Returns:
+            The change manifest with ``added``, ``modified`` and ``deleted`` lists.
+        """
+        current = self.scan()
+        previous = self.entries
+        entries: Dict[str, IndexEntry] = {}
+        added: List[dict] = []
+        modified: List[dict] = []
+
+        for relpath, (mtime_ns, size) in current.items():
+            old = previous.get(relpath)
+            if old is not None and old[0] == mtime_ns and old[1] == size:
+                entries[relpath] = old
+                continue
+
+            digest: Optional[str] = None
+            if hash_changes:
+                try:
+                    digest = hash_file(self.root / relpath)
+                except OSError:
+                    continue
+            entries[relpath] = (mtime_ns, size, digest)
+            if not hash_changes:
+                continue
+
+            change = {"path": relpath, "size": size, "sha256": digest}
+            if old is None:
+                added.append(change)
+            elif old[2] is None or old[2] != digest:
+                # Without an earlier hash a stat change counts as a modification
+                modified.append(change)
+
+        deleted = sorted(relpath for relpath in previous if relpath not in current)
+        self.entries = entries
+
+        return {
+            "added": sorted(added, key=lambda c: c["path"])[: self.max_entries],
+            "modified": sorted(modified, key=lambda c: c["path"])[: self.max_entries],
+            "deleted": deleted[: self.max_entries] if hash_changes else [],
+            "total": len(added) + len(modified) + (len(deleted) if hash_changes else 0),
+        }
+
+    def resolve(self, relpath: str) -> Optional[Path]:
+        """Resolve a manifest path to a file inside the workspace.
+
+        Args:
+            relpath: The relative path from a manifest.
+
+        Returns:
+            The file path, or None if it escapes the workspace or does not exist.
+        """
+        root = self.root.resolve()
+        path = (root / relpath).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path
@@ -2,28 +2,39 @@
 Discord Bot Module
 
 This module provides the Discord bot for interacting with OpenHands.
+
+The bot is built by ``create_bot`` from an injected configuration, adapter and
+health check server, so several bots can run in one process, e.g. in parallel tests.
 """
 
 import asyncio
-import http.server
-import json
+import io
 import logging
-import socketserver
-import threading
-from typing import Any, Callable, Coroutine, List, Optional, Type, Union
+import signal
+from typing import Any, List, Optional, Tuple, Union
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from src.adapter.model_router import LONG_TASK, SHORT_TASK
 from src.adapter.openhands_adapter import OpenHandsAdapter
-from src.config import COMMAND_PREFIX, DISCORD_TOKEN, OPENHANDS_CHAT_CHANNEL, Config
+from src.adapter.preparation import TaskPreparation
+from src.adapter.spool import read_range
+from src.bot.health import HealthServer
+from src.bot.traffic import CHAT, TrafficRecorder
+from src.config import ARTIFACT_MAX_BYTES, Config, validate_config
 from src.utils.formatter import (
+    RenderCache,
+    format_batch_status,
     format_help,
+    format_log,
     format_result,
     format_status,
     format_tasks_list,
+    format_usage,
 )
+from src.utils.rate_limiter import RateLimiter
 
 # Configure logging
 logging.basicConfig(
@@ -32,301 +43,1172 @@ logging.basicConfig(
 )
 logger = logging.getLogger("OpenHandsDiscordAdapter")
 
-# Set up Discord bot
-intents = discord.Intents.default()
-intents.message_content = True
+# Largest task list accepted as a batch attachment
+BATCH_FILE_MAX_BYTES = 64 * 1024
 
-intents.messages = True
 
-# Create OpenHands adapter
+def default_intents() -> discord.Intents:
+    """Get the gateway intents the bot needs.
 
-openhands_adapter = OpenHandsAdapter()
+    Returns:
+        The default intents plus message content and messages.
+    """
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.messages = True
+    return intents
 
 
-class OpenHandsBot(commands.Bot):
-    """Discord bot for interacting with OpenHands."""
+class RateLimited(commands.CheckFailure):
+    """Raised when a prefix command exceeds the rate limit."""
+
+    def __init__(self, retry_after: float) -> None:
+        """Initialize the error.
 
-    def __init__(self, config: Config) -> None:
-        """Initialize the bot."""
+        Args:
+            retry_after: Seconds until the request would be allowed.
+        """
         super().__init__(
-            command_prefix=COMMAND_PREFIX, intents=intents, help_command=None
+            f"You're sending requests too quickly. "
+            f"Please try again in {retry_after:.0f}s."
         )
-        self.config = config
-
-        # Start health check server
-        self.start_health_check_server()
-
-    def start_health_check_server(self) -> None:
-        """Start a simple HTTP server for health checks."""
-
-        class HealthCheckHandler(http.server.SimpleHTTPRequestHandler):
-            def do_GET(self) -> None:
-                """Handle GET requests."""
-                if self.path == "/health":
-                    self.send_response(200)
-                    self.send_header("Content-type", "application/json")
-                    self.end_headers()
-                    health_data = {
-                        "status": "ok",
-                        "version": "1.0.0",
-                        "discord_connected": True,
-                    }
-                    self.wfile.write(json.dumps(health_data).encode())
-                else:
-                    self.send_response(404)
-                    self.send_header("Content-type", "application/json")
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"error": "Not found"}).encode())
-
-            def log_message(self, format: str, *args: Any) -> None:
-                """Suppress logging for health check requests."""
-                pass
-
-        def run_server() -> None:
-            """Run the health check server."""
-            with socketserver.TCPServer(("", 8000), HealthCheckHandler) as httpd:
-                httpd.serve_forever()
-
-        # Start the health check server in a separate thread
-        health_thread = threading.Thread(target=run_server, daemon=True)
-        health_thread.start()
-        logger.info("Health check server started on port 8000")
-
-
-# Initialize the bot
-bot = OpenHandsBot(Config())
-
-
-@bot.event
-async def on_ready() -> None:
-    """Event handler for when the bot is ready."""
-    if bot.user is not None:
-        logger.info(f"Logged in as {bot.user.name} ({bot.user.id})")
-    else:
-        logger.info("Logged in but user is None")
-    logger.info(f"Command prefix: {COMMAND_PREFIX}")
+        self.retry_after = retry_after
 
-    # Register slash commands
-    try:
-        synced = await bot.tree.sync()
-        logger.info(f"Synced {len(synced)} slash command(s)")
-    except Exception as e:
-        logger.error(f"Failed to sync slash commands: {e}")
 
-    # Start the OpenHands adapter
-    await openhands_adapter.start()
+class RateLimitedCommandTree(app_commands.CommandTree):
+    """Command tree that applies the bot rate limits to slash commands."""
 
-    # Set bot status
-    await bot.change_presence(
-        activity=discord.Activity(
-            type=discord.ActivityType.listening, name=f"{COMMAND_PREFIX}help | /help"
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Reject interactions over the rate limit with an ephemeral notice."""
+        check_rate_limit = getattr(self.client, "check_rate_limit", None)
+        if check_rate_limit is None:
+            return True
+        retry_after = check_rate_limit(
+            interaction.user, interaction.channel, interaction.guild
         )
-    )
+        if retry_after > 0:
+            await interaction.response.send_message(
+                f"🐢 You're sending requests too quickly. "
+                f"Please try again in {retry_after:.0f}s.",
+                ephemeral=True,
+            )
+            return False
+        return True
 
 
-@bot.event
-async def on_message(message: discord.Message) -> None:
-    """Event handler for when a message is received."""
-    # Ignore messages from the bot itself
-    if message.author == bot.user:
-        return
-
-    # Process DMs or messages in the OpenHands chat channel
-    if isinstance(message.channel, discord.DMChannel) or (
-        isinstance(message.channel, discord.TextChannel)
-        and message.channel.name == OPENHANDS_CHAT_CHANNEL
-    ):
-        # Only process messages that don't start with the command prefix
-        if not message.content.startswith(str(bot.command_prefix)):
-            async with message.channel.typing():
-                # Send a thinking message
-                thinking_msg = await message.channel.send("🤔 Thinking...")
-
-                try:
-                    # Get response from OpenHands
-                    response = await openhands_adapter.chat(
-                        str(message.author.id), message.content
-                    )
+def thread_name(text: str) -> str:
+    """Build a Discord thread name from the message that opens it.
+
+    Args:
+        text: The message or task description.
 
-                    # Delete thinking message
-                    await thinking_msg.delete()
+    Returns:
+        A name within Discord's 100 character limit.
+    """
+    name = " ".join(text.split()) or "OpenHands"
+    return name if len(name) <= 90 else name[:89] + "…"
 
-                    # Send response
-                    await message.channel.send(response)
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}")
-                    await thinking_msg.edit(content=f"❌ Error: {str(e)}")
 
-            # Don't process commands
-            return
+def guild_id_of(
+    source: Union[commands.Context, discord.Interaction, discord.Message]
+) -> Optional[str]:
+    """Get the ID of the guild a command or message came from.
+
+    Args:
+        source: The command context, interaction or message.
+
+    Returns:
+        The guild ID, or None for DMs. Usage is accounted to it.
+    """
+    return str(source.guild.id) if source.guild else None
 
-    # Process commands
-    await bot.process_commands(message)
 
+def parse_task_options(description: str) -> Tuple[Optional[str], bool, str]:
+    """Split leading ``--model <name>`` and ``--thread`` options off a description.
 
-@bot.command(name="task")
-async def create_task(ctx: commands.Context, *, description: str) -> None:
-    """Create a new task.
+    Args:
+        description: The raw task description.
+
+    Returns:
+        The requested model (or None), whether to open a thread, and the
+        remaining description.
+    """
+    model = None
+    use_thread = False
+    while True:
+        parts = description.split(maxsplit=1)
+        if len(parts) == 2 and parts[0] == "--thread":
+            use_thread = True
+            description = parts[1]
+            continue
+        parts = description.split(maxsplit=2)
+        if len(parts) == 3 and parts[0] == "--model":
+            model = parts[1]
+            description = parts[2]
+            continue
+        return model, use_thread, description
+
+
+def parse_batch_descriptions(text: str) -> List[str]:
+    """Split a batch submission into task descriptions, one per line.
+
+    Blank lines and lines starting with ``#`` are skipped.
 
     Args:
-        description: The task description.
+        text: The submitted text.
+
+    Returns:
+        The task descriptions.
     """
-    # Send a thinking message
-    thinking_msg = await ctx.send("⏳ Creating task...")
+    descriptions = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            descriptions.append(line)
+    return descriptions
+
+
+async def read_batch_attachment(attachment: discord.Attachment) -> str:
+    """Read the task list attached to a batch command.
+
+    Args:
+        attachment: The attached text file.
+
+    Returns:
+        The text of the file.
 
+    Raises:
+        ValueError: If the file is too large or not text.
+    """
+    if attachment.size > BATCH_FILE_MAX_BYTES:
+        raise ValueError(
+            f"The task list is too large (at most {BATCH_FILE_MAX_BYTES // 1024} KiB)"
+        )
     try:
-        # Create task
-        result = await openhands_adapter.create_task(str(ctx.author.id), description)
+        return (await attachment.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("The task list must be a UTF-8 text file")
+
+
+def check_batch_size(descriptions: List[str], max_tasks: int) -> None:
+    """Check that a batch has between one and ``max_tasks`` tasks.
+
+    Args:
+        descriptions: The task descriptions.
+        max_tasks: The most tasks a batch may have.
 
-        # Send response
-        await thinking_msg.edit(
-            content=f"✅ Task created with ID: `{result['task_id']}`\n"
-            f"Use `{COMMAND_PREFIX}status {result['task_id']}` to check the status."
+    Raises:
+        ValueError: If the batch is empty or too large.
+    """
+    if not descriptions:
+        raise ValueError("No tasks found. Put one task description per line.")
+    if len(descriptions) > max_tasks:
+        raise ValueError(
+            f"A batch can have at most {max_tasks} tasks, " f"got {len(descriptions)}."
         )
-    except Exception as e:
-        logger.error(f"Error creating task: {e}")
-        await thinking_msg.edit(content=f"❌ Error creating task: {str(e)}")
 
 
-@bot.command(name="status")
-async def check_status(ctx: commands.Context, task_id: Optional[str] = None) -> None:
-    """Check task status.
+def format_batch_created(result: dict, command_prefix: str) -> str:
+    """Format the reply to a created batch.
 
     Args:
-        task_id: The task ID. If not provided, shows all tasks.
+        result: The result of ``OpenHandsAdapter.create_tasks``.
+        command_prefix: The prefix of the bot commands.
+
+    Returns:
+        The reply listing the IDs of the created tasks.
     """
-    # Send a thinking message
-    thinking_msg = await ctx.send("⏳ Checking status...")
+    lines = [f"✅ Batch created with ID: `{result['batch_id']}`"]
+    for task in result["tasks"]:
+        lines.append(
+            f"`{task['task_id']}` · `{task['model']}` · "
+            f"position {task['queue_position']}"
+        )
+    lines.append(
+        f"Use `{command_prefix}status {result['batch_id']}` to check the status. "
+        "I'll notify you once every task is complete."
+    )
+    return "\n".join(lines)
 
-    try:
-        if task_id:
-            # Get status of specific task
-            status = await openhands_adapter.get_task_status(task_id)
-            embed = format_status(status)
-        else:
-            # Get all tasks for user
-            tasks = await openhands_adapter.get_user_tasks(str(ctx.author.id))
-            embed = format_tasks_list(tasks)
 
-        # Send response
-        await thinking_msg.delete()
-        await ctx.send(embed=embed)
-    except Exception as e:
-        logger.error(f"Error checking status: {e}")
-        await thinking_msg.edit(content=f"❌ Error checking status: {str(e)}")
+def build_artifact_message(artifacts: dict) -> Tuple[str, List[discord.File]]:
+    """Build the message and attachments for the files a task changed.
 
+    Args:
+        artifacts: The result of ``OpenHandsAdapter.get_task_artifacts``.
 
-@bot.command(name="help")
-async def show_help(ctx: commands.Context) -> None:
-    """Show help information."""
-    await ctx.send(format_help(COMMAND_PREFIX))
+    Returns:
+        The message text and the files to attach.
+    """
+    files = [
+        discord.File(str(path), filename=relpath.replace("/", "__"))
+        for relpath, path in artifacts["files"]
+    ]
+    content = f"📎 {len(files)} changed file(s)"
+    if artifacts["skipped"]:
+        skipped = ", ".join(f"`{relpath}`" for relpath in artifacts["skipped"][:10])
+        content += f"\nSkipped (missing, too large or over the limit): {skipped}"
+    return content, files
 
 
-@bot.event
-async def on_command_error(ctx: commands.Context, error: commands.CommandError) -> None:
-    """Event handler for command errors."""
-    if isinstance(error, commands.MissingRequiredArgument):
-        if ctx.command and ctx.command.name == "task":
-            await ctx.send(
-                f"❌ Error: Missing task description\n"
-                f"Usage: `{COMMAND_PREFIX}task <description>`"
-            )
-        else:
-            await ctx.send(f"❌ Error: {str(error)}")
-    elif isinstance(error, commands.CommandNotFound):
-        await ctx.send(
-            f"❌ Command not found. Use `{COMMAND_PREFIX}help` "
-            "to see available commands."
-        )
+async def build_log_message(log: dict) -> Tuple[discord.Embed, discord.File]:
+    """Build the embed and attachment for the spooled output of a task.
+
+    Spools within the attachment limit are sent straight from disk; larger ones
+    are cut to their last ``ARTIFACT_MAX_BYTES``.
+
+    Args:
+        log: The result of ``OpenHandsAdapter.get_task_log``.
+
+    Returns:
+        The embed showing the tail and the log file to attach.
+    """
+    filename = f"{log['task_id']}.{log['stream']}.log"
+    if log["size"] <= ARTIFACT_MAX_BYTES:
+        file = discord.File(str(log["path"]), filename=filename)
     else:
-        logger.error(f"Command error: {error}")
-        await ctx.send(f"❌ Error: {str(error)}")
+        tail = await asyncio.to_thread(
+            read_range, log["path"], -ARTIFACT_MAX_BYTES, ARTIFACT_MAX_BYTES
+        )
+        file = discord.File(io.BytesIO(tail), filename=filename)
+    return format_log(log), file
+
+
+class OpenHandsCommands(commands.Cog):
+    """The prefix and slash commands of the bot."""
+
+    def __init__(self, bot: "OpenHandsBot") -> None:
+        """Initialize the commands.
+
+        Args:
+            bot: The bot the commands are registered on.
+        """
+        self.bot = bot
+        self.config = bot.config
+        self.adapter = bot.adapter
+        self.tracer = bot.tracer
+        self.render_cache = bot.render_cache
+
+    @commands.command(name="help")
+    async def show_help(self, ctx: commands.Context) -> None:
+        """Show help information."""
+        await ctx.send(format_help(self.config.command_prefix))
+
+    @commands.command(name="task")
+    async def create_task(self, ctx: commands.Context, *, description: str) -> None:
+        """Create a new task.
+
+        Args:
+            description: The task description, optionally prefixed with
+                ``--model <name>`` to pick a model route and ``--thread`` to run it
+                in a new thread with its own workspace.
+        """
+        model, use_thread, description = parse_task_options(description)
+        # Start setting the task up while the bot replies on Discord
+        preparation = None
+        if self.config.eager_task_start:
+            preparation = self.adapter.prepare_task(
+                str(ctx.author.id), description, model, in_thread=use_thread
+            )
+        try:
+            await self.submit_task(ctx, description, model, use_thread, preparation)
+        finally:
+            # Gives back speculative resources if the task was never created
+            if preparation is not None:
+                await preparation.cancel()
+
+    async def submit_task(
+        self,
+        ctx: commands.Context,
+        description: str,
+        model: Optional[str],
+        use_thread: bool,
+        preparation: Optional[TaskPreparation],
+    ) -> None:
+        """Create a task from a prefix command and reply with its ID.
+
+        Args:
+            ctx: The command context.
+            description: The task description without options.
+            model: The requested route or model, if any.
+            use_thread: Whether to run the task in a new thread.
+            preparation: Setup started for the task, if any.
+        """
+        reply_channel: Any = ctx.channel
+        thread_id = None
+        if use_thread and isinstance(ctx.channel, discord.TextChannel):
+            reply_channel = await ctx.message.create_thread(
+                name=thread_name(description)
+            )
+            thread_id = str(reply_channel.id)
+
+        # Send a thinking message
+        thinking_msg = await reply_channel.send("⏳ Creating task...")
+
+        try:
+            # Create task
+            result = await self.adapter.create_task(
+                str(ctx.author.id),
+                description,
+                model=model,
+                channel_id=str(reply_channel.id),
+                thread_id=thread_id,
+                preparation=preparation,
+                guild_id=guild_id_of(ctx),
+            )
 
+            if "error" in result:
+                await thinking_msg.edit(content=f"🚦 {result['error']}")
+                return
 
-# Slash command implementations
-@bot.tree.command(name="help", description="Show help information")
-async def slash_help(interaction: discord.Interaction) -> None:
-    """Show help information."""
-    await interaction.response.send_message(format_help(COMMAND_PREFIX))
+            # Send response
+            await thinking_msg.edit(
+                content=f"✅ Task created with ID: `{result['task_id']}`\n"
+                f"Model: `{result['model']}` · Queued, position {result['queue_position']}\n"
+                f"Use `{self.config.command_prefix}status {result['task_id']}` to check the status."
+            )
+        except Exception as e:
+            logger.error(f"Error creating task: {e}")
+            await thinking_msg.edit(content=f"❌ Error creating task: {str(e)}")
+
+    @commands.command(name="batch")
+    async def create_batch(
+        self, ctx: commands.Context, *, descriptions: str = ""
+    ) -> None:
+        """Create one task per line of the message or of an attached text file.
+
+        Args:
+            descriptions: The task descriptions, one per line, optionally prefixed
+                with ``--model <name>`` and ``--thread`` applying to every task.
+        """
+        model, use_thread, descriptions = parse_task_options(descriptions)
+        try:
+            for attachment in ctx.message.attachments:
+                descriptions += "\n" + await read_batch_attachment(attachment)
+            tasks = parse_batch_descriptions(descriptions)
+            self.bot.record_traffic(ctx, "batch", tasks)
+            check_batch_size(tasks, self.config.batch_max_tasks)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
 
+        reply_channel: Any = ctx.channel
+        thread_id = None
+        if use_thread and isinstance(ctx.channel, discord.TextChannel):
+            reply_channel = await ctx.message.create_thread(
+                name=thread_name(f"Batch of {len(tasks)} tasks")
+            )
+            thread_id = str(reply_channel.id)
+
+        thinking_msg = await reply_channel.send(f"⏳ Creating {len(tasks)} tasks...")
+
+        try:
+            result = await self.adapter.create_tasks(
+                str(ctx.author.id),
+                tasks,
+                model=model,
+                channel_id=str(reply_channel.id),
+                thread_id=thread_id,
+                guild_id=guild_id_of(ctx),
+            )
 
-@bot.tree.command(name="task", description="Create a new task")
-async def slash_task(interaction: discord.Interaction, description: str) -> None:
-    """Create a new task."""
-    await interaction.response.defer(thinking=True)
+            if "error" in result:
+                await thinking_msg.edit(content=f"🚦 {result['error']}")
+                return
 
-    try:
-        task_id = await openhands_adapter.create_task(
-            str(interaction.user.id), description
-        )
+            await thinking_msg.edit(
+                content=format_batch_created(result, self.config.command_prefix)
+            )
+        except Exception as e:
+            logger.error(f"Error creating batch: {e}")
+            await thinking_msg.edit(content=f"❌ Error creating batch: {str(e)}")
+
+    @commands.command(name="status")
+    async def check_status(self, ctx: commands.Context, *task_ids: str) -> None:
+        """Check task status.
+
+        Args:
+            task_ids: Task or batch IDs. If not provided, shows all tasks.
+        """
+        # Send a thinking message
+        thinking_msg = await ctx.send("⏳ Checking status...")
+
+        try:
+            if len(task_ids) == 1 and task_ids[0] not in self.adapter.batches:
+                # Get status of specific task
+                status = await self.adapter.get_task_status(task_ids[0])
+                embed = format_status(status, self.render_cache)
+            elif task_ids:
+                # One embed for every task asked about
+                statuses = await self.adapter.get_tasks_status(list(task_ids))
+                embed = format_batch_status(statuses)
+            else:
+                # Get all tasks for user
+                tasks = await self.adapter.get_user_tasks(str(ctx.author.id))
+                embed = format_tasks_list(tasks, self.render_cache)
+
+            # Send response
+            await thinking_msg.delete()
+            await ctx.send(embed=embed)
+        except Exception as e:
+            logger.error(f"Error checking status: {e}")
+            await thinking_msg.edit(content=f"❌ Error checking status: {str(e)}")
+
+    @commands.command(name="files")
+    async def get_files(self, ctx: commands.Context, task_id: str) -> None:
+        """Send the files a task added or modified as attachments.
+
+        Args:
+            task_id: The task ID.
+        """
+        try:
+            artifacts = await self.adapter.get_task_artifacts(
+                task_id, str(ctx.author.id)
+            )
+            if "error" in artifacts:
+                await ctx.send(f"❌ Error: {artifacts['error']}")
+                return
 
-        response = f"✅ Task created with ID: `{task_id}`\n"
-        response += "I'll notify you when it's complete."
+            content, files = build_artifact_message(artifacts)
+            await ctx.send(content=content, files=files)
+        except Exception as e:
+            logger.error(f"Error sending files: {e}")
+            await ctx.send(f"❌ Error sending files: {str(e)}")
+
+    @commands.command(name="log")
+    async def get_log(
+        self, ctx: commands.Context, task_id: str, stream: str = "stdout"
+    ) -> None:
+        """Send the raw output of a task as an attachment.
+
+        Args:
+            task_id: The task ID.
+            stream: The stream to send, ``stdout`` or ``stderr``.
+        """
+        try:
+            log = await self.adapter.get_task_log(task_id, str(ctx.author.id), stream)
+            if "error" in log:
+                await ctx.send(f"❌ Error: {log['error']}")
+                return
 
-        await interaction.followup.send(response)
-    except Exception as e:
-        logger.error(f"Error creating task: {e}")
-        await interaction.followup.send(f"❌ Error: {str(e)}")
+            embed, file = await build_log_message(log)
+            await ctx.send(embed=embed, file=file)
+        except Exception as e:
+            logger.error(f"Error sending log: {e}")
+            await ctx.send(f"❌ Error sending log: {str(e)}")
+
+    @commands.command(name="usage")
+    @commands.is_owner()
+    async def show_usage(
+        self, ctx: commands.Context, user: Optional[discord.User] = None
+    ) -> None:
+        """Show usage per user and guild. Owner only.
+
+        Args:
+            user: The user to report on. Defaults to the top users and guilds.
+        """
+        report = await self.adapter.get_usage(str(user.id) if user else None)
+        await ctx.send(embed=format_usage(report))
+
+    @app_commands.command(name="help", description="Show help information")
+    async def slash_help(self, interaction: discord.Interaction) -> None:
+        """Show help information."""
+        await interaction.response.send_message(format_help(self.config.command_prefix))
+
+    @app_commands.command(name="task", description="Create a new task")
+    @app_commands.describe(
+        description="What OpenHands should do",
+        model="Model route to use (defaults to automatic selection)",
+        thread="Open a thread with its own workspace for this task",
+    )
+    @app_commands.choices(
+        model=[
+            app_commands.Choice(name="Short task (fast model)", value=SHORT_TASK),
+            app_commands.Choice(name="Long task (capable model)", value=LONG_TASK),
+        ]
+    )
+    async def slash_task(
+        self,
+        interaction: discord.Interaction,
+        description: str,
+        model: Optional[app_commands.Choice[str]] = None,
+        thread: bool = False,
+    ) -> None:
+        """Create a new task."""
+        with self.tracer.span("discord.interaction", command="task"):
+            await self.submit_slash_task(interaction, description, model, thread)
+
+    async def submit_slash_task(
+        self,
+        interaction: discord.Interaction,
+        description: str,
+        model: Optional[app_commands.Choice[str]],
+        thread: bool,
+    ) -> None:
+        """Create a task from the slash command and reply with its ID.
+
+        Args:
+            interaction: The command interaction.
+            description: The task description.
+            model: The requested route, if any.
+            thread: Whether to run the task in a new thread.
+        """
+        requested_model = model.value if model else None
+        # Start setting the task up while the bot replies on Discord
+        preparation = None
+        if self.config.eager_task_start:
+            preparation = self.adapter.prepare_task(
+                str(interaction.user.id), description, requested_model, in_thread=thread
+            )
+        await interaction.response.defer(thinking=True)
+
+        try:
+            channel_id = str(interaction.channel_id) if interaction.channel_id else None
+            thread_id = None
+            if thread and isinstance(interaction.channel, discord.TextChannel):
+                task_thread = await interaction.channel.create_thread(
+                    name=thread_name(description),
+                    type=discord.ChannelType.public_thread,
+                )
+                channel_id = thread_id = str(task_thread.id)
+
+            result = await self.adapter.create_task(
+                str(interaction.user.id),
+                description,
+                model=requested_model,
+                channel_id=channel_id,
+                thread_id=thread_id,
+                preparation=preparation,
+                guild_id=guild_id_of(interaction),
+            )
 
+            if "error" in result:
+                await interaction.followup.send(f"🚦 {result['error']}")
+                return
 
-@bot.tree.command(name="status", description="Check task status")
-@app_commands.describe(task_id="The ID of the task to check (optional)")
-async def slash_status(
-    interaction: discord.Interaction, task_id: Optional[str] = None
-) -> None:
-    """Check task status."""
-    await interaction.response.defer(thinking=True)
+            response = f"✅ Task created with ID: `{result['task_id']}`\n"
+            response += f"Queued, position {result['queue_position']}. "
+            if thread_id:
+                response += f"Follow along in <#{thread_id}>."
+            else:
+                response += "I'll notify you when it's complete."
+
+            await interaction.followup.send(response)
+        except Exception as e:
+            logger.error(f"Error creating task: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+        finally:
+            # Gives back speculative resources if the task was never created
+            if preparation is not None:
+                await preparation.cancel()
+
+    @app_commands.command(
+        name="batch", description="Create one task per line of a file"
+    )
+    @app_commands.describe(
+        file="Text file with one task description per line",
+        model="Model route to use for every task (defaults to automatic selection)",
+    )
+    @app_commands.choices(
+        model=[
+            app_commands.Choice(name="Short task (fast model)", value=SHORT_TASK),
+            app_commands.Choice(name="Long task (capable model)", value=LONG_TASK),
+        ]
+    )
+    async def slash_batch(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment,
+        model: Optional[app_commands.Choice[str]] = None,
+    ) -> None:
+        """Create one task per line of a file."""
+        await interaction.response.defer(thinking=True)
+
+        try:
+            tasks = parse_batch_descriptions(await read_batch_attachment(file))
+            self.bot.record_traffic(interaction, "batch", tasks)
+            check_batch_size(tasks, self.config.batch_max_tasks)
+            result = await self.adapter.create_tasks(
+                str(interaction.user.id),
+                tasks,
+                model=model.value if model else None,
+                channel_id=str(interaction.channel_id)
+                if interaction.channel_id
+                else None,
+                guild_id=guild_id_of(interaction),
+            )
 
-    try:
-        if task_id:
-            # Get status of specific task
-            status = await openhands_adapter.get_task_status(task_id)
+            if "error" in result:
+                await interaction.followup.send(f"🚦 {result['error']}")
+                return
 
-            # Format and send status
-            formatted_status = format_status(status)
-            await interaction.followup.send(embed=formatted_status)
-        else:
+            await interaction.followup.send(
+                format_batch_created(result, self.config.command_prefix)
+            )
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}")
+        except Exception as e:
+            logger.error(f"Error creating batch: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="status", description="Check task status")
+    @app_commands.describe(
+        task_id="The ID of the task or batch to check, or several separated by spaces"
+    )
+    async def slash_status(
+        self, interaction: discord.Interaction, task_id: Optional[str] = None
+    ) -> None:
+        """Check task status."""
+        await interaction.response.defer(thinking=True)
+
+        try:
+            task_ids = task_id.replace(",", " ").split() if task_id else []
+            if len(task_ids) == 1 and task_ids[0] not in self.adapter.batches:
+                # Get status of specific task
+                status = await self.adapter.get_task_status(task_ids[0])
+
+                # Format and send status
+                formatted_status = format_status(status, self.render_cache)
+                await interaction.followup.send(embed=formatted_status)
+            elif task_ids:
+                # One embed for every task asked about
+                statuses = await self.adapter.get_tasks_status(task_ids)
+                await interaction.followup.send(embed=format_batch_status(statuses))
+            else:
+                # Get all tasks for user
+                tasks = await self.adapter.get_user_tasks(str(interaction.user.id))
+
+                if not tasks:
+                    await interaction.followup.send("You don't have any tasks yet.")
+                    return
+
+                # Format and send tasks list
+                formatted_tasks = format_tasks_list(tasks, self.render_cache)
+                await interaction.followup.send(embed=formatted_tasks)
+        except Exception as e:
+            logger.error(f"Error checking status: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="tasks", description="List all your tasks")
+    async def slash_tasks(self, interaction: discord.Interaction) -> None:
+        """List all your tasks."""
+        await interaction.response.defer(thinking=True)
+
+        try:
             # Get all tasks for user
-            tasks = await openhands_adapter.get_user_tasks(str(interaction.user.id))
+            tasks = await self.adapter.get_user_tasks(str(interaction.user.id))
 
             if not tasks:
                 await interaction.followup.send("You don't have any tasks yet.")
                 return
 
             # Format and send tasks list
-            formatted_tasks = format_tasks_list(tasks)
+            formatted_tasks = format_tasks_list(tasks, self.render_cache)
             await interaction.followup.send(embed=formatted_tasks)
-    except Exception as e:
-        logger.error(f"Error checking status: {e}")
-        await interaction.followup.send(f"❌ Error: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error listing tasks: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="files", description="Download the files a task changed")
+    @app_commands.describe(task_id="The ID of the task")
+    async def slash_files(self, interaction: discord.Interaction, task_id: str) -> None:
+        """Send the files a task added or modified as attachments."""
+        await interaction.response.defer(thinking=True)
+
+        try:
+            artifacts = await self.adapter.get_task_artifacts(
+                task_id, str(interaction.user.id)
+            )
+            if "error" in artifacts:
+                await interaction.followup.send(f"❌ Error: {artifacts['error']}")
+                return
 
+            content, files = build_artifact_message(artifacts)
+            await interaction.followup.send(content=content, files=files)
+        except Exception as e:
+            logger.error(f"Error sending files: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="log", description="Download the raw output of a task")
+    @app_commands.describe(task_id="The ID of the task", stream="The output stream")
+    @app_commands.choices(
+        stream=[
+            app_commands.Choice(name="stdout", value="stdout"),
+            app_commands.Choice(name="stderr", value="stderr"),
+        ]
+    )
+    async def slash_log(
+        self, interaction: discord.Interaction, task_id: str, stream: str = "stdout"
+    ) -> None:
+        """Send the raw output of a task as an attachment."""
+        await interaction.response.defer(thinking=True)
+
+        try:
+            log = await self.adapter.get_task_log(
+                task_id, str(interaction.user.id), stream
+            )
+            if "error" in log:
+                await interaction.followup.send(f"❌ Error: {log['error']}")
+                return
 
-@bot.tree.command(name="tasks", description="List all your tasks")
-async def slash_tasks(interaction: discord.Interaction) -> None:
-    """List all your tasks."""
-    await interaction.response.defer(thinking=True)
+            embed, file = await build_log_message(log)
+            await interaction.followup.send(embed=embed, file=file)
+        except Exception as e:
+            logger.error(f"Error sending log: {e}")
+            await interaction.followup.send(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="usage", description="Show usage per user and server")
+    @app_commands.describe(user="The user to report on (defaults to the top users)")
+    async def slash_usage(
+        self, interaction: discord.Interaction, user: Optional[discord.User] = None
+    ) -> None:
+        """Show usage per user and guild. Owner only."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message(
+                "❌ Only the bot owner can see usage.", ephemeral=True
+            )
+            return
+        report = await self.adapter.get_usage(str(user.id) if user else None)
+        await interaction.response.send_message(
+            embed=format_usage(report), ephemeral=True
+        )
 
-    try:
-        # Get all tasks for user
-        tasks = await openhands_adapter.get_user_tasks(str(interaction.user.id))
 
-        if not tasks:
-            await interaction.followup.send("You don't have any tasks yet.")
+class OpenHandsBot(commands.Bot):
+    """Discord bot for interacting with OpenHands."""
+
+    def __init__(
+        self,
+        config: Config,
+        adapter: OpenHandsAdapter,
+        health_server: Optional[HealthServer] = None,
+        recorder: Optional[TrafficRecorder] = None,
+    ) -> None:
+        """Initialize the bot.
+
+        Args:
+            config: The configuration.
+            adapter: The adapter running chat and tasks.
+            health_server: The server exposing ``/health`` and ``/metrics``, if any.
+                It is started when the bot logs in and stopped when it closes.
+            recorder: Records the inbound traffic for replay, if any.
+        """
+        super().__init__(
+            command_prefix=config.command_prefix,
+            intents=default_intents(),
+            help_command=None,
+            tree_cls=RateLimitedCommandTree,
+        )
+        self.config = config
+        self.adapter = adapter
+        self.tracer = adapter.tracer
+        self.health_server = health_server
+        self.recorder = recorder
+        self.rate_limiter = RateLimiter(
+            user=(config.rate_limit_user_per_minute, config.rate_limit_user_burst),
+            channel=(
+                config.rate_limit_channel_per_minute,
+                config.rate_limit_channel_burst,
+            ),
+            guild=(config.rate_limit_guild_per_minute, config.rate_limit_guild_burst),
+            compact_interval=config.rate_limit_compact_interval_seconds,
+        )
+        self.render_cache = RenderCache(config.render_cache_size)
+        adapter.add_task_listener(self.notify_task_done)
+        adapter.add_batch_listener(self.notify_batch_done)
+
+    async def setup_hook(self) -> None:
+        """Register the commands and start the health check server."""
+        await self.add_cog(OpenHandsCommands(self))
+        if self.health_server is not None:
+            self.health_server.start(self.health_status, self.collect_metrics)
+
+    async def close(self) -> None:
+        """Disconnect from Discord, stop the health check server and the recording."""
+        await super().close()
+        if self.health_server is not None:
+            await asyncio.to_thread(self.health_server.stop)
+        if self.recorder is not None:
+            await self.recorder.close()
+
+    def check_rate_limit(
+        self,
+        user: Union[discord.User, discord.Member],
+        channel: Any,
+        guild: Optional[discord.Guild],
+    ) -> float:
+        """Check a request against the per-user, channel and guild rate limits.
+
+        Args:
+            user: The requesting user.
+            channel: The channel of the request, if any.
+            guild: The guild of the request, or None for DMs.
+
+        Returns:
+            Zero if the request is allowed, otherwise the seconds to wait.
+        """
+        if not self.config.rate_limit_enabled:
+            return 0.0
+        return self.rate_limiter.check(
+            str(user.id),
+            str(channel.id) if channel is not None else None,
+            str(guild.id) if guild is not None else None,
+        )
+
+    async def bot_check(self, ctx: commands.Context) -> bool:
+        """Apply the rate limits to every prefix command."""
+        retry_after = self.check_rate_limit(ctx.author, ctx.channel, ctx.guild)
+        if retry_after > 0:
+            raise RateLimited(retry_after)
+        return True
+
+    def record_traffic(
+        self,
+        source: Union[commands.Context, discord.Interaction, discord.Message],
+        kind: str,
+        payload: Union[str, List[str]],
+    ) -> None:
+        """Record an inbound message or command for replay, if recording is on.
+
+        Args:
+            source: The message, command context or interaction.
+            kind: The kind of event, see ``TRAFFIC_KINDS``.
+            payload: The message or command arguments, or the task descriptions
+                of a batch. Only their size is recorded.
+        """
+        if self.recorder is None:
             return
+        if isinstance(source, discord.Interaction):
+            user, conversation = source.user, source.channel_id
+        else:
+            user, conversation = source.author, source.channel.id
+        descriptions = payload if isinstance(payload, list) else [payload]
+        try:
+            self.recorder.record(
+                kind,
+                str(user.id),
+                str(conversation) if conversation is not None else None,
+                size=sum(len(description) for description in descriptions),
+                count=len(descriptions),
+            )
+        except OSError as e:
+            logger.warning(f"Could not record traffic: {e}")
 
-        # Format and send tasks list
-        formatted_tasks = format_tasks_list(tasks)
-        await interaction.followup.send(embed=formatted_tasks)
-    except Exception as e:
-        logger.error(f"Error listing tasks: {e}")
-        await interaction.followup.send(f"❌ Error: {str(e)}")
+    async def on_command(self, ctx: commands.Context) -> None:
+        """Record every prefix command before it is checked and run."""
+        if ctx.command is None or ctx.command.name == "batch":
+            # Batches are recorded once their tasks are known
+            return
+        skip = len(ctx.prefix or "") + len(ctx.invoked_with or "")
+        self.record_traffic(ctx, ctx.command.name, ctx.message.content[skip:].strip())
+
+    async def on_interaction(self, interaction: discord.Interaction) -> None:
+        """Record every slash command before it is checked and run."""
+        if interaction.type != discord.InteractionType.application_command:
+            return
+        data: dict = dict(interaction.data or {})
+        name = data.get("name", "")
+        if name == "batch":
+            return
+        options = data.get("options", [])
+        self.record_traffic(
+            interaction,
+            name,
+            " ".join(str(option.get("value", "")) for option in options),
+        )
+
+    def health_status(self) -> Tuple[int, dict]:
+        """Get the health check answer.
+
+        The bot reports itself unhealthy while draining, so orchestrators stop
+        routing to it and can wait for the state to become "drained". Whether the
+        gateway connection is up is reported alongside.
+
+        Returns:
+            The HTTP status and the body of the health check.
+        """
+        drain = self.adapter.drain_status()
+        accepting = drain["state"] == "accepting"
+        return 200 if accepting else 503, {
+            "status": "ok" if accepting else drain["state"],
+            "version": "1.0.0",
+            "discord_connected": not self.is_closed() and self.is_ready(),
+            "drain": drain,
+        }
+
+    def collect_metrics(self) -> dict:
+        """Collect the metrics exposed on the health check server.
+
+        Returns:
+            The rate limiter, adapter and render cache metrics, and the traffic
+            recorder metrics when recording.
+        """
+        metrics = {
+            "rate_limiter": self.rate_limiter.stats(),
+            "adapter": self.adapter.metrics(),
+            "render_cache": self.render_cache.stats(),
+        }
+        if self.recorder is not None:
+            metrics["traffic"] = self.recorder.stats()
+        return metrics
+
+    async def on_ready(self) -> None:
+        """Event handler for when the bot is ready."""
+        if self.user is not None:
+            logger.info(f"Logged in as {self.user.name} ({self.user.id})")
+        else:
+            logger.info("Logged in but user is None")
+        logger.info(f"Command prefix: {self.config.command_prefix}")
+
+        # Register slash commands
+        try:
+            synced = await self.tree.sync()
+            logger.info(f"Synced {len(synced)} slash command(s)")
+        except Exception as e:
+            logger.error(f"Failed to sync slash commands: {e}")
+
+        # Start the OpenHands adapter
+        await self.adapter.start()
+
+        # Set bot status
+        await self.change_presence(
+            activity=discord.Activity(
+                type=discord.ActivityType.listening,
+                name=f"{self.config.command_prefix}help | /help",
+            )
+        )
+
+    def is_chat_thread(self, channel: Any) -> bool:
+        """Check whether a channel is a thread used for OpenHands conversations.
+
+        Args:
+            channel: The channel of a message.
+
+        Returns:
+            True for threads in the chat channel and threads the bot opened.
+        """
+        if not isinstance(channel, discord.Thread):
+            return False
+        if (
+            channel.parent is not None
+            and channel.parent.name == self.config.openhands_chat_channel
+        ):
+            return True
+        return self.user is not None and channel.owner_id == self.user.id
+
+    async def on_message(self, message: discord.Message) -> None:
+        """Event handler for when a message is received."""
+        # Ignore messages from the bot itself
+        if message.author == self.user:
+            return
+
+        in_chat_channel = (
+            isinstance(message.channel, discord.TextChannel)
+            and message.channel.name == self.config.openhands_chat_channel
+        )
+        in_chat_thread = self.is_chat_thread(message.channel)
+
+        # Process DMs, messages in the OpenHands chat channel and its threads
+        if (
+            isinstance(message.channel, discord.DMChannel)
+            or in_chat_channel
+            or in_chat_thread
+        ):
+            # Only process messages that don't start with the command prefix
+            if not message.content.startswith(str(self.command_prefix)):
+                self.record_traffic(message, CHAT, message.content)
+                retry_after = self.check_rate_limit(
+                    message.author, message.channel, message.guild
+                )
+                if retry_after > 0:
+                    # A reaction keeps floods from turning into floods of replies
+                    await message.add_reaction("🐢")
+                    return
+
+                # Each thread is its own conversation with its own workspace
+                reply_channel: Any = message.channel
+                thread_id = None
+                if in_chat_thread:
+                    thread_id = str(message.channel.id)
+                elif in_chat_channel and self.config.chat_use_threads:
+                    reply_channel = await message.create_thread(
+                        name=thread_name(message.content)
+                    )
+                    thread_id = str(reply_channel.id)
+
+                with self.tracer.span(
+                    "discord.message", in_thread=thread_id is not None
+                ):
+                    async with reply_channel.typing():
+                        # Send a thinking message
+                        thinking_msg = await reply_channel.send("🤔 Thinking...")
+
+                        try:
+                            # Get response from OpenHands
+                            response = await self.adapter.chat(
+                                str(message.author.id),
+                                message.content,
+                                thread_id=thread_id,
+                                guild_id=guild_id_of(message),
+                            )
+
+                            # Delete thinking message and send response
+                            with self.tracer.span("discord.reply"):
+                                await thinking_msg.delete()
+                                await reply_channel.send(response)
+                        except Exception as e:
+                            logger.error(f"Error processing message: {e}")
+                            await thinking_msg.edit(content=f"❌ Error: {str(e)}")
+
+                # Don't process commands
+                return
+
+        # Process commands
+        with self.tracer.span("discord.command"):
+            await self.process_commands(message)
+
+    async def on_command_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        """Event handler for command errors."""
+        if isinstance(error, RateLimited):
+            await ctx.send(f"🐢 {str(error)}")
+        elif isinstance(error, commands.MissingRequiredArgument):
+            if ctx.command and ctx.command.name == "task":
+                await ctx.send(
+                    f"❌ Error: Missing task description\n"
+                    f"Usage: `{self.config.command_prefix}task <description>`"
+                )
+            else:
+                await ctx.send(f"❌ Error: {str(error)}")
+        elif isinstance(error, commands.CommandNotFound):
+            await ctx.send(
+                f"❌ Command not found. Use `{self.config.command_prefix}help` "
+                "to see available commands."
+            )
+        else:
+            logger.error(f"Command error: {error}")
+            await ctx.send(f"❌ Error: {str(error)}")
+
+    async def notify_task_done(self, task: dict) -> None:
+        """Post the result of a finished task to the channel it was created from.
+
+        Args:
+            task: The finished task dictionary.
+        """
+        channel_id = task.get("channel_id")
+        if not channel_id:
+            return
+
+        channel = self.get_channel(int(channel_id))
+        if channel is None:
+            channel = await self.fetch_channel(int(channel_id))
+        if not isinstance(channel, discord.abc.Messageable):
+            return
+
+        result = task.get("result") or {
+            "success": False,
+            "error": task.get("error", "Unknown error"),
+        }
+        embed = format_result(result)
+        embed.set_footer(text=f"Task {task['id']}")
+        with self.tracer.span("discord.reply"):
+            await channel.send(content=f"<@{task['user_id']}>", embed=embed)
+
+    async def notify_batch_done(self, batch: dict) -> None:
+        """Post one summary for a finished batch to the channel it was created from.
+
+        Args:
+            batch: The finished batch dictionary.
+        """
+        channel_id = batch.get("channel_id")
+        if not channel_id:
+            return
+
+        channel = self.get_channel(int(channel_id))
+        if channel is None:
+            channel = await self.fetch_channel(int(channel_id))
+        if not isinstance(channel, discord.abc.Messageable):
+            return
+
+        embed = format_batch_status(batch["tasks"], title="Batch Finished")
+        embed.set_footer(text=f"Batch {batch['id']}")
+        with self.tracer.span("discord.reply"):
+            await channel.send(content=f"<@{batch['user_id']}>", embed=embed)
+
+
+def create_bot(
+    config: Optional[Config] = None,
+    adapter: Optional[OpenHandsAdapter] = None,
+    health_server: Optional[HealthServer] = None,
+    recorder: Optional[TrafficRecorder] = None,
+) -> OpenHandsBot:
+    """Build a bot and its dependencies.
+
+    Args:
+        config: The configuration. Defaults to the environment.
+        adapter: The adapter running chat and tasks. Defaults to a new adapter
+            keeping its workspaces, checkpoint, spools and spilled results where
+            ``config`` says.
+        health_server: The health check server. Defaults to one listening on
+            ``config.health_check_host`` and ``config.health_check_port``.
+        recorder: The traffic recorder. Defaults to one writing to
+            ``config.traffic_record_file``, or none if that is empty.
+
+    Returns:
+        The bot, ready to be started.
+    """
+    config = config or Config()
+    if recorder is None and config.traffic_record_file:
+        recorder = TrafficRecorder(config.traffic_record_file)
+    return OpenHandsBot(
+        config,
+        adapter
+        or OpenHandsAdapter(
+            checkpoint_file=config.checkpoint_file,
+            workdir=config.openhands_workdir,
+            spool_dir=config.spool_dir,
+            spill_dir=config.result_spill_dir,
+        ),
+        health_server
+        or HealthServer(config.health_check_port, config.health_check_host),
+        recorder,
+    )
+
+
+async def shutdown(bot: OpenHandsBot) -> None:
+    """Drain the adapter, then disconnect from Discord.
+
+    The bot stays connected while draining, so tasks finishing before the deadline
+    are still announced.
+
+    Args:
+        bot: The bot to shut down.
+    """
+    logger.info("Shutdown requested, draining tasks")
+    await bot.adapter.drain(bot.config.drain_timeout_seconds)
+    await bot.close()
 
 
 async def main() -> None:
     """Main function to run the bot."""
+    validate_config()
+    bot = create_bot()
+    shutdown_tasks: List[asyncio.Task] = []
+
+    def request_shutdown() -> None:
+        if not shutdown_tasks:
+            shutdown_tasks.append(asyncio.create_task(shutdown(bot)))
+
+    try:
+        # Deployments stop the container with SIGTERM
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, request_shutdown)
+    except NotImplementedError:
+        pass
+
     try:
         # Start the bot
-        await bot.start(DISCORD_TOKEN if DISCORD_TOKEN is not None else "")
+        await bot.start(bot.config.discord_token or "")
     except KeyboardInterrupt:
         # Handle keyboard interrupt
         logger.info("Keyboard interrupt received")
@@ -334,13 +1216,17 @@ async def main() -> None:
         # Handle other exceptions
         logger.error(f"Error starting bot: {e}")
     finally:
-        # Stop the OpenHands adapter
-        await openhands_adapter.stop()
+        # Stop the OpenHands adapter, checkpointing unfinished tasks
+        await bot.adapter.drain(bot.config.drain_timeout_seconds)
+        await bot.adapter.stop()
 
         # Close the bot
         if not bot.is_closed():
             await bot.close()
 
+        # Export the spans still buffered
+        bot.tracer.shutdown()
+
 
 if __name__ == "__main__":
     # Run the bot
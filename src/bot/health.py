@@ -0,0 +1,143 @@
+"""
+Health Check Module
+
+This module serves the ``/health`` and ``/metrics`` endpoints of the bot over HTTP
+from a background thread. The answers are gathered on the event loop of the bot, so
+they see consistent state.
+"""
+
+import asyncio
+import concurrent.futures
+import http.server
+import json
+import logging
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+from src.config import HEALTH_CHECK_HOST, HEALTH_CHECK_PORT
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Returns the HTTP status and the body of the health check
+HealthProbe = Callable[[], Tuple[int, dict]]
+MetricsProbe = Callable[[], dict]
+
+# Seconds a request waits for the event loop before the bot is reported unresponsive
+PROBE_TIMEOUT_SECONDS = 5.0
+
+
+class _HealthHTTPServer(http.server.HTTPServer):
+    """HTTP server holding the probes its handler answers with."""
+
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        health: HealthProbe,
+        metrics: MetricsProbe,
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        super().__init__(address, _HealthCheckHandler)
+        self.health = health
+        self.metrics = metrics
+        self.loop = loop
+
+    def call(self, probe: Callable[[], Any]) -> Any:
+        """Run a probe on the event loop and wait for its answer.
+
+        Raises:
+            TimeoutError: If the event loop does not answer in time.
+        """
+
+        async def run() -> Any:
+            return probe()
+
+        future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        try:
+            return future.result(PROBE_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError("Event loop did not answer") from None
+
+
+class _HealthCheckHandler(http.server.BaseHTTPRequestHandler):
+    """Answer health check and metrics requests."""
+
+    server: _HealthHTTPServer
+
+    def _send_json(self, status: int, body: dict) -> None:
+        """Send a JSON response."""
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def do_GET(self) -> None:
+        """Handle GET requests."""
+        try:
+            if self.path == "/metrics":
+                self._send_json(200, self.server.call(self.server.metrics))
+            elif self.path == "/health":
+                self._send_json(*self.server.call(self.server.health))
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except TimeoutError:
+            self._send_json(503, {"status": "unresponsive"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Suppress logging for health check requests."""
+        pass
+
+
+class HealthServer:
+    """Serve the health check and metrics of a bot on a port of its own."""
+
+    def __init__(
+        self, port: int = HEALTH_CHECK_PORT, host: str = HEALTH_CHECK_HOST
+    ) -> None:
+        """Initialize the server.
+
+        Args:
+            port: The port to listen on. Zero picks a free port, so several bots
+                can run in one host or test session.
+            host: The interface to listen on. Defaults to loopback, as ``/metrics``
+                is not authenticated.
+        """
+        self.host = host
+        self.port = port
+        self._server: Optional[_HealthHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, health: HealthProbe, metrics: MetricsProbe) -> None:
+        """Start serving on a background thread.
+
+        Must be called on the event loop the probes are run on.
+
+        Args:
+            health: Function returning the HTTP status and body of ``/health``.
+            metrics: Function returning the body of ``/metrics``.
+        """
+        if self._server is not None:
+            return
+        self._server = _HealthHTTPServer(
+            (self.host, self.port), health, metrics, asyncio.get_running_loop()
+        )
+        # The actual port, if a free one was picked
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="health-check", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Health check server started on {self.host or '*'}:{self.port}")
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
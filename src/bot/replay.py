@@ -0,0 +1,536 @@
+"""
+Traffic Replay Module
+
+This module replays a traffic recording against the bot to see how a deployment
+copes with real load, without Discord or an LLM.
+
+Run it with ``python -m src.bot.replay traffic.bin --speed 1 10 --concurrency 2 5``.
+Every run builds a fresh bot and adapter whose task routes serve ``--concurrency``
+tasks at once, feeds the recorded events to the bot's own handlers through stand-in
+Discord objects, and answers every OpenHands run with a stub backend that takes a
+modelled time per request. Workspaces, spools, checkpoints, traces and usage of a
+replay stay in a temporary directory and in memory, apart from the deployment. The report shows how long tasks queued and how long tasks and chat
+messages took, for every combination of speed and concurrency.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import tempfile
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Sequence, cast
+
+import discord
+from discord.ext import commands
+
+from src.adapter.admission import AdmissionController
+from src.adapter.backends import (
+    ExecutionBackend,
+    ExecutionOutcome,
+    ExecutionRequest,
+    OutputSink,
+)
+from src.adapter.model_router import CHAT, ModelRouter, default_routes
+from src.adapter.openhands_adapter import OpenHandsAdapter
+from src.adapter.runtime_stats import percentile
+from src.adapter.usage import UsageTracker
+from src.bot.bot import OpenHandsCommands, RateLimited, create_bot
+from src.bot.health import HealthServer
+from src.bot.traffic import TrafficEvent, read_traffic
+from src.config import Config
+from src.utils.tracing import Tracer
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Longest wait for the tasks still queued or running after the last event
+REPLAY_DRAIN_SECONDS = 600
+# Interval of the queue length samples
+QUEUE_SAMPLE_SECONDS = 0.1
+
+
+class StubBackend(ExecutionBackend):
+    """Answer every run after a time modelled on the size of its prompt."""
+
+    name = "stub"
+
+    def __init__(self, base_seconds: float = 2.0, seconds_per_kchar: float = 1.0):
+        """Initialize the backend.
+
+        Args:
+            base_seconds: Time taken by every run.
+            seconds_per_kchar: Time added per thousand characters of the prompt.
+        """
+        self.base_seconds = base_seconds
+        self.seconds_per_kchar = seconds_per_kchar
+        self.runs = 0
+
+    async def run(
+        self,
+        request: ExecutionRequest,
+        on_stdout: OutputSink,
+        on_stderr: OutputSink,
+    ) -> ExecutionOutcome:
+        """Sleep for the modelled time and answer with a message event."""
+        self.runs += 1
+        seconds = (
+            self.base_seconds + len(request.prompt) / 1000 * self.seconds_per_kchar
+        )
+        if seconds > request.timeout:
+            await asyncio.sleep(request.timeout)
+            return ExecutionOutcome(None, True, {"wall_seconds": request.timeout})
+        await asyncio.sleep(seconds)
+        on_stdout(
+            (json.dumps({"type": "message", "content": "Done"}) + "\n").encode("utf-8")
+        )
+        return ExecutionOutcome(0, False, {"wall_seconds": seconds})
+
+    def stats(self) -> dict:
+        """Get the backend metrics.
+
+        Returns:
+            The backend name and the runs answered.
+        """
+        return {"backend": self.name, "runs": self.runs}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize durations in seconds.
+
+    Args:
+        samples: The durations.
+
+    Returns:
+        The median, 95th percentile and maximum, zero without samples.
+    """
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+class ReplayGuild:
+    """The guild every replayed event comes from."""
+
+    def __init__(self, guild_id: int = 1) -> None:
+        """Initialize the guild."""
+        self.id = guild_id
+
+
+class ReplayUser:
+    """A recorded user."""
+
+    def __init__(self, user_id: int) -> None:
+        """Initialize the user."""
+        self.id = user_id
+
+
+class ReplayMessage:
+    """A message received or sent by the bot during a replay."""
+
+    def __init__(
+        self,
+        channel: "ReplayChannel",
+        content: str = "",
+        author: Optional[ReplayUser] = None,
+    ) -> None:
+        """Initialize the message."""
+        self.channel = channel
+        self.content = content
+        self.author = author
+        self.guild = channel.guild
+        self.attachments: List[Any] = []
+        self.reactions: List[str] = []
+
+    async def add_reaction(self, emoji: str) -> None:
+        """Remember a reaction of the bot, e.g. for a rate-limited message."""
+        self.reactions.append(emoji)
+
+    async def create_thread(self, **kwargs: Any) -> "ReplayChannel":
+        """Answer in the same channel; the conversation already has its own."""
+        return self.channel
+
+    async def edit(self, **kwargs: Any) -> None:
+        """Drop the edit."""
+
+    async def delete(self) -> None:
+        """Drop the deletion."""
+
+
+class ReplayTyping:
+    """A typing indicator that shows nothing."""
+
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+
+class ReplayChannel(discord.TextChannel):
+    """A channel standing in for a recorded conversation.
+
+    It is a ``TextChannel`` so the bot answers in it as in its chat channel, but it
+    has no connection: messages sent to it are counted and dropped.
+    """
+
+    def __init__(self, channel_id: int, name: str, guild: ReplayGuild) -> None:
+        """Initialize the channel without a Discord connection."""
+        self.id = channel_id
+        self.name = name
+        self.guild = cast(discord.Guild, guild)
+        self.sent = 0
+
+    async def send(self, *args: Any, **kwargs: Any) -> Any:
+        """Drop a message of the bot."""
+        self.sent += 1
+        return ReplayMessage(self)
+
+    def typing(self) -> Any:
+        """Show nothing while the bot is typing."""
+        return ReplayTyping()
+
+
+class ReplayContext:
+    """The command context of a replayed command."""
+
+    def __init__(self, message: ReplayMessage) -> None:
+        """Initialize the context."""
+        self.message = message
+        self.author = message.author
+        self.channel = message.channel
+        self.guild = message.guild
+        self.command = None
+
+    async def send(self, *args: Any, **kwargs: Any) -> Any:
+        """Drop a reply of the bot."""
+        return await self.channel.send(*args, **kwargs)
+
+
+class ReplayDiscord:
+    """Stand-in Discord objects for the users and conversations of a recording."""
+
+    def __init__(self, chat_channel: str) -> None:
+        """Initialize the stand-ins.
+
+        Args:
+            chat_channel: Name of the chat channel, so replayed chat messages are
+                answered.
+        """
+        self.chat_channel = chat_channel
+        self.guild = ReplayGuild()
+        self.channels: Dict[int, ReplayChannel] = {}
+
+    def get_channel(self, channel_id: int) -> Optional[ReplayChannel]:
+        """Look a channel up, like ``discord.Client.get_channel``."""
+        return self.channels.get(channel_id)
+
+    def channel(self, conversation: int) -> ReplayChannel:
+        """Get the chat channel standing in for a recorded conversation."""
+        # Zero marks events recorded outside any channel
+        channel_id = conversation or 1
+        if channel_id not in self.channels:
+            self.channels[channel_id] = ReplayChannel(
+                channel_id, self.chat_channel, self.guild
+            )
+        return self.channels[channel_id]
+
+    def message(self, event: TrafficEvent, content: str) -> ReplayMessage:
+        """Create the message of an event."""
+        return ReplayMessage(
+            self.channel(event.conversation), content, ReplayUser(event.user)
+        )
+
+    def context(self, event: TrafficEvent, content: str) -> ReplayContext:
+        """Create the command context of an event."""
+        return ReplayContext(self.message(event, content))
+
+
+class Replay:
+    """Feed a recording to a bot with a fresh adapter and measure it."""
+
+    def __init__(
+        self,
+        events: Sequence[TrafficEvent],
+        concurrency: int,
+        speed: float,
+        backend: ExecutionBackend,
+        config: Config,
+        workdir: str,
+    ) -> None:
+        """Initialize the replay.
+
+        Args:
+            events: The recorded events.
+            concurrency: Tasks each task route runs at once, as set by
+                ``MAX_CONCURRENT_TASKS``.
+            speed: How many times faster than recorded the events arrive.
+            backend: The backend answering the runs.
+            config: The configuration of the bot.
+            workdir: Directory for the workspaces, spools, spilled results and
+                checkpoint of the adapter.
+        """
+        self.events = events
+        self.concurrency = concurrency
+        self.speed = speed
+        routes = [
+            route if route.name == CHAT else replace(route, max_concurrent=concurrency)
+            for route in default_routes()
+        ]
+        self.adapter = OpenHandsAdapter(
+            router=ModelRouter(routes),
+            # The memory of the replay host says nothing about the deployment
+            admission=AdmissionController(
+                max_subprocesses=sum(route.max_concurrent for route in routes),
+                min_free_memory_mb=0,
+            ),
+            # Nothing of the replay reaches the traces or quotas of the deployment
+            tracer=Tracer(),
+            usage=UsageTracker(),
+            backend=backend,
+            checkpoint_file=os.path.join(workdir, "checkpoint.json"),
+            workdir=os.path.join(workdir, "workspaces"),
+            spool_dir=os.path.join(workdir, "spool"),
+            spill_dir=os.path.join(workdir, "results"),
+        )
+        self.discord = ReplayDiscord(config.openhands_chat_channel)
+        # Replayed traffic must not be recorded again
+        config = copy.copy(config)
+        config.traffic_record_file = ""
+        self.bot = create_bot(config, self.adapter, HealthServer(0))
+        self.bot.get_channel = self.discord.get_channel  # type: ignore[assignment]
+        self.commands = OpenHandsCommands(self.bot)
+        self.adapter.add_task_listener(self._task_done)
+        self.adapter.add_batch_listener(self._batch_done)
+        self.queue_waits: List[float] = []
+        self.task_latencies: List[float] = []
+        self.chat_latencies: List[float] = []
+        self.submitted = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.skipped = 0
+        self.max_queue_length = 0
+
+    async def _task_done(self, task: dict) -> None:
+        """Measure a finished task."""
+        started = task.get("started_at", task["created_at"])
+        completed = task.get("completed_at", started)
+        self.queue_waits.append(started - task["created_at"])
+        self.task_latencies.append(completed - task["created_at"])
+        if task["status"] != "completed":
+            self.failed += 1
+
+    async def _batch_done(self, batch: dict) -> None:
+        """Measure the tasks of a finished batch."""
+        for task in batch["tasks"]:
+            await self._task_done(task)
+
+    async def _handle(self, event: TrafficEvent) -> None:
+        """Pass an event to the handler of its kind."""
+        text = "x" * max(event.size, 1)
+        if event.kind == "chat":
+            message = self.discord.message(event, text)
+            started = asyncio.get_running_loop().time()
+            await self.bot.on_message(cast(discord.Message, message))
+            if message.reactions:
+                # Turned away by the rate limits
+                self.rate_limited += 1
+            else:
+                self.chat_latencies.append(asyncio.get_running_loop().time() - started)
+            return
+        if event.kind not in ("task", "batch", "status", "tasks"):
+            # Answered without the adapter, so they add no load worth replaying
+            self.skipped += 1
+            return
+
+        ctx = cast(commands.Context, self.discord.context(event, text))
+        try:
+            await self.bot.bot_check(ctx)
+        except RateLimited:
+            self.rate_limited += 1
+            return
+        if event.kind == "task":
+            self.submitted += 1
+            await self.commands.create_task(ctx, description=text)
+        elif event.kind == "batch":
+            count = max(event.count, 1)
+            self.submitted += count
+            line = "x" * max(event.size // count, 1)
+            await self.commands.create_batch(
+                ctx, descriptions="\n".join(f"{i} {line}" for i in range(count))
+            )
+        else:
+            await self.commands.check_status(ctx)
+
+    async def _sample_queue(self) -> None:
+        """Track the longest queue."""
+        while True:
+            self.max_queue_length = max(
+                self.max_queue_length, self.adapter.queue_length()
+            )
+            await asyncio.sleep(QUEUE_SAMPLE_SECONDS)
+
+    def _idle(self) -> bool:
+        """Check whether every accepted task has finished."""
+        return self.adapter.queue_length() == 0 and not any(
+            self.adapter.busy_workers.values()
+        )
+
+    async def run(self, drain_seconds: float = REPLAY_DRAIN_SECONDS) -> dict:
+        """Replay the events and wait for the work they started.
+
+        Args:
+            drain_seconds: Longest wait for the work still running after the last
+                event.
+
+        Returns:
+            The report of the replay.
+        """
+        loop = asyncio.get_running_loop()
+        # Binds the commands to the cog, as on login
+        await self.bot.add_cog(self.commands)
+        await self.adapter.start()
+        sampler = asyncio.create_task(self._sample_queue())
+        handlers = []
+        started = loop.time()
+        try:
+            for event in self.events:
+                delay = started + event.offset / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                handlers.append(asyncio.create_task(self._handle(event)))
+            await asyncio.gather(*handlers)
+            deadline = loop.time() + drain_seconds
+            while not self._idle() and loop.time() < deadline:
+                await asyncio.sleep(QUEUE_SAMPLE_SECONDS)
+            duration = loop.time() - started
+        finally:
+            sampler.cancel()
+            await self.adapter.stop()
+
+        rejections = self.adapter.admission.stats()["rejections"]
+        return {
+            "concurrency": self.concurrency,
+            "speed": self.speed,
+            "events": len(self.events),
+            "duration_seconds": round(duration, 3),
+            "skipped": self.skipped,
+            "rate_limited": self.rate_limited,
+            "max_queue_length": self.max_queue_length,
+            "tasks": {
+                "submitted": self.submitted,
+                "accepted": len(self.adapter.active_sessions),
+                "finished": len(self.task_latencies),
+                "failed": self.failed,
+                "queue_wait": summarize(self.queue_waits),
+                "latency": summarize(self.task_latencies),
+            },
+            "chat": {
+                "messages": len(self.chat_latencies),
+                "latency": summarize(self.chat_latencies),
+            },
+            "rejections": rejections,
+        }
+
+
+async def replay(
+    events: Sequence[TrafficEvent],
+    concurrencies: Sequence[int],
+    speeds: Sequence[float],
+    base_seconds: float = 2.0,
+    seconds_per_kchar: float = 1.0,
+    config: Optional[Config] = None,
+) -> List[dict]:
+    """Replay a recording once per combination of concurrency and speed.
+
+    Args:
+        events: The recorded events.
+        concurrencies: Settings of ``MAX_CONCURRENT_TASKS`` to try.
+        speeds: Speed multipliers to try.
+        base_seconds: Time every stubbed run takes.
+        seconds_per_kchar: Time added per thousand characters of a prompt.
+        config: The configuration of the bot. Defaults to the environment.
+
+    Returns:
+        The report of every replay.
+    """
+    config = config or Config()
+    reports = []
+    for speed in speeds:
+        for concurrency in concurrencies:
+            with tempfile.TemporaryDirectory() as workdir:
+                run = Replay(
+                    events,
+                    concurrency,
+                    speed,
+                    StubBackend(base_seconds, seconds_per_kchar),
+                    config,
+                    workdir,
+                )
+                reports.append(await run.run())
+    return reports
+
+
+def format_report(reports: List[dict]) -> str:
+    """Format replay reports as a table.
+
+    Args:
+        reports: Reports returned by ``replay``.
+
+    Returns:
+        One line per replay.
+    """
+    lines = [
+        "speed  concurrency  limited  tasks  rejected  max queue  "
+        "wait p50/p95 s  task p50/p95 s  chat p50/p95 s"
+    ]
+    for report in reports:
+        tasks: Dict[str, Any] = report["tasks"]
+        chat: Dict[str, Any] = report["chat"]
+        lines.append(
+            f"{report['speed']:>5g}  {report['concurrency']:>11}  "
+            f"{report['rate_limited']:>7}  "
+            f"{tasks['submitted']:>5}  {tasks['submitted'] - tasks['accepted']:>8}  "
+            f"{report['max_queue_length']:>9}  "
+            f"{tasks['queue_wait']['p50']:>6.1f}/{tasks['queue_wait']['p95']:<7.1f}  "
+            f"{tasks['latency']['p50']:>6.1f}/{tasks['latency']['p95']:<7.1f}  "
+            f"{chat['latency']['p50']:>6.1f}/{chat['latency']['p95']:<7.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Replay a recording and print the report."""
+    parser = argparse.ArgumentParser(
+        description="Replay recorded Discord traffic against a stubbed OpenHands."
+    )
+    parser.add_argument("recording", help="File written with TRAFFIC_RECORD_FILE")
+    parser.add_argument("--speed", type=float, nargs="+", default=[1.0])
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[Config().max_concurrent_tasks]
+    )
+    parser.add_argument("--base-seconds", type=float, default=2.0)
+    parser.add_argument("--seconds-per-kchar", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true", help="Print JSON reports")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    reports = asyncio.run(
+        replay(
+            read_traffic(args.recording),
+            args.concurrency,
+            args.speed,
+            args.base_seconds,
+            args.seconds_per_kchar,
+        )
+    )
+    print(json.dumps(reports, indent=2) if args.json else format_report(reports))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Traffic Recording Module
+
+This module records the Discord traffic the bot receives to a compact binary file:
+when each chat message or command arrived, its kind and the size of its payload.
+Recordings are replayed against the adapter with ``python -m src.bot.replay`` to
+size deployments with real load.
+
+Recordings are anonymised. No message content is stored, and users and channels are
+kept only as hashes salted per recorder, so a recording shows which events came from
+the same user or conversation without revealing who or where.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from src.config import TRAFFIC_RECORD_FILE
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+# Kinds of recorded events: chat messages and the commands of the bot
+CHAT = "chat"
+TRAFFIC_KINDS = (CHAT, "task", "batch", "status", "tasks", "files", "log", "help")
+OTHER = "other"
+_KIND_CODES = {kind: code for code, kind in enumerate(TRAFFIC_KINDS + (OTHER,))}
+
+# A recording is a sequence of fixed-size records: events, and a segment header
+# written by every recorder before its first event, which holds the wall-clock start
+# of the segment and is told apart by its kind
+# Milliseconds since the segment start, kind, user, conversation, payload size and
+# number of tasks
+_RECORD = struct.Struct("<IBIIIH")
+# Format version, segment marker, start time and padding to the record size
+_SEGMENT = struct.Struct("<IBdIH")
+_SEGMENT_KIND = 0xFF
+_VERSION = 1
+# Events are collected in memory and written out off the event loop once this many
+# bytes or seconds have built up
+FLUSH_BYTES = 4096
+FLUSH_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class TrafficEvent:
+    """An anonymised inbound event."""
+
+    # Seconds since the start of the recording
+    offset: float
+    kind: str
+    # Salted hashes; equal values mean the same user or conversation
+    user: int
+    conversation: int
+    # Characters of the message or command arguments
+    size: int
+    # Tasks submitted by the event, more than one for batches
+    count: int = 1
+
+
+class TrafficRecorder:
+    """Append anonymised events to a recording file.
+
+    Events are buffered and written on a worker thread through a file handle kept
+    open, so recording adds no file I/O to the handling of an event.
+    """
+
+    def __init__(
+        self,
+        path: str = TRAFFIC_RECORD_FILE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the recorder.
+
+        Args:
+            path: The recording file. Events are appended after any previous
+                recording, as a new segment.
+            clock: Monotonic clock the arrival times are measured with.
+        """
+        self.path = path
+        self.clock = clock
+        self.started: Optional[float] = None
+        self.events = 0
+        # Fresh for every recorder, so hashes cannot be matched across recordings
+        self._salt = os.urandom(16)
+        self._pending = bytearray()
+        self._flushed_at = 0.0
+        self._file: Optional[BinaryIO] = None
+        self._flushing: Optional["asyncio.Future[None]"] = None
+
+    def _hash(self, value: Optional[str]) -> int:
+        """Anonymise an ID; None stays zero."""
+        if value is None:
+            return 0
+        digest = hashlib.blake2b(
+            value.encode("utf-8"), digest_size=4, key=self._salt
+        ).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def record(
+        self,
+        kind: str,
+        user_id: str,
+        conversation_id: Optional[str] = None,
+        size: int = 0,
+        count: int = 1,
+    ) -> None:
+        """Record an inbound event.
+
+        Must be called on the event loop.
+
+        Args:
+            kind: A kind of ``TRAFFIC_KINDS``; anything else is recorded as other.
+            user_id: The Discord user ID.
+            conversation_id: The channel or thread the event belongs to, if any.
+            size: Characters of the message or command arguments.
+            count: Tasks submitted by the event.
+        """
+        now = self.clock()
+        if self.started is None:
+            self.started = self._flushed_at = now
+            self._pending.extend(
+                _SEGMENT.pack(_VERSION, _SEGMENT_KIND, time.time(), 0, 0)
+            )
+        self._pending.extend(
+            _RECORD.pack(
+                min(int((now - self.started) * 1000), 0xFFFFFFFF),
+                _KIND_CODES.get(kind, _KIND_CODES[OTHER]),
+                self._hash(user_id),
+                self._hash(conversation_id),
+                min(max(size, 0), 0xFFFFFFFF),
+                min(max(count, 0), 0xFFFF),
+            )
+        )
+        self.events += 1
+        if len(self._pending) >= FLUSH_BYTES or now - self._flushed_at >= FLUSH_SECONDS:
+            self._flush_in_background()
+
+    def _flush_in_background(self) -> None:
+        """Hand the buffered events to a worker thread, one write at a time."""
+        if self._flushing is not None or not self._pending:
+            return
+        data = bytes(self._pending)
+        self._pending.clear()
+        self._flushed_at = self.clock()
+        self._flushing = asyncio.get_running_loop().run_in_executor(
+            None, self._write, data
+        )
+        self._flushing.add_done_callback(self._flushed)
+
+    def _flushed(self, future: "asyncio.Future[None]") -> None:
+        """Forget a finished write and report its failure."""
+        self._flushing = None
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to write traffic recording: {future.exception()}")
+
+    def _write(self, data: bytes) -> None:
+        """Append to the recording, opening it on the first write."""
+        if self._file is None:
+            if os.path.exists(self.path):
+                # Drop a record cut short by a crash, so the new segment stays
+                # aligned
+                length = os.path.getsize(self.path)
+                os.truncate(self.path, length - length % _RECORD.size)
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+
+    async def flush(self) -> None:
+        """Write every buffered event to the recording."""
+        self._flush_in_background()
+        # Writes go one at a time, so events stay in order
+        while self._flushing is not None:
+            await asyncio.wait([self._flushing])
+            self._flush_in_background()
+
+    async def close(self) -> None:
+        """Write the buffered events and close the recording."""
+        await self.flush()
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    def stats(self) -> dict:
+        """Get the recording metrics.
+
+        Returns:
+            The recording file and the events recorded to it by this recorder.
+        """
+        return {"file": self.path, "events": self.events}
+
+
+def _read_records(data: bytes) -> Iterator[TrafficEvent]:
+    """Decode the records of a recording, timed from its first segment."""
+    kinds = list(_KIND_CODES)
+    first_start: Optional[float] = None
+    base = 0.0
+    # A record cut short at the end of the file is skipped
+    for position in range(0, len(data) - _RECORD.size + 1, _RECORD.size):
+        offset_ms, code, user, conversation, size, count = _RECORD.unpack_from(
+            data, position
+        )
+        if code == _SEGMENT_KIND:
+            version, _, start, _, _ = _SEGMENT.unpack_from(data, position)
+            if version != _VERSION:
+                raise ValueError(f"Unsupported traffic recording version {version}")
+            if first_start is None:
+                first_start = start
+            # Downtime between segments is kept, so restarts replay as quiet periods
+            base = start - first_start
+            continue
+        if first_start is None:
+            raise ValueError("Not a traffic recording")
+        yield TrafficEvent(
+            base + offset_ms / 1000,
+            kinds[code] if code < len(kinds) else OTHER,
+            user,
+            conversation,
+            size,
+            count,
+        )
+
+
+def read_traffic(path: str) -> List[TrafficEvent]:
+    """Read a recording.
+
+    Args:
+        path: The recording file.
+
+    Returns:
+        The events ordered by arrival.
+
+    Raises:
+        ValueError: If the file is not a traffic recording.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return sorted(_read_records(data), key=lambda event: event.offset)
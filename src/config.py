@@ -14,10 +14,31 @@ load_dotenv()
 # Discord Bot Configuration
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 COMMAND_PREFIX = os.getenv("COMMAND_PREFIX", "!oh ")
+# Port of the /health and /metrics endpoints; 0 picks a free port
+HEALTH_CHECK_PORT = int(os.getenv("HEALTH_CHECK_PORT", "8000"))
+# Interface of the health check server; /metrics shows usage per user and guild
+# without authentication, so it is only reachable from this host by default
+HEALTH_CHECK_HOST = os.getenv("HEALTH_CHECK_HOST", "127.0.0.1")
 
 # OpenHands Configuration
 OPENHANDS_CLI_PATH = os.getenv("OPENHANDS_CLI_PATH", "openhands.core.cli")
 OPENHANDS_WORKDIR = os.getenv("OPENHANDS_WORKDIR", "./openhands_workspace")
+# How runs are executed: subprocess (one CLI process per run), thread or process
+# (the CLI module called in this process or in a pool of warm worker processes) or
+# remote (a worker started with ``python -m src.adapter.worker``)
+OPENHANDS_BACKEND = os.getenv("OPENHANDS_BACKEND", "subprocess")
+OPENHANDS_BACKEND_WORKERS = int(os.getenv("OPENHANDS_BACKEND_WORKERS", "4"))
+# The thread backend changes the environment (including the LLM API key), arguments
+# and standard streams of the whole bot during a run, so it has to be opted into
+OPENHANDS_THREAD_BACKEND_ENABLED = (
+    os.getenv("OPENHANDS_THREAD_BACKEND_ENABLED", "false").lower() == "true"
+)
+OPENHANDS_REMOTE_URL = os.getenv("OPENHANDS_REMOTE_URL", "http://localhost:8100")
+# Required by workers listening on anything but a loopback address
+OPENHANDS_REMOTE_TOKEN = os.getenv("OPENHANDS_REMOTE_TOKEN")
+# Seconds a run waits for the worker that last served its workspace before using
+# any free worker of the process or remote backend
+AFFINITY_WAIT_SECONDS = float(os.getenv("AFFINITY_WAIT_SECONDS", "10"))
 
 # Ensure workspace directory exists
 WORKSPACE_PATH = Path(OPENHANDS_WORKDIR)
@@ -32,6 +53,12 @@ SANDBOX_RUNTIME_CONTAINER_IMAGE = os.getenv(
     "SANDBOX_RUNTIME_CONTAINER_IMAGE",
     "docker.all-hands.dev/all-hands-ai/runtime:0.28-nikolaik",
 )
+# Sandboxes kept ready ahead of runs; 0 prepares one per run as before. The docker
+# provider pulls the image ahead, as OpenHands starts the container of a run itself.
+# Sandboxes are single-use by default so no state leaks between users
+SANDBOX_POOL_SIZE = int(os.getenv("SANDBOX_POOL_SIZE", "0"))
+SANDBOX_POOL_PROVIDER = os.getenv("SANDBOX_POOL_PROVIDER", "docker")
+SANDBOX_POOL_MAX_USES = int(os.getenv("SANDBOX_POOL_MAX_USES", "1"))
 
 # Channel Configuration
 OPENHANDS_CHAT_CHANNEL = os.getenv("OPENHANDS_CHAT_CHANNEL", "openhands-chat")
@@ -39,6 +66,180 @@ OPENHANDS_CHAT_CHANNEL = os.getenv("OPENHANDS_CHAT_CHANNEL", "openhands-chat")
 # Task Configuration
 MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "5"))
 TASK_TIMEOUT_SECONDS = int(os.getenv("TASK_TIMEOUT_SECONDS", "300"))  # 5 minutes
+# Start workspace and sandbox setup while the bot is still replying on Discord
+EAGER_TASK_START = os.getenv("EAGER_TASK_START", "false").lower() == "true"
+# Tasks accepted from a single batch submission
+BATCH_MAX_TASKS = int(os.getenv("BATCH_MAX_TASKS", "20"))
+# On shutdown, running tasks get this long to finish; the rest are checkpointed and
+# resumed on the next start
+DRAIN_TIMEOUT_SECONDS = int(os.getenv("DRAIN_TIMEOUT_SECONDS", "120"))
+CHECKPOINT_FILE = os.getenv(
+    "CHECKPOINT_FILE", os.path.join(OPENHANDS_WORKDIR, ".checkpoint.json")
+)
+
+# Usage Accounting Configuration
+# Usage is summed per user and per guild over a rolling window kept in buckets
+USAGE_WINDOW_SECONDS = int(os.getenv("USAGE_WINDOW_SECONDS", "86400"))  # 1 day
+USAGE_BUCKET_SECONDS = int(os.getenv("USAGE_BUCKET_SECONDS", "3600"))
+# Quotas over the window; new work is rejected once one is used up (0 = unlimited)
+USER_QUOTA_WALL_SECONDS = int(os.getenv("USER_QUOTA_WALL_SECONDS", "0"))
+USER_QUOTA_CPU_SECONDS = int(os.getenv("USER_QUOTA_CPU_SECONDS", "0"))
+USER_QUOTA_OUTPUT_BYTES = int(os.getenv("USER_QUOTA_OUTPUT_BYTES", "0"))
+USER_QUOTA_TOKENS = int(os.getenv("USER_QUOTA_TOKENS", "0"))
+GUILD_QUOTA_WALL_SECONDS = int(os.getenv("GUILD_QUOTA_WALL_SECONDS", "0"))
+GUILD_QUOTA_CPU_SECONDS = int(os.getenv("GUILD_QUOTA_CPU_SECONDS", "0"))
+GUILD_QUOTA_OUTPUT_BYTES = int(os.getenv("GUILD_QUOTA_OUTPUT_BYTES", "0"))
+GUILD_QUOTA_TOKENS = int(os.getenv("GUILD_QUOTA_TOKENS", "0"))
+
+# Model Routing Configuration
+# Each request class (chat, short task, long task) can use its own model, API key,
+# worker pool size and timeout budget. Unset values fall back to the globals above.
+CHAT_LLM_MODEL = os.getenv("CHAT_LLM_MODEL", LLM_MODEL)
+CHAT_LLM_API_KEY = os.getenv("CHAT_LLM_API_KEY", LLM_API_KEY)
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "3"))
+CHAT_TIMEOUT_SECONDS = int(os.getenv("CHAT_TIMEOUT_SECONDS", "120"))
+
+SHORT_TASK_LLM_MODEL = os.getenv("SHORT_TASK_LLM_MODEL", LLM_MODEL)
+SHORT_TASK_LLM_API_KEY = os.getenv("SHORT_TASK_LLM_API_KEY", LLM_API_KEY)
+SHORT_TASK_MAX_CONCURRENT = int(
+    os.getenv("SHORT_TASK_MAX_CONCURRENT", str(MAX_CONCURRENT_TASKS))
+)
+SHORT_TASK_TIMEOUT_SECONDS = int(
+    os.getenv("SHORT_TASK_TIMEOUT_SECONDS", str(TASK_TIMEOUT_SECONDS))
+)
+
+LONG_TASK_LLM_MODEL = os.getenv("LONG_TASK_LLM_MODEL", LLM_MODEL)
+LONG_TASK_LLM_API_KEY = os.getenv("LONG_TASK_LLM_API_KEY", LLM_API_KEY)
+LONG_TASK_MAX_CONCURRENT = int(os.getenv("LONG_TASK_MAX_CONCURRENT", "2"))
+LONG_TASK_TIMEOUT_SECONDS = int(
+    os.getenv("LONG_TASK_TIMEOUT_SECONDS", str(TASK_TIMEOUT_SECONDS * 4))
+)
+
+# Task descriptions up to this many characters are routed as short tasks
+SHORT_TASK_MAX_CHARS = int(os.getenv("SHORT_TASK_MAX_CHARS", "280"))
+
+# Admission Control Configuration
+# Global limits across chat and tasks; requests beyond them are rejected quickly
+ADMISSION_MAX_SUBPROCESSES = int(
+    os.getenv(
+        "ADMISSION_MAX_SUBPROCESSES",
+        str(CHAT_MAX_CONCURRENT + SHORT_TASK_MAX_CONCURRENT + LONG_TASK_MAX_CONCURRENT),
+    )
+)
+ADMISSION_MAX_QUEUE_LENGTH = int(os.getenv("ADMISSION_MAX_QUEUE_LENGTH", "100"))
+ADMISSION_MAX_CHAT_WAITING = int(os.getenv("ADMISSION_MAX_CHAT_WAITING", "10"))
+ADMISSION_MIN_FREE_MEMORY_MB = int(os.getenv("ADMISSION_MIN_FREE_MEMORY_MB", "512"))
+
+# Resource Limit Configuration
+# Applied to every OpenHands process of the subprocess backend right after it is
+# spawned; 0 means unlimited
+OPENHANDS_LIMIT_ADDRESS_SPACE_MB = int(
+    os.getenv("OPENHANDS_LIMIT_ADDRESS_SPACE_MB", "0")
+)
+OPENHANDS_LIMIT_CPU_SECONDS = int(os.getenv("OPENHANDS_LIMIT_CPU_SECONDS", "0"))
+OPENHANDS_LIMIT_OPEN_FILES = int(os.getenv("OPENHANDS_LIMIT_OPEN_FILES", "0"))
+OPENHANDS_LIMIT_PROCESSES = int(os.getenv("OPENHANDS_LIMIT_PROCESSES", "0"))
+# Existing cgroup v2 directory the processes are moved into, e.g.
+# /sys/fs/cgroup/openhands (must be writable by the bot user)
+OPENHANDS_CGROUP_PATH = os.getenv("OPENHANDS_CGROUP_PATH", "")
+RESOURCE_SAMPLE_INTERVAL_SECONDS = float(
+    os.getenv("RESOURCE_SAMPLE_INTERVAL_SECONDS", "1.0")
+)
+
+# Rate Limit Configuration
+# Token buckets per user, channel and guild, shared by chat, prefix and slash commands
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "10"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+RATE_LIMIT_CHANNEL_PER_MINUTE = float(os.getenv("RATE_LIMIT_CHANNEL_PER_MINUTE", "30"))
+RATE_LIMIT_CHANNEL_BURST = float(os.getenv("RATE_LIMIT_CHANNEL_BURST", "10"))
+RATE_LIMIT_GUILD_PER_MINUTE = float(os.getenv("RATE_LIMIT_GUILD_PER_MINUTE", "120"))
+RATE_LIMIT_GUILD_BURST = float(os.getenv("RATE_LIMIT_GUILD_BURST", "30"))
+RATE_LIMIT_COMPACT_INTERVAL_SECONDS = float(
+    os.getenv("RATE_LIMIT_COMPACT_INTERVAL_SECONDS", "300")
+)
+
+# Chat Session Configuration
+# With CHAT_USE_THREADS, each conversation in the chat channel gets its own thread,
+# session and workspace
+CHAT_USE_THREADS = os.getenv("CHAT_USE_THREADS", "false").lower() == "true"
+CHAT_CONTEXT_MAX_MESSAGES = int(os.getenv("CHAT_CONTEXT_MAX_MESSAGES", "20"))
+CHAT_CONTEXT_MAX_CHARS = int(os.getenv("CHAT_CONTEXT_MAX_CHARS", "8000"))
+THREAD_IDLE_TIMEOUT_SECONDS = int(os.getenv("THREAD_IDLE_TIMEOUT_SECONDS", "3600"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))
+
+# Adaptive Timeout Configuration
+# Timeouts are derived from the recorded runtimes of previous runs of the same kind
+ADAPTIVE_TIMEOUT_ENABLED = (
+    os.getenv("ADAPTIVE_TIMEOUT_ENABLED", "true").lower() == "true"
+)
+ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv("ADAPTIVE_TIMEOUT_PERCENTILE", "95"))
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "2.0"))
+ADAPTIVE_TIMEOUT_MIN_SECONDS = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SECONDS", "30"))
+ADAPTIVE_TIMEOUT_MAX_SECONDS = int(os.getenv("ADAPTIVE_TIMEOUT_MAX_SECONDS", "3600"))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "5"))
+RUNTIME_HISTORY_SIZE = int(os.getenv("RUNTIME_HISTORY_SIZE", "50"))
+
+# Output Configuration
+# Workers are asked to emit JSON-lines events; plain text output is still parsed
+OPENHANDS_OUTPUT_FORMAT = os.getenv("OPENHANDS_OUTPUT_FORMAT", "jsonl")
+EVENT_LOG_MAX_ITEMS = int(os.getenv("EVENT_LOG_MAX_ITEMS", "50"))
+EVENT_LOG_TAIL_LINES = int(os.getenv("EVENT_LOG_TAIL_LINES", "20"))
+STDERR_TAIL_BYTES = int(os.getenv("STDERR_TAIL_BYTES", "8192"))
+# Task output is spooled to disk; only the tail of each stream stays in memory
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(OPENHANDS_WORKDIR, ".spool"))
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(256 * 1024 * 1024)))
+# Output collected in memory before it is written to the spool file off the loop
+SPOOL_BUFFER_BYTES = int(os.getenv("SPOOL_BUFFER_BYTES", str(256 * 1024)))
+LOG_PREVIEW_BYTES = int(os.getenv("LOG_PREVIEW_BYTES", "1500"))
+# Rendered embeds and list fields of finished tasks kept for reuse
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+
+# Tracing Configuration
+# Spans are exported to a JSON-lines file ("jsonl") or an OTLP/HTTP collector ("otlp")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "jsonl")
+TRACING_FILE = os.getenv("TRACING_FILE", "./traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv(
+    "TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+)
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "0.1"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "openhands-discord")
+
+# Traffic Recording Configuration
+# Anonymised arrival times, kinds and sizes of messages and commands are appended to
+# this file for replay with ``python -m src.bot.replay``; empty disables recording
+TRAFFIC_RECORD_FILE = os.getenv("TRAFFIC_RECORD_FILE", "")
+
+# Workspace Change Tracking Configuration
+# While enabled, runs sharing a workspace (the tasks and chat of a user, or a thread)
+# take turns, so every change manifest holds only the changes of its own run
+WORKSPACE_SNAPSHOT_ENABLED = (
+    os.getenv("WORKSPACE_SNAPSHOT_ENABLED", "true").lower() == "true"
+)
+WORKSPACE_SNAPSHOT_IGNORE = [
+    name.strip()
+    for name in os.getenv(
+        "WORKSPACE_SNAPSHOT_IGNORE", ".git,__pycache__,node_modules,.venv,venv"
+    ).split(",")
+    if name.strip()
+]
+WORKSPACE_MANIFEST_MAX_ENTRIES = int(os.getenv("WORKSPACE_MANIFEST_MAX_ENTRIES", "200"))
+# Discord rejects attachments above 8 MiB on servers without boosts
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(8 * 1024 * 1024)))
+ARTIFACT_MAX_FILES = int(os.getenv("ARTIFACT_MAX_FILES", "10"))
+
+# Task Record Configuration
+# Finished tasks keep a short preview in memory; the rest of the output is
+# compressed and, when large, written under OPENHANDS_WORKDIR
+RESULT_PREVIEW_CHARS = int(os.getenv("RESULT_PREVIEW_CHARS", "1000"))
+RESULT_COMPRESS_MIN_BYTES = int(os.getenv("RESULT_COMPRESS_MIN_BYTES", "256"))
+RESULT_SPILL_MIN_BYTES = int(os.getenv("RESULT_SPILL_MIN_BYTES", str(64 * 1024)))
+RESULT_SPILL_DIR = os.getenv(
+    "RESULT_SPILL_DIR", os.path.join(OPENHANDS_WORKDIR, ".results")
+)
+# Seconds finished tasks are kept before their records and files are deleted
+TASK_RETENTION_SECONDS = int(os.getenv("TASK_RETENTION_SECONDS", "86400"))
 
 
 class Config:
@@ -48,32 +249,116 @@ class Config:
         """Initialize the configuration."""
         self.discord_token: Optional[str] = DISCORD_TOKEN
         self.command_prefix: str = COMMAND_PREFIX
+        self.health_check_port: int = HEALTH_CHECK_PORT
+        self.health_check_host: str = HEALTH_CHECK_HOST
         self.openhands_cli_path: str = OPENHANDS_CLI_PATH
         self.openhands_workdir: str = OPENHANDS_WORKDIR
+        self.openhands_backend: str = OPENHANDS_BACKEND
+        self.openhands_backend_workers: int = OPENHANDS_BACKEND_WORKERS
+        self.openhands_thread_backend_enabled: bool = OPENHANDS_THREAD_BACKEND_ENABLED
+        self.openhands_remote_url: str = OPENHANDS_REMOTE_URL
+        self.affinity_wait_seconds: float = AFFINITY_WAIT_SECONDS
         self.llm_api_key: Optional[str] = LLM_API_KEY
         self.llm_model: str = LLM_MODEL
         self.sandbox_runtime_container_image: str = SANDBOX_RUNTIME_CONTAINER_IMAGE
+        self.sandbox_pool_size: int = SANDBOX_POOL_SIZE
+        self.sandbox_pool_provider: str = SANDBOX_POOL_PROVIDER
+        self.sandbox_pool_max_uses: int = SANDBOX_POOL_MAX_USES
         self.openhands_chat_channel: str = OPENHANDS_CHAT_CHANNEL
         self.max_concurrent_tasks: int = MAX_CONCURRENT_TASKS
         self.task_timeout_seconds: int = TASK_TIMEOUT_SECONDS
+        self.eager_task_start: bool = EAGER_TASK_START
+        self.batch_max_tasks: int = BATCH_MAX_TASKS
+        self.drain_timeout_seconds: int = DRAIN_TIMEOUT_SECONDS
+        self.checkpoint_file: str = CHECKPOINT_FILE
+        self.usage_window_seconds: int = USAGE_WINDOW_SECONDS
+        self.usage_bucket_seconds: int = USAGE_BUCKET_SECONDS
+        self.user_quota_wall_seconds: int = USER_QUOTA_WALL_SECONDS
+        self.user_quota_cpu_seconds: int = USER_QUOTA_CPU_SECONDS
+        self.user_quota_output_bytes: int = USER_QUOTA_OUTPUT_BYTES
+        self.user_quota_tokens: int = USER_QUOTA_TOKENS
+        self.guild_quota_wall_seconds: int = GUILD_QUOTA_WALL_SECONDS
+        self.guild_quota_cpu_seconds: int = GUILD_QUOTA_CPU_SECONDS
+        self.guild_quota_output_bytes: int = GUILD_QUOTA_OUTPUT_BYTES
+        self.guild_quota_tokens: int = GUILD_QUOTA_TOKENS
+        self.chat_llm_model: str = CHAT_LLM_MODEL
+        self.chat_max_concurrent: int = CHAT_MAX_CONCURRENT
+        self.chat_timeout_seconds: int = CHAT_TIMEOUT_SECONDS
+        self.short_task_llm_model: str = SHORT_TASK_LLM_MODEL
+        self.short_task_max_concurrent: int = SHORT_TASK_MAX_CONCURRENT
+        self.short_task_timeout_seconds: int = SHORT_TASK_TIMEOUT_SECONDS
+        self.long_task_llm_model: str = LONG_TASK_LLM_MODEL
+        self.long_task_max_concurrent: int = LONG_TASK_MAX_CONCURRENT
+        self.long_task_timeout_seconds: int = LONG_TASK_TIMEOUT_SECONDS
+        self.short_task_max_chars: int = SHORT_TASK_MAX_CHARS
+        self.admission_max_subprocesses: int = ADMISSION_MAX_SUBPROCESSES
+        self.admission_max_queue_length: int = ADMISSION_MAX_QUEUE_LENGTH
+        self.admission_max_chat_waiting: int = ADMISSION_MAX_CHAT_WAITING
+        self.admission_min_free_memory_mb: int = ADMISSION_MIN_FREE_MEMORY_MB
+        self.openhands_limit_address_space_mb: int = OPENHANDS_LIMIT_ADDRESS_SPACE_MB
+        self.openhands_limit_cpu_seconds: int = OPENHANDS_LIMIT_CPU_SECONDS
+        self.openhands_limit_open_files: int = OPENHANDS_LIMIT_OPEN_FILES
+        self.openhands_limit_processes: int = OPENHANDS_LIMIT_PROCESSES
+        self.openhands_cgroup_path: str = OPENHANDS_CGROUP_PATH
+        self.rate_limit_enabled: bool = RATE_LIMIT_ENABLED
+        self.rate_limit_user_per_minute: float = RATE_LIMIT_USER_PER_MINUTE
+        self.rate_limit_user_burst: float = RATE_LIMIT_USER_BURST
+        self.rate_limit_channel_per_minute: float = RATE_LIMIT_CHANNEL_PER_MINUTE
+        self.rate_limit_channel_burst: float = RATE_LIMIT_CHANNEL_BURST
+        self.rate_limit_guild_per_minute: float = RATE_LIMIT_GUILD_PER_MINUTE
+        self.rate_limit_guild_burst: float = RATE_LIMIT_GUILD_BURST
+        self.rate_limit_compact_interval_seconds: float = (
+            RATE_LIMIT_COMPACT_INTERVAL_SECONDS
+        )
+        self.chat_use_threads: bool = CHAT_USE_THREADS
+        self.chat_context_max_messages: int = CHAT_CONTEXT_MAX_MESSAGES
+        self.thread_idle_timeout_seconds: int = THREAD_IDLE_TIMEOUT_SECONDS
+        self.adaptive_timeout_enabled: bool = ADAPTIVE_TIMEOUT_ENABLED
+        self.adaptive_timeout_percentile: float = ADAPTIVE_TIMEOUT_PERCENTILE
+        self.adaptive_timeout_multiplier: float = ADAPTIVE_TIMEOUT_MULTIPLIER
+        self.adaptive_timeout_min_seconds: int = ADAPTIVE_TIMEOUT_MIN_SECONDS
+        self.adaptive_timeout_max_seconds: int = ADAPTIVE_TIMEOUT_MAX_SECONDS
+        self.openhands_output_format: str = OPENHANDS_OUTPUT_FORMAT
+        self.tracing_enabled: bool = TRACING_ENABLED
+        self.tracing_exporter: str = TRACING_EXPORTER
+        self.tracing_sample_rate: float = TRACING_SAMPLE_RATE
+        self.traffic_record_file: str = TRAFFIC_RECORD_FILE
+        self.spool_dir: str = SPOOL_DIR
+        self.spool_max_bytes: int = SPOOL_MAX_BYTES
+        self.spool_buffer_bytes: int = SPOOL_BUFFER_BYTES
+        self.workspace_snapshot_enabled: bool = WORKSPACE_SNAPSHOT_ENABLED
+        self.artifact_max_bytes: int = ARTIFACT_MAX_BYTES
+        self.artifact_max_files: int = ARTIFACT_MAX_FILES
+        self.result_preview_chars: int = RESULT_PREVIEW_CHARS
+        self.render_cache_size: int = RENDER_CACHE_SIZE
+        self.result_spill_min_bytes: int = RESULT_SPILL_MIN_BYTES
+        self.result_spill_dir: str = RESULT_SPILL_DIR
+        self.task_retention_seconds: int = TASK_RETENTION_SECONDS
 
 
 # Validate required environment variables
-def validate_config() -> None:
-    """Validate that all required environment variables are set."""
+def validate_config(config: Optional[Config] = None) -> None:
+    """Validate that all required environment variables are set.
+
+    Called when the bot starts rather than on import, so modules can be imported
+    and tested without credentials.
+
+    Args:
+        config: The configuration to check. Defaults to the environment.
+
+    Raises:
+        ValueError: If required variables are missing.
+    """
+    config = config or Config()
     missing_vars = []
 
-    if not DISCORD_TOKEN:
+    if not config.discord_token:
         missing_vars.append("DISCORD_TOKEN")
 
-    if not LLM_API_KEY:
+    if not config.llm_api_key:
         missing_vars.append("LLM_API_KEY")
 
     if missing_vars:
         raise ValueError(
             f"Missing required environment variables: {', '.join(missing_vars)}"
         )
-
-
-# Call validation function
-validate_config()
@@ -2,12 +2,249 @@
 Formatter Module
 
 This module provides utilities for formatting responses for Discord.
+
+Finished tasks never change unless their record does, so their embeds and task list
+fields are rendered once per record version and served from a cache afterwards. The
+cache belongs to the caller, e.g. one per bot, and is passed to the formatters.
 """
 
-from typing import List
+import heapq
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
 
 import discord
 
+from src.config import RENDER_CACHE_SIZE
+
+T = TypeVar("T")
+
+STATUS_EMOJI = {
+    "pending": "⏳",
+    "running": "🔄",
+    "completed": "✅",
+    "failed": "❌",
+    "checkpointed": "💾",
+}
+
+STATUS_COLORS = {
+    "pending": discord.Color.blue(),
+    "running": discord.Color.gold(),
+    "completed": discord.Color.green(),
+    "failed": discord.Color.red(),
+    "checkpointed": discord.Color.greyple(),
+}
+
+# Discord allows at most 25 fields per embed
+MAX_EMBED_FIELDS = 25
+# Discord limit for the description of an embed
+MAX_EMBED_DESCRIPTION = 4096
+
+
+class RenderCache:
+    """Least recently used cache of rendered task fragments."""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_entries: Fragments kept before the least recently used are
+                evicted. Zero disables the cache.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get_or_render(self, key: Optional[Hashable], render: Callable[[], T]) -> T:
+        """Get a cached fragment, rendering and caching it on a miss.
+
+        Args:
+            key: The cache key, or None for fragments that must not be cached.
+            render: Function rendering the fragment.
+
+        Returns:
+            The fragment.
+        """
+        if key is None or self.max_entries <= 0:
+            return render()
+        try:
+            value: T = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = render()
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def clear(self) -> None:
+        """Drop every cached fragment and reset the metrics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """Get the cache metrics.
+
+        Returns:
+            Cached fragments, hits and misses.
+        """
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Renders every fragment, for callers without a cache
+_NO_CACHE = RenderCache(0)
+
+
+def render_key(task: dict) -> Optional[Tuple[str, int]]:
+    """Get the cache key of a task's renderings.
+
+    Args:
+        task: The task dictionary.
+
+    Returns:
+        The task ID and record version, or None if the rendering must not be
+        cached: unversioned dictionaries, and unfinished tasks whose ETA changes.
+    """
+    version = task.get("version")
+    if version is None or task.get("status") in ("pending", "running"):
+        return None
+    return (str(task.get("task_id", task.get("id"))), version)
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in seconds as a short human readable string.
+
+    Args:
+        seconds: The duration in seconds.
+
+    Returns:
+        A string such as ``45s``, ``3m 20s`` or ``1h 5m``.
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+
+def format_eta(task: dict) -> Optional[str]:
+    """Format the estimated time to completion of an unfinished task.
+
+    Args:
+        task: The task dictionary.
+
+    Returns:
+        The ETA line, or None if the task is finished or has no estimate.
+    """
+    eta = task.get("eta_seconds")
+    if eta is None or task.get("status") not in ("pending", "running"):
+        return None
+    if eta <= 0:
+        return "ETA: any moment now"
+    return f"ETA: ~{format_duration(eta)}"
+
+
+def add_event_fields(embed: discord.Embed, events: Optional[dict]) -> None:
+    """Add a summary of the structured events of a run to an embed.
+
+    Args:
+        embed: The embed to add fields to.
+        events: The compact event log of the run, if any.
+    """
+    if not events:
+        return
+
+    files = events.get("files") or {}
+    if files:
+        lines = [f"`{path}` ({change})" for path, change in list(files.items())[:10]]
+        if len(files) > 10:
+            lines.append(f"... and {len(files) - 10} more")
+        embed.add_field(name="Files Changed", value="\n".join(lines), inline=False)
+
+    counts = events.get("counts") or {}
+    if counts.get("action"):
+        last_actions = [f"`{action[:80]}`" for action in events.get("actions", [])[-3:]]
+        value = f"{counts['action']} action(s)"
+        if last_actions:
+            value += "\nLast: " + ", ".join(last_actions)
+        embed.add_field(name="Activity", value=value[:1024], inline=False)
+
+    errors = events.get("errors") or []
+    if errors:
+        embed.add_field(
+            name="Reported Errors", value="\n".join(errors[:3])[:1024], inline=False
+        )
+
+
+def add_change_fields(embed: discord.Embed, changes: Optional[dict]) -> None:
+    """Add the workspace change manifest of a task to an embed.
+
+    Args:
+        embed: The embed to add the field to.
+        changes: The change manifest of the task, if any.
+    """
+    if not changes or not changes.get("total"):
+        return
+
+    lines = [
+        f"+{len(changes['added'])} ~{len(changes['modified'])} "
+        f"-{len(changes['deleted'])}"
+    ]
+    for prefix, key in (("+", "added"), ("~", "modified")):
+        for change in changes[key][:5]:
+            lines.append(f"{prefix} `{change['path']}`")
+    for path in changes["deleted"][:5]:
+        lines.append(f"- `{path}`")
+    embed.add_field(
+        name="Workspace Changes", value="\n".join(lines)[:1024], inline=False
+    )
+
+
+def add_truncation_note(embed: discord.Embed, result: dict) -> None:
+    """Note that a result holds only a preview of the task output.
+
+    Args:
+        embed: The embed to add the field to.
+        result: The task result dictionary.
+    """
+    if not result.get("output_truncated"):
+        return
+    embed.add_field(
+        name="Note",
+        value=(
+            f"Showing a preview of {len(result.get('output', ''))} of "
+            f"{result.get('output_size', 0)} output characters"
+        ),
+        inline=False,
+    )
+
+
+def add_resource_field(embed: discord.Embed, resources: Optional[dict]) -> None:
+    """Add the resource usage of a run to an embed.
+
+    Args:
+        embed: The embed to add the field to.
+        resources: The measured resource usage, if any.
+    """
+    if not resources:
+        return
+    embed.add_field(
+        name="Resources",
+        value=(
+            f"Wall {format_duration(resources.get('wall_seconds', 0))} · "
+            f"CPU {resources.get('cpu_seconds', 0):.1f}s · "
+            f"Peak memory {resources.get('max_rss_mb', 0):.0f} MB"
+        ),
+        inline=False,
+    )
+
 
 def format_result(result: dict) -> discord.Embed:
     """Format a task result as a Discord embed.
@@ -44,6 +281,8 @@ def format_result(result: dict) -> discord.Embed:
                     break
         else:
             embed.add_field(name="Output", value=output or "No output", inline=False)
+        add_truncation_note(embed, result)
+        add_event_fields(embed, result.get("events"))
     else:
         embed = discord.Embed(
             title="Task Failed",
@@ -63,26 +302,33 @@ def format_result(result: dict) -> discord.Embed:
                 )
             else:
                 embed.add_field(name="Output", value=output, inline=False)
+            add_truncation_note(embed, result)
+        add_event_fields(embed, result.get("events"))
+
+    add_resource_field(embed, result.get("resources"))
 
     return embed
 
 
-def format_status(status: dict) -> discord.Embed:
+def format_status(status: dict, cache: Optional[RenderCache] = None) -> discord.Embed:
     """Format a task status as a Discord embed.
 
     Args:
         status: The task status dictionary.
+        cache: Cache of rendered fragments, or None to render every time.
 
     Returns:
-        A Discord embed.
+        A Discord embed. Embeds of finished tasks are cached and shared, so they
+        must not be modified.
     """
-    status_colors = {
-        "pending": discord.Color.blue(),
-        "running": discord.Color.gold(),
-        "completed": discord.Color.green(),
-        "failed": discord.Color.red(),
-    }
+    key = render_key(status)
+    return (cache or _NO_CACHE).get_or_render(
+        ("status", *key) if key else None, lambda: render_status(status)
+    )
+
 
+def render_status(status: dict) -> discord.Embed:
+    """Render the embed of ``format_status`` without the cache."""
     if "error" in status:
         embed = discord.Embed(
             title="Error", description=status["error"], color=discord.Color.red()
@@ -92,10 +338,15 @@ def format_status(status: dict) -> discord.Embed:
     # Use task_id if available, otherwise fall back to id
     task_id = status.get("task_id", status.get("id", "Unknown"))
 
+    description = f"Task: {task_id}\nStatus: {status.get('status', 'Unknown')}\nDescription: {status.get('description', 'No description')}"
+    eta = format_eta(status)
+    if eta:
+        description += f"\n{eta}"
+
     embed = discord.Embed(
         title="Task Status",
-        description=f"Task: {task_id}\nStatus: {status.get('status', 'Unknown')}\nDescription: {status.get('description', 'No description')}",
-        color=status_colors.get(
+        description=description,
+        color=STATUS_COLORS.get(
             str(status.get("status", "")), discord.Color.light_grey()
         ),
     )
@@ -115,24 +366,36 @@ def format_status(status: dict) -> discord.Embed:
                     embed.add_field(
                         name="Output", value=output or "No output", inline=False
                     )
+                add_truncation_note(embed, result)
             else:
                 embed.add_field(
                     name="Error",
                     value=result.get("error", "Unknown error"),
                     inline=False,
                 )
+            add_event_fields(embed, result.get("events"))
+            add_resource_field(embed, result.get("resources"))
         else:
             # Handle string result
             embed.add_field(name="Result", value=result, inline=False)
 
+    add_change_fields(embed, status.get("changes"))
+
+    # Lets a slow task be looked up in the trace backend
+    if status.get("trace_id"):
+        embed.set_footer(text=f"Trace {status['trace_id']}")
+
     return embed
 
 
-def format_tasks_list(tasks: List[dict]) -> discord.Embed:
+def format_tasks_list(
+    tasks: List[dict], cache: Optional[RenderCache] = None
+) -> discord.Embed:
     """Format a list of tasks as a Discord embed.
 
     Args:
         tasks: A list of task dictionaries.
+        cache: Cache of rendered fragments, or None to render every time.
 
     Returns:
         A Discord embed.
@@ -145,15 +408,16 @@ def format_tasks_list(tasks: List[dict]) -> discord.Embed:
         )
         return embed
 
-    # Create task summary for description
-    task_summary = []
-    for task in tasks:
+    # Create task summary for description, within Discord's limit
+    description = f"Total: {len(tasks)} tasks"
+    for i, task in enumerate(tasks):
         # Use task_id if available, otherwise fall back to id
         task_id = task.get("task_id", task.get("id", "Unknown"))
-        status = task.get("status", "Unknown")
-        task_summary.append(f"{task_id}: {status}")
-
-    description = f"Total: {len(tasks)} tasks\n" + "\n".join(task_summary)
+        line = f"{task_id}: {task.get('status', 'Unknown')}"
+        if len(description) + len(line) + 40 > MAX_EMBED_DESCRIPTION:
+            description += f"\n…and {len(tasks) - i} more"
+            break
+        description += "\n" + line
 
     embed = discord.Embed(
         title="Your Tasks",
@@ -161,57 +425,211 @@ def format_tasks_list(tasks: List[dict]) -> discord.Embed:
         color=discord.Color.blue(),
     )
 
-    # Sort tasks by creation time (newest first)
-    sorted_tasks = sorted(tasks, key=lambda t: t.get("created_at", 0), reverse=True)
-
-    # Limit to 10 tasks to avoid hitting Discord's limits
-    for task in sorted_tasks[:10]:
-        # Use task_id if available, otherwise fall back to id
-        task_id = task.get("task_id", task.get("id", "Unknown"))
-        status = task.get("status", "Unknown")
-        status_emoji = {
-            "pending": "⏳",
-            "running": "🔄",
-            "completed": "✅",
-            "failed": "❌",
-        }.get(status, "❓")
-
-        value = f"{status_emoji} Status: {status}"
-
-        # Add result summary if available
-        if task.get("result"):
-            result = task["result"]
-            if isinstance(result, dict):
-                if result.get("success"):
-                    value += "\n✅ Result: Success"
-                else:
-                    value += f"\n❌ Error: {result.get('error', 'Unknown error')[:100]}"
-            else:
-                # Handle string result
-                value += f"\n📝 Result: {str(result)[:100]}"
+    # Newest 10 tasks, to avoid hitting Discord's limits
+    newest = heapq.nlargest(10, tasks, key=lambda t: t.get("created_at", 0))
+    for task in newest:
+        key = render_key(task)
+        name, value = (cache or _NO_CACHE).get_or_render(
+            ("field", *key) if key else None, lambda: render_task_field(task)
+        )
+        embed.add_field(name=name, value=value, inline=False)
 
+    if len(tasks) > 10:
         embed.add_field(
-            name=f"Task: {task_id}",
+            name="Note",
             value=(
-                f"**Description**: {task.get('description', 'No description')[:100]}\n"
-                f"{value}"
+                f"Showing 10 of {len(tasks)} tasks. "
+                "Use `!oh status <task_id>` to view a specific task."
             ),
             inline=False,
         )
 
-    if len(sorted_tasks) > 10:
+    return embed
+
+
+def render_task_field(task: dict) -> Tuple[str, str]:
+    """Render the name and value of the field of a task in the task list."""
+    # Use task_id if available, otherwise fall back to id
+    task_id = task.get("task_id", task.get("id", "Unknown"))
+    status = task.get("status", "Unknown")
+    value = f"{STATUS_EMOJI.get(status, '❓')} Status: {status}"
+    eta = format_eta(task)
+    if eta:
+        value += f" ({eta})"
+
+    # Add result summary if available
+    if task.get("result"):
+        result = task["result"]
+        if isinstance(result, dict):
+            if result.get("success"):
+                value += "\n✅ Result: Success"
+            else:
+                value += f"\n❌ Error: {result.get('error', 'Unknown error')[:100]}"
+        else:
+            # Handle string result
+            value += f"\n📝 Result: {str(result)[:100]}"
+
+    return (
+        f"Task: {task_id}",
+        f"**Description**: {task.get('description', 'No description')[:100]}\n"
+        f"{value}",
+    )
+
+
+def format_batch_status(
+    statuses: List[dict], title: str = "Batch Status"
+) -> discord.Embed:
+    """Format the status of several tasks as a single Discord embed.
+
+    Args:
+        statuses: Task status dictionaries, as returned by
+            ``OpenHandsAdapter.get_tasks_status``.
+        title: The title of the embed.
+
+    Returns:
+        A Discord embed with a summary line and one field per task.
+    """
+    counts: Dict[str, int] = {}
+    for status in statuses:
+        # Unknown IDs only carry an error
+        state = str(status.get("status", "not found"))
+        counts[state] = counts.get(state, 0) + 1
+    summary = " · ".join(
+        f"{STATUS_EMOJI.get(state, '❓')} {count} {state}"
+        for state, count in counts.items()
+    )
+
+    if counts.get("failed") or counts.get("not found"):
+        color = discord.Color.red()
+    elif counts.get("pending") or counts.get("running"):
+        color = discord.Color.gold()
+    else:
+        color = discord.Color.green()
+    embed = discord.Embed(
+        title=title,
+        description=f"Total: {len(statuses)} tasks\n{summary}",
+        color=color,
+    )
+
+    # Keep a field free for the note about hidden tasks
+    shown = statuses
+    if len(statuses) > MAX_EMBED_FIELDS:
+        shown = statuses[: MAX_EMBED_FIELDS - 1]
+    for status in shown:
+        task_id = status.get("task_id", status.get("id", "Unknown"))
+        if "status" not in status:
+            embed.add_field(
+                name=f"❓ {task_id}",
+                value=status.get("error", "Task not found"),
+                inline=False,
+            )
+            continue
+
+        value = f"**Description**: {status.get('description', 'No description')[:100]}"
+        eta = format_eta(status)
+        if eta:
+            value += f"\n{eta}"
+        result = status.get("result")
+        if isinstance(result, dict) and not result.get("success"):
+            value += f"\nError: {str(result.get('error', 'Unknown error'))[:100]}"
+        elif status.get("error"):
+            value += f"\nError: {str(status['error'])[:100]}"
+        embed.add_field(
+            name=f"{STATUS_EMOJI.get(status['status'], '❓')} {task_id}",
+            value=value,
+            inline=False,
+        )
+
+    if len(shown) < len(statuses):
         embed.add_field(
             name="Note",
-            value=(
-                f"Showing 10 of {len(sorted_tasks)} tasks. "
-                "Use `!oh status <task_id>` to view a specific task."
-            ),
+            value=f"Showing {len(shown)} of {len(statuses)} tasks.",
             inline=False,
         )
 
     return embed
 
 
+def format_log(log: dict) -> discord.Embed:
+    """Format the spooled output of a task as a Discord embed.
+
+    Args:
+        log: The result of ``OpenHandsAdapter.get_task_log``.
+
+    Returns:
+        A Discord embed showing the tail of the log.
+    """
+    size = log.get("size", 0)
+    embed = discord.Embed(
+        title="Task Log",
+        description=(
+            f"Task: {log.get('task_id')}\nStream: {log.get('stream')}\n"
+            f"Size: {size} bytes"
+        ),
+        color=discord.Color.blurple(),
+    )
+    # Leave room for the code block markers within the field limit
+    tail = log.get("preview", "")[-1000:].replace("```", "` ` `")
+    embed.add_field(
+        name="Output" if len(tail) >= size else "Tail",
+        value=f"```\n{tail}\n```" if tail else "No output",
+        inline=False,
+    )
+    return embed
+
+
+def format_usage_line(usage: dict) -> str:
+    """Format the usage totals of a user or guild on one line.
+
+    Args:
+        usage: Amounts per usage field.
+
+    Returns:
+        A line such as ``3 runs · Wall 5m 2s · CPU 40.1s · 12 KB · 1200 tokens``.
+    """
+    return (
+        f"{usage.get('runs', 0):.0f} runs · "
+        f"Wall {format_duration(usage.get('wall_seconds', 0))} · "
+        f"CPU {usage.get('cpu_seconds', 0):.1f}s · "
+        f"{usage.get('output_bytes', 0) / 1024:.0f} KB · "
+        f"{usage.get('tokens', 0):.0f} tokens"
+    )
+
+
+def format_usage(report: dict) -> discord.Embed:
+    """Format a usage report as a Discord embed.
+
+    Args:
+        report: The result of ``OpenHandsAdapter.get_usage``.
+
+    Returns:
+        A Discord embed listing the users and guilds with the most usage.
+    """
+    embed = discord.Embed(
+        title="Usage",
+        description=f"Last {format_duration(report.get('window_seconds', 0))}",
+        color=discord.Color.blurple(),
+    )
+    for title, scope, mention in (
+        ("Users", "users", "<@{}>"),
+        ("Servers", "guilds", "{}"),
+    ):
+        rows = report.get(scope, [])
+        if not rows:
+            continue
+        embed.add_field(
+            name=title,
+            value="\n".join(
+                f"{mention.format(subject)}: {format_usage_line(usage)}"
+                for subject, usage in rows
+            )[:1024],
+            inline=False,
+        )
+    if not embed.fields:
+        embed.add_field(name="Usage", value="No usage in this window", inline=False)
+    return embed
+
+
 def format_help(command_prefix: str) -> str:
     """Format help message.
 
@@ -227,15 +645,37 @@ def format_help(command_prefix: str) -> str:
     help_text += "**Prefix Commands:**\n"
     help_text += f"`{command_prefix}task <description>` - Create a new task\n"
     help_text += (
-        f"`{command_prefix}status [task_id]` - Check task status or list all tasks\n"
+        f"`{command_prefix}task --model <route> <description>` - "
+        "Create a task on a specific model route (`short_task` or `long_task`)\n"
+    )
+    help_text += (
+        f"`{command_prefix}task --thread <description>` - "
+        "Run a task in a new thread with its own workspace\n"
     )
+    help_text += (
+        f"`{command_prefix}batch` - Create one task per line of the message "
+        "or of an attached text file\n"
+    )
+    help_text += (
+        f"`{command_prefix}status [task_id ...]` - Check the status of tasks or "
+        "batches, or list all tasks\n"
+    )
+    help_text += (
+        f"`{command_prefix}files <task_id>` - Download the files a task changed\n"
+    )
+    help_text += f"`{command_prefix}log <task_id> [stderr]` - Download the raw output of a task\n"
+    help_text += f"`{command_prefix}usage [user]` - Show usage per user and server (owner only)\n"
     help_text += f"`{command_prefix}help` - Show this help message\n\n"
 
     # Add slash commands section
     help_text += "**Slash Commands:**\n"
-    help_text += "`/task <description>` - Create a new task\n"
-    help_text += "`/status [task_id]` - Check task status or list all tasks\n"
+    help_text += "`/task <description> [model] [thread]` - Create a new task\n"
+    help_text += "`/batch <file> [model]` - Create one task per line of a text file\n"
+    help_text += "`/status [task_id]` - Check the status of one or more tasks (space separated) or list all tasks\n"
     help_text += "`/tasks` - List all your tasks\n"
+    help_text += "`/files <task_id>` - Download the files a task changed\n"
+    help_text += "`/log <task_id> [stream]` - Download the raw output of a task\n"
+    help_text += "`/usage [user]` - Show usage per user and server (owner only)\n"
     help_text += "`/help` - Show this help message\n\n"
 
     # Add examples section
@@ -249,5 +689,8 @@ def format_help(command_prefix: str) -> str:
     # Add chat mode section
     help_text += "**Chat Mode:**\n"
     help_text += "You can also chat directly with OpenHands in DMs or in the designated channel.\n"
+    help_text += (
+        "Each thread is a separate conversation with its own context and workspace.\n"
+    )
 
     return help_text
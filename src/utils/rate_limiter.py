@@ -0,0 +1,207 @@
+"""
+Rate Limiter Module
+
+This module provides in-memory token bucket rate limiting for Discord requests.
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import (
+    RATE_LIMIT_CHANNEL_BURST,
+    RATE_LIMIT_CHANNEL_PER_MINUTE,
+    RATE_LIMIT_COMPACT_INTERVAL_SECONDS,
+    RATE_LIMIT_GUILD_BURST,
+    RATE_LIMIT_GUILD_PER_MINUTE,
+    RATE_LIMIT_USER_BURST,
+    RATE_LIMIT_USER_PER_MINUTE,
+)
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by an arbitrary string, refilled lazily on access."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the limiter.
+
+        Args:
+            rate_per_minute: Tokens added to every bucket per minute.
+            burst: Bucket capacity, i.e. the largest burst allowed.
+            clock: Monotonic clock returning seconds.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = float(burst)
+        self.clock = clock
+        # key -> [tokens, last refill time]; a list avoids a tuple per update
+        self._buckets: Dict[str, List[float]] = {}
+
+    def __len__(self) -> int:
+        """Get the number of tracked keys."""
+        return len(self._buckets)
+
+    def _tokens(self, key: str, now: float) -> float:
+        """Get the tokens a bucket holds at a point in time."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        return min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+    def retry_after(self, key: str, cost: float, now: float) -> float:
+        """Get how long a request must wait without consuming tokens.
+
+        Args:
+            key: The bucket key.
+            cost: Tokens the request needs.
+            now: The current clock value.
+
+        Returns:
+            Zero if the request is allowed now, otherwise the seconds to wait.
+        """
+        missing = cost - self._tokens(key, now)
+        if missing <= 0:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return missing / self.rate
+
+    def consume(self, key: str, cost: float, now: float) -> None:
+        """Take tokens from a bucket.
+
+        Args:
+            key: The bucket key.
+            cost: Tokens to take.
+            now: The current clock value.
+        """
+        tokens = self._tokens(key, now) - cost
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [tokens, now]
+        else:
+            bucket[0] = tokens
+            bucket[1] = now
+
+    def compact(self, now: float) -> int:
+        """Forget buckets that have refilled completely.
+
+        A full bucket behaves exactly like a missing one, so dropping it is free.
+
+        Args:
+            now: The current clock value.
+
+        Returns:
+            The number of keys removed.
+        """
+        idle = [key for key in self._buckets if self._tokens(key, now) >= self.burst]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+
+class RateLimiter:
+    """Per-user, per-channel and per-guild rate limits checked together."""
+
+    def __init__(
+        self,
+        user: Tuple[float, float] = (RATE_LIMIT_USER_PER_MINUTE, RATE_LIMIT_USER_BURST),
+        channel: Tuple[float, float] = (
+            RATE_LIMIT_CHANNEL_PER_MINUTE,
+            RATE_LIMIT_CHANNEL_BURST,
+        ),
+        guild: Tuple[float, float] = (
+            RATE_LIMIT_GUILD_PER_MINUTE,
+            RATE_LIMIT_GUILD_BURST,
+        ),
+        compact_interval: float = RATE_LIMIT_COMPACT_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the rate limiter.
+
+        Args:
+            user: Rate per minute and burst for each user.
+            channel: Rate per minute and burst for each channel.
+            guild: Rate per minute and burst for each guild.
+            compact_interval: Seconds between sweeps of idle keys.
+            clock: Monotonic clock returning seconds.
+        """
+        self.clock = clock
+        self.limiters: Dict[str, TokenBucketLimiter] = {
+            "user": TokenBucketLimiter(*user, clock=clock),
+            "channel": TokenBucketLimiter(*channel, clock=clock),
+            "guild": TokenBucketLimiter(*guild, clock=clock),
+        }
+        self.compact_interval = compact_interval
+        self._last_compaction = clock()
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {scope: 0 for scope in self.limiters}
+
+    def check(
+        self,
+        user_id: str,
+        channel_id: Optional[str] = None,
+        guild_id: Optional[str] = None,
+        cost: float = 1.0,
+    ) -> float:
+        """Check and record a request.
+
+        Tokens are only taken when every scope allows the request, so a request
+        rejected by its guild does not also drain the user's bucket.
+
+        Args:
+            user_id: The Discord user ID.
+            channel_id: The Discord channel ID, if any.
+            guild_id: The Discord guild ID, or None for DMs.
+            cost: Tokens the request needs.
+
+        Returns:
+            Zero if the request is allowed, otherwise the seconds to wait.
+        """
+        now = self.clock()
+        if now - self._last_compaction >= self.compact_interval:
+            self.compact(now)
+
+        keys = [("user", user_id), ("channel", channel_id), ("guild", guild_id)]
+        for scope, key in keys:
+            if key is None:
+                continue
+            wait = self.limiters[scope].retry_after(key, cost, now)
+            if wait > 0:
+                self.rejected[scope] += 1
+                return wait
+
+        for scope, key in keys:
+            if key is not None:
+                self.limiters[scope].consume(key, cost, now)
+        self.allowed += 1
+        return 0.0
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Forget idle keys in every scope.
+
+        Args:
+            now: The current clock value. Defaults to the clock.
+
+        Returns:
+            The number of keys removed.
+        """
+        now = self.clock() if now is None else now
+        self._last_compaction = now
+        return sum(limiter.compact(now) for limiter in self.limiters.values())
+
+    def stats(self) -> dict:
+        """Get the rate limiter metrics.
+
+        Returns:
+            Allowed and rejected request counts and tracked keys per scope.
+        """
+        return {
+            "allowed": self.allowed,
+            "rejected": dict(self.rejected),
+            "tracked_keys": {
+                scope: len(limiter) for scope, limiter in self.limiters.items()
+            },
+        }
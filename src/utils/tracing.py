@@ -0,0 +1,447 @@
+"""
+Tracing Module
+
+This module provides lightweight request tracing for the bot.
+
+Every Discord message or command starts a trace whose spans follow the request through
+the task queue, the OpenHands subprocess and the reply. Finished spans are batched on a
+background thread and written to a JSON-lines file or sent to an OTLP/HTTP collector.
+Sampling is decided once per trace, and spans of unsampled traces are never recorded.
+"""
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import (
+    TRACING_ENABLED,
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SAMPLE_RATE,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger("OpenHandsDiscordAdapter")
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        sampled: bool = True,
+    ) -> None:
+        """Start the span.
+
+        Args:
+            name: The operation name.
+            trace_id: The 32 hex digit ID of the trace.
+            parent_id: The ID of the parent span, if any.
+            sampled: Whether the span is recorded.
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute. Ignored for unsampled spans.
+
+        Args:
+            key: The attribute name.
+            value: A string, number or boolean.
+        """
+        if self.sampled:
+            self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C ``traceparent`` header continuing this trace."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self, service_name: str) -> Dict[str, Any]:
+        """Convert the finished span into a JSON-serializable record.
+
+        Args:
+            service_name: The name of the traced service.
+
+        Returns:
+            The span record.
+        """
+        return {
+            "service": service_name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Get the span active in the current task, if any."""
+    return _current_span.get()
+
+
+class SpanExporter(ABC):
+    """Sends batches of finished spans somewhere."""
+
+    @abstractmethod
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """Export a batch of span records.
+
+        Args:
+            spans: The records produced by ``Span.to_dict``.
+        """
+
+    def shutdown(self) -> None:
+        """Release the resources of the exporter."""
+
+
+class JsonLinesExporter(SpanExporter):
+    """Append spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: str = TRACING_FILE) -> None:
+        """Initialize the exporter.
+
+        Args:
+            path: The trace file.
+        """
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """Append the spans to the trace file."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, separators=(",", ":")) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Encode an attribute value as an OTLP ``AnyValue``."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter(SpanExporter):
+    """Send spans to an OpenTelemetry collector using OTLP/HTTP with JSON."""
+
+    def __init__(
+        self, endpoint: str = TRACING_OTLP_ENDPOINT, timeout: float = 5.0
+    ) -> None:
+        """Initialize the exporter.
+
+        Args:
+            endpoint: The collector traces URL, e.g. ``http://host:4318/v1/traces``.
+            timeout: Seconds to wait for the collector.
+        """
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def encode(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the OTLP request body for a batch of spans.
+
+        Args:
+            spans: The span records.
+
+        Returns:
+            The ``ExportTraceServiceRequest`` as JSON-compatible data.
+        """
+        by_service: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            otlp_span = {
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start_ns"]),
+                "endTimeUnixNano": str(span["end_ns"]),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span["attributes"].items()
+                ],
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            }
+            if span["parent_id"]:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            by_service.setdefault(span["service"], []).append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": service}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "openhands-discord"}, "spans": otlp_spans}
+                    ],
+                }
+                for service, otlp_spans in by_service.items()
+            ]
+        }
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """Post the spans to the collector."""
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.encode(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):  # nosec B310
+            pass
+
+
+class BatchSpanProcessor:
+    """Export finished spans in batches from a background thread.
+
+    Spans are dropped rather than blocking the event loop when the buffer is full.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 256,
+        interval: float = 2.0,
+    ) -> None:
+        """Initialize the processor and start its thread.
+
+        Args:
+            exporter: The exporter receiving the batches.
+            max_queue_size: Spans buffered before new ones are dropped.
+            max_batch_size: Spans exported at once.
+            interval: Seconds between exports of partial batches.
+        """
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(
+            max_queue_size
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Dict[str, Any]) -> None:
+        """Buffer a finished span.
+
+        Args:
+            span: The span record.
+        """
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        """Export a batch, logging instead of raising on failure."""
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.error(f"Failed to export {len(batch)} spans: {e}")
+
+    def _run(self) -> None:
+        """Collect and export batches until shut down."""
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    span = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export the buffered spans and stop the thread.
+
+        Args:
+            timeout: Seconds to wait for the final export.
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+class Tracer:
+    """Creates spans and hands the sampled ones to a processor."""
+
+    def __init__(
+        self,
+        processor: Optional[BatchSpanProcessor] = None,
+        sample_rate: float = TRACING_SAMPLE_RATE,
+        service_name: str = TRACING_SERVICE_NAME,
+    ) -> None:
+        """Initialize the tracer.
+
+        Args:
+            processor: The processor exporting finished spans. Without one,
+                tracing is disabled.
+            sample_rate: Fraction of traces recorded, from 0 to 1.
+            service_name: The name of the traced service.
+        """
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+
+    @classmethod
+    def from_config(cls) -> "Tracer":
+        """Build the tracer described by the environment configuration.
+
+        Returns:
+            The configured tracer.
+
+        Raises:
+            ValueError: If the exporter is unknown.
+        """
+        if not TRACING_ENABLED:
+            return cls()
+        exporter: SpanExporter
+        if TRACING_EXPORTER == "jsonl":
+            exporter = JsonLinesExporter()
+        elif TRACING_EXPORTER == "otlp":
+            exporter = OtlpHttpExporter()
+        else:
+            raise ValueError(f"Unknown tracing exporter: {TRACING_EXPORTER}")
+        return cls(BatchSpanProcessor(exporter))
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are exported at all."""
+        return self.processor is not None and self.sample_rate > 0
+
+    def start_span(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Span:
+        """Start a span without making it the current span.
+
+        Use this for spans that end in another task, such as the wait in a queue.
+
+        Args:
+            name: The operation name.
+            parent: The parent span. Defaults to the current span; without one a
+                new trace is started and sampled.
+            **attributes: Initial attributes.
+
+        Returns:
+            The started span.
+        """
+        parent = parent or _current_span.get()
+        if parent is None:
+            span = Span(
+                name,
+                f"{random.getrandbits(128):032x}",
+                sampled=self.enabled and random.random() < self.sample_rate,
+            )
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled)
+        if span.sampled:
+            span.attributes.update(attributes)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        """End a span and export it if it is sampled.
+
+        Args:
+            span: The span.
+            error: The exception that ended the operation, if any.
+        """
+        if not span.sampled or self.processor is None:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "error"
+            span.attributes["error"] = f"{type(error).__name__}: {error}"
+        self.processor.on_end(span.to_dict(self.service_name))
+
+    @contextmanager
+    def span(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Iterator[Span]:
+        """Run a block inside a span that is current for its duration.
+
+        Args:
+            name: The operation name.
+            parent: The parent span. Defaults to the current span.
+            **attributes: Initial attributes.
+
+        Yields:
+            The span.
+        """
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def shutdown(self) -> None:
+        """Export the buffered spans and stop exporting."""
+        if self.processor is not None:
+            self.processor.shutdown()
+
+
+# Create a singleton instance
+tracer = Tracer.from_config()
@@ -0,0 +1 @@
+"""Benchmarks for the OpenHands Discord bot."""
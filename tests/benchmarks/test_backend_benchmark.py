@@ -0,0 +1,49 @@
+"""Benchmarks comparing the execution backends on the same short runs."""
+
+import asyncio
+import time
+
+import pytest
+
+from tests.unit.adapter.test_backends import BACKENDS, run, running_backend
+
+RUN_COUNT = 20
+CONCURRENCY = 4
+
+
+async def time_runs(backend, workspace):
+    """Run short prompts a few at a time, in seconds per run."""
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i):
+        async with slots:
+            outcome, _, _ = await run(backend, f"hello {i}", workspace)
+            assert outcome.returncode == 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(RUN_COUNT)))
+    return (time.perf_counter() - started) / RUN_COUNT
+
+
+@pytest.mark.asyncio
+async def test_warm_backends_beat_a_process_per_run(tmp_path):
+    """Backends that keep the CLI imported skip the interpreter start of every run."""
+    # Given
+    timings = {}
+
+    # When
+    for name in BACKENDS:
+        async with running_backend(name, tmp_path) as backend:
+            # The first run pays for starting workers and connections
+            await run(backend, "warm up", tmp_path)
+            timings[name] = await time_runs(backend, tmp_path)
+    print(
+        "\n".join(
+            f"{name}: {seconds * 1000:.1f} ms/run" for name, seconds in timings.items()
+        )
+    )
+
+    # Then
+    # Typically 50x faster; the margin keeps busy CI hosts from flaking
+    assert timings["process"] * 2 < timings["subprocess"]
+    assert timings["thread"] * 2 < timings["subprocess"]
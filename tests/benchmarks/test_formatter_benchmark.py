@@ -0,0 +1,55 @@
+"""Benchmarks for rendering the tasks of users with hundreds of tasks."""
+
+import time
+
+import pytest
+
+from src.adapter.records import TaskRecord, TaskResult
+from src.utils.formatter import RenderCache, format_status, format_tasks_list
+
+TASK_COUNT = 500
+
+
+def make_finished_tasks():
+    """Snapshots of finished tasks with realistic results."""
+    tasks = []
+    for i in range(TASK_COUNT):
+        task = TaskRecord(f"task_{i:04d}", "1", f"task {i} " * 10, "short", "model")
+        task.status = "completed" if i % 5 else "failed"
+        task.result = TaskResult(
+            bool(i % 5),
+            output="line of build output\n" * 100,
+            error=None if i % 5 else "boom",
+            events={"counts": {"action": 3}, "files": {"app.py": "modified"}},
+            resources={"wall_seconds": 12.5, "cpu_seconds": 3.2, "max_rss_mb": 120},
+        )
+        tasks.append(task.to_dict())
+    return tasks
+
+
+def time_rendering(tasks, cache):
+    """Render the status of every task and the task list, in seconds."""
+    started = time.perf_counter()
+    for task in tasks:
+        format_status(task, cache)
+    format_tasks_list(tasks, cache)
+    return time.perf_counter() - started
+
+
+@pytest.mark.asyncio
+async def test_finished_tasks_render_once():
+    """Rendering finished tasks again is served from the cache."""
+    # Given
+    finished_tasks = make_finished_tasks()
+    cache = RenderCache()
+    cold = time_rendering(finished_tasks, cache)
+    misses = cache.misses
+
+    # When
+    warm = min(time_rendering(finished_tasks, cache) for _ in range(3))
+
+    # Then
+    assert cache.misses == misses
+    assert cache.hits == 3 * (TASK_COUNT + 10)
+    # Typically 10x faster; the margin keeps busy CI hosts from flaking
+    assert warm * 3 < cold
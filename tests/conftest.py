@@ -1,9 +1,16 @@
 """Pytest configuration and fixtures."""
 
+import os
+import tempfile
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+# Keep task workspaces out of the repository
+os.environ.setdefault(
+    "OPENHANDS_WORKDIR", os.path.join(tempfile.gettempdir(), "openhands_test_workspace")
+)
+
 
 @pytest.fixture
 def mock_discord_context():
@@ -0,0 +1,60 @@
+"""A stand-in for the OpenHands CLI used by adapter tests.
+
+The task text selects the behaviour:
+
+- ``fail``: print an error to stderr and exit with status 1
+- ``sleep <seconds>``: sleep before answering
+- ``spin <seconds>``: use that much CPU time before answering
+- ``write <name>``: create a file in the workspace
+- ``plain``: answer with plain text output instead of JSON lines
+- ``env <name>``: answer with the value of an environment variable
+- ``usage <tokens>``: report LLM token usage before answering
+- anything else: echo the task back as a message event
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def main() -> int:
+    """Run the fake CLI."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspace", required=True)
+    parser.add_argument("--task", required=True)
+    args = parser.parse_args()
+
+    command, _, argument = args.task.partition(" ")
+    if command == "fail":
+        print("something went wrong", file=sys.stderr)
+        return 1
+    if command == "sleep":
+        time.sleep(float(argument))
+    if command == "spin":
+        end = time.process_time() + float(argument)
+        while time.process_time() < end:
+            pass
+    if command == "write":
+        Path(args.workspace, argument).write_text(args.task)
+        print(json.dumps({"type": "file", "path": argument, "change": "created"}))
+    if command == "env":
+        print(json.dumps({"type": "message", "content": os.environ.get(argument)}))
+        return 0
+    if command == "usage":
+        print(json.dumps({"type": "usage", "prompt_tokens": int(argument)}))
+    if command == "plain":
+        print("INFO starting agent")
+        print("🤖 " + argument)
+        return 0
+
+    print("INFO starting agent")
+    print(json.dumps({"type": "action", "action": "run", "command": "ls"}))
+    print(json.dumps({"type": "message", "content": f"Done: {args.task}"}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Tests for the admission control module."""
+
+import asyncio
+
+import pytest
+
+from src.adapter.admission import AdmissionController, AdmissionRejected
+
+
+def test_admit_task_rejects_full_queue_and_low_memory():
+    """Tasks are rejected when the queue is full or memory is low."""
+    # Given
+    memory = {"available": 4096.0}
+    controller = AdmissionController(
+        max_queue_length=2,
+        min_free_memory_mb=1024,
+        memory_probe=lambda: memory["available"],
+    )
+
+    # When / Then
+    controller.admit_task(1)
+    with pytest.raises(AdmissionRejected, match="queue is full"):
+        controller.admit_task(2)
+    memory["available"] = 100.0
+    with pytest.raises(AdmissionRejected, match="memory"):
+        controller.admit_task(0)
+    assert controller.stats()["rejections"] == {"queue": 1, "memory": 1, "chat": 0}
+
+
+def test_admit_task_admits_batches_as_a_whole():
+    """A batch is rejected if it does not fit in the queue completely."""
+    # Given
+    controller = AdmissionController(max_queue_length=5, min_free_memory_mb=0)
+
+    # When / Then
+    controller.admit_task(2, count=3)
+    with pytest.raises(AdmissionRejected, match="queue is full"):
+        controller.admit_task(2, count=4)
+
+
+@pytest.mark.asyncio
+async def test_admit_chat_bounds_waiting_messages():
+    """Chat is shed once enough messages wait, even with global slots free."""
+    # Given
+    controller = AdmissionController(
+        max_subprocesses=2, max_chat_waiting=1, min_free_memory_mb=0
+    )
+    release = asyncio.Event()
+
+    async def hold_slot():
+        async with controller.subprocess_slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0)
+
+    # When / Then
+    controller.admit_chat()
+    controller.chat_waiting = 1
+    with pytest.raises(AdmissionRejected, match="busy"):
+        controller.admit_chat()
+    assert controller.active_subprocesses < controller.max_subprocesses
+
+    release.set()
+    await holder
+    controller.chat_waiting = 0
+    controller.admit_chat()
+    assert controller.stats()["rejections"]["chat"] == 1
@@ -0,0 +1,94 @@
+"""Tests for the workspace affinity module."""
+
+import asyncio
+
+import pytest
+
+from src.adapter.affinity import AffinityScheduler
+from src.adapter.backends import InProcessBackend
+from tests.unit.adapter.test_backends import run
+
+
+@pytest.mark.asyncio
+async def test_workspaces_return_to_their_worker():
+    """New workspaces are spread over the workers and then stay on theirs."""
+    # Given
+    scheduler = AffinityScheduler({"a": 1, "b": 1})
+    served = {}
+
+    # When
+    for workspace in ["alice", "bob", "alice", "bob", "alice"]:
+        async with scheduler.lease(workspace) as worker:
+            served.setdefault(workspace, set()).add(worker)
+
+    # Then
+    assert served == {"alice": {"a"}, "bob": {"b"}}
+    assert scheduler.stats() == {
+        "hits": 3,
+        "misses": 0,
+        "cold": 2,
+        "hit_rate": 1.0,
+        "free_slots": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_waits_briefly_for_its_busy_worker():
+    """A run gets its worker back if it is freed within the wait."""
+    # Given
+    scheduler = AffinityScheduler({"a": 1, "b": 1}, wait_seconds=5)
+    busy = await scheduler.acquire("alice")
+
+    # When
+    waiting = asyncio.create_task(scheduler.acquire("alice"))
+    await asyncio.sleep(0.05)
+    await scheduler.release(busy)
+    worker = await waiting
+
+    # Then
+    assert worker == busy
+    assert scheduler.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_falls_back_after_the_wait():
+    """A run uses another free worker once the wait for its own is over."""
+    # Given
+    scheduler = AffinityScheduler({"a": 1, "b": 1}, wait_seconds=0.05)
+    busy = await scheduler.acquire("alice")
+
+    # When
+    worker = await scheduler.acquire("alice")
+
+    # Then
+    assert worker != busy
+    assert scheduler.stats()["misses"] == 1
+    assert scheduler.stats()["hit_rate"] == 0.0
+
+
+def test_scheduler_needs_a_worker():
+    """A scheduler without workers is rejected instead of leasing nothing forever."""
+    # Then
+    with pytest.raises(ValueError):
+        AffinityScheduler({})
+
+
+@pytest.mark.asyncio
+async def test_process_backend_keeps_workspaces_on_their_worker(tmp_path):
+    """Worker processes serve the workspaces they served before."""
+    # Given
+    backend = InProcessBackend("process", "tests.fixtures.fake_openhands_cli", 2)
+
+    # When
+    try:
+        for user in ["1", "2", "1", "2"]:
+            outcome, _, _ = await run(backend, "hello", tmp_path / user)
+            assert outcome.returncode == 0
+        stats = backend.stats()
+    finally:
+        await backend.stop()
+
+    # Then
+    assert stats["started_workers"] == 2
+    assert stats["affinity"]["hits"] == 2
+    assert stats["affinity"]["cold"] == 2
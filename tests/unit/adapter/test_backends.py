@@ -0,0 +1,220 @@
+"""Conformance tests every execution backend must pass."""
+
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from src.adapter.admission import AdmissionController
+from src.adapter.backends import (
+    ExecutionRequest,
+    InProcessBackend,
+    RemoteBackend,
+    SubprocessBackend,
+    create_backend,
+)
+from src.adapter.openhands_adapter import OpenHandsAdapter
+from src.adapter.resources import ResourceLimits
+from src.adapter.worker import create_worker_app, is_loopback
+from src.config import OPENHANDS_OUTPUT_FORMAT
+
+FAKE_CLI = "tests.fixtures.fake_openhands_cli"
+BACKENDS = ["subprocess", "thread", "process", "remote"]
+
+
+@asynccontextmanager
+async def running_backend(name, tmp_path):
+    """Start a backend running the fake CLI, with a local worker for ``remote``."""
+    if name == "subprocess":
+        backend = SubprocessBackend(FAKE_CLI, ResourceLimits())
+    elif name == "thread":
+        backend = InProcessBackend(name, FAKE_CLI, max_workers=1)
+    elif name == "process":
+        backend = InProcessBackend(name, FAKE_CLI, max_workers=2)
+    else:
+        app = create_worker_app(
+            SubprocessBackend(FAKE_CLI, ResourceLimits()), "secret", str(tmp_path)
+        )
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        backend = RemoteBackend(f"http://127.0.0.1:{port}", "secret")
+    await backend.start()
+    try:
+        yield backend
+    finally:
+        await backend.stop()
+        if name == "remote":
+            await runner.cleanup()
+
+
+async def run(backend, prompt, workspace, timeout=30, env=None):
+    """Run a prompt and collect its output."""
+    stdout, stderr = bytearray(), bytearray()
+    request = ExecutionRequest(prompt, str(workspace), env or {}, timeout)
+    outcome = await backend.run(request, stdout.extend, stderr.extend)
+    return outcome, stdout.decode(), stderr.decode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", BACKENDS)
+async def test_backend_streams_output(name, tmp_path):
+    """The output and resource usage of a successful run are reported."""
+    async with running_backend(name, tmp_path) as backend:
+        # When
+        outcome, stdout, stderr = await run(backend, "hello", tmp_path)
+
+    # Then
+    assert outcome.returncode == 0
+    assert outcome.timed_out is False
+    assert json.dumps({"type": "message", "content": "Done: hello"}) in stdout
+    assert stderr == ""
+    assert outcome.resources["wall_seconds"] >= 0
+    assert backend.stats()["backend"] == name
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", BACKENDS)
+async def test_backend_reports_failures(name, tmp_path):
+    """Failed runs report their exit status and standard error."""
+    async with running_backend(name, tmp_path) as backend:
+        # When
+        outcome, _, stderr = await run(backend, "fail", tmp_path)
+
+    # Then
+    assert outcome.returncode == 1
+    assert stderr == "something went wrong\n"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", BACKENDS)
+async def test_backend_passes_environment_and_workspace(name, tmp_path):
+    """Runs see the variables of the request and work in its workspace."""
+    async with running_backend(name, tmp_path) as backend:
+        # When
+        _, stdout, _ = await run(
+            backend, "env LLM_MODEL", tmp_path, env={"LLM_MODEL": "fast-model"}
+        )
+        await run(backend, "write notes.txt", tmp_path)
+
+    # Then
+    assert '"content": "fast-model"' in stdout
+    assert (tmp_path / "notes.txt").read_text() == "write notes.txt"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", ["subprocess", "process", "remote"])
+async def test_backend_times_out(name, tmp_path):
+    """Runs past their timeout are reported as timed out."""
+    async with running_backend(name, tmp_path) as backend:
+        # When
+        outcome, _, _ = await run(backend, "sleep 1", tmp_path, timeout=0.2)
+
+    # Then
+    assert outcome.timed_out is True
+
+
+@pytest.mark.asyncio
+async def test_thread_backend_fails_for_good_after_a_timeout(tmp_path):
+    """A run stuck on the thread fails, and so does every run after it."""
+    async with running_backend("thread", tmp_path) as backend:
+        # When
+        with pytest.raises(RuntimeError, match="cannot be stopped"):
+            await run(backend, "sleep 1", tmp_path, timeout=0.2)
+
+        # Then
+        with pytest.raises(RuntimeError, match="restart the bot"):
+            await run(backend, "hello", tmp_path)
+        assert backend.stats()["stuck"] is True
+
+
+def test_thread_backend_needs_opt_in_and_a_single_worker():
+    """The thread backend is refused unless enabled, and only takes one worker."""
+    # Then
+    with pytest.raises(ValueError, match="OPENHANDS_THREAD_BACKEND_ENABLED"):
+        create_backend("thread", thread_enabled=False)
+    assert create_backend("thread", thread_enabled=True).max_workers == 1
+    with pytest.raises(ValueError, match="one run at a time"):
+        InProcessBackend("thread", FAKE_CLI, max_workers=2)
+
+
+@pytest.mark.asyncio
+async def test_process_backend_replaces_timed_out_workers(tmp_path):
+    """A worker stuck past its timeout is killed and the next run gets a new one."""
+    async with running_backend("process", tmp_path) as backend:
+        # When
+        await run(backend, "sleep 5", tmp_path, timeout=0.2)
+        outcome, _, _ = await run(backend, "hello", tmp_path)
+        stats = backend.stats()
+
+    # Then
+    assert outcome.returncode == 0
+    assert stats["killed_workers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_worker_rejects_bad_requests(tmp_path):
+    """The worker needs the shared token and a workspace inside its directory."""
+    async with running_backend("remote", tmp_path) as backend:
+        # When
+        wrong_token = RemoteBackend(backend.urls[0], "wrong")
+        try:
+            with pytest.raises(RuntimeError, match="401"):
+                await run(wrong_token, "hello", tmp_path)
+        finally:
+            await wrong_token.stop()
+
+        # Then
+        with pytest.raises(RuntimeError, match="outside the worker directory"):
+            await run(backend, "hello", tmp_path.parent)
+        with pytest.raises(RuntimeError, match="not allowed: LD_PRELOAD"):
+            await run(backend, "hello", tmp_path, env={"LD_PRELOAD": "evil.so"})
+
+
+@pytest.mark.asyncio
+async def test_adapter_runs_on_remote_worker(tmp_path):
+    """The worker accepts every variable the adapter sets for a run."""
+    async with running_backend("remote", tmp_path) as backend:
+        # Given
+        adapter = OpenHandsAdapter(
+            admission=AdmissionController(min_free_memory_mb=0),
+            checkpoint_file=str(tmp_path / "checkpoint.json"),
+            backend=backend,
+            workdir=str(tmp_path / "workspaces"),
+            spool_dir=str(tmp_path / "spool"),
+            spill_dir=str(tmp_path / "spill"),
+        )
+
+        # When
+        answer = await adapter.chat("1", "env OPENHANDS_OUTPUT_FORMAT")
+
+    # Then
+    assert not answer.startswith("Error")
+    assert answer == OPENHANDS_OUTPUT_FORMAT
+
+
+def test_worker_listens_on_loopback_only_without_token():
+    """Loopback addresses are told apart from ones reachable by other hosts."""
+    # Then
+    assert is_loopback("127.0.0.1")
+    assert is_loopback("::1")
+    assert is_loopback("localhost")
+    assert not is_loopback("0.0.0.0")
+    assert not is_loopback("worker-1")
+
+
+@pytest.mark.parametrize("urls", ["", " , "])
+def test_remote_backend_needs_a_worker(urls):
+    """Without a worker URL, runs would wait for a worker forever."""
+    # Then
+    with pytest.raises(ValueError, match="at least one worker URL"):
+        RemoteBackend(urls)
+
+
+def test_unknown_backend_is_rejected():
+    """Only the known backends can be configured."""
+    with pytest.raises(ValueError):
+        create_backend("carrier-pigeon")
@@ -0,0 +1,110 @@
+"""Tests for the events module."""
+
+import json
+
+from src.adapter.events import (
+    ACTION,
+    FILE,
+    MESSAGE,
+    EventStreamParser,
+    parse_event_line,
+)
+
+
+def test_parse_event_line():
+    """JSON lines and robot-prefixed lines become events, other lines do not."""
+    # Given
+    message = json.dumps({"type": "message", "content": "Hello"})
+    action = json.dumps({"type": "action", "action": "run", "command": "ls -la"})
+
+    # When / Then
+    assert parse_event_line(message).kind == MESSAGE
+    assert parse_event_line(message).text == "Hello"
+    assert parse_event_line(action).kind == ACTION
+    assert parse_event_line(action).text == "ls -la"
+    assert parse_event_line("🤖 Legacy answer").text == "Legacy answer"
+    assert parse_event_line("INFO starting agent") is None
+    assert parse_event_line('{"type": "unknown"}') is None
+    assert parse_event_line("{not json") is None
+
+
+def test_stream_parser_handles_split_lines():
+    """Lines split across chunks are parsed once complete."""
+    # Given
+    parser = EventStreamParser()
+    data = (
+        "INFO boot\n"
+        + json.dumps({"type": "file", "path": "a.py", "change": "created"})
+        + "\n"
+        + json.dumps({"type": "message", "content": "Created a.py"})
+    ).encode("utf-8")
+
+    # When
+    for i in range(0, len(data), 7):
+        parser.feed(data[i : i + 7])
+    log = parser.close()
+
+    # Then
+    assert log.messages == ["Created a.py"]
+    assert log.files == {"a.py": "created"}
+    assert log.counts[FILE] == 1
+    assert log.summary() == "Created a.py"
+    assert log.to_dict()["log_lines"] == 1
+
+
+def test_summary_falls_back_to_log_tail():
+    """Runs without messages are summarised by their bounded log tail."""
+    # Given
+    parser = EventStreamParser()
+
+    # When
+    parser.feed(b"".join(f"line {i}\n".encode() for i in range(100)))
+    log = parser.close()
+
+    # Then
+    assert log.summary().splitlines()[-1] == "line 99"
+    assert len(log.summary().splitlines()) == len(log.log_tail)
+    assert log.log_lines == 100
+
+
+def test_usage_events_count_tokens():
+    """Token counts reported by the run are summed, whatever the provider calls them."""
+    # Given
+    parser = EventStreamParser()
+    lines = [
+        {"type": "usage", "prompt_tokens": 1000, "completion_tokens": 200},
+        {"type": "usage", "input_tokens": 50, "output_tokens": "7"},
+        {"type": "usage", "prompt_tokens": "many"},
+    ]
+
+    # When
+    parser.feed("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+    log = parser.close()
+
+    # Then
+    assert log.tokens == 1257
+    assert log.to_dict()["tokens"] == 1257
+    assert log.messages == []
+
+
+def test_usage_events_are_not_counted_twice():
+    """A total wins over its parts, and only one pair of part names is used."""
+    # Given
+    parser = EventStreamParser()
+    lines = [
+        {
+            "type": "usage",
+            "prompt_tokens": 100,
+            "completion_tokens": 20,
+            "input_tokens": 100,
+            "output_tokens": 20,
+        },
+        {"type": "usage", "prompt_tokens": 40, "total_tokens": 45},
+    ]
+
+    # When
+    parser.feed("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+    log = parser.close()
+
+    # Then
+    assert log.tokens == 120 + 45
@@ -0,0 +1,63 @@
+"""Tests for the model router module."""
+
+import pytest
+
+from src.adapter.model_router import (
+    CHAT,
+    LONG_TASK,
+    SHORT_TASK,
+    ModelRoute,
+    ModelRouter,
+)
+
+
+def make_router():
+    """Create a router with distinct models per route."""
+    return ModelRouter(
+        routes=[
+            ModelRoute(CHAT, "cheap-model", "key", 2, 60),
+            ModelRoute(SHORT_TASK, "fast-model", "key", 3, 300),
+            ModelRoute(LONG_TASK, "heavy-model", "key", 1, 1200),
+        ],
+        short_task_max_chars=20,
+    )
+
+
+def test_route_task_by_description_length():
+    """Short descriptions go to the short route, long ones to the long route."""
+    # Given
+    router = make_router()
+
+    # When
+    short = router.route_task("fix typo")
+    long = router.route_task("refactor the whole project into packages")
+
+    # Then
+    assert short.name == SHORT_TASK
+    assert long.name == LONG_TASK
+    assert router.route_chat().model == "cheap-model"
+
+
+def test_route_task_user_option():
+    """A user option selects a route by name or by model."""
+    # Given
+    router = make_router()
+
+    # When / Then
+    assert router.route_task("fix typo", LONG_TASK).model == "heavy-model"
+    assert router.route_task("fix typo", "heavy-model").name == LONG_TASK
+    with pytest.raises(ValueError):
+        router.route_task("fix typo", "unknown")
+
+
+def test_route_task_never_uses_the_chat_route():
+    """Tasks cannot take the chat route, whose capacity belongs to chat sessions."""
+    # Given
+    router = make_router()
+
+    # Then
+    assert CHAT not in router.task_routes()
+    with pytest.raises(ValueError, match="Available routes: long_task, short_task"):
+        router.route_task("fix typo", CHAT)
+    with pytest.raises(ValueError):
+        router.route_task("fix typo", "cheap-model")
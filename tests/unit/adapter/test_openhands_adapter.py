@@ -0,0 +1,706 @@
+"""Tests for the OpenHands adapter module."""
+
+import asyncio
+import threading
+from collections import deque
+
+import pytest
+
+from src.adapter.admission import AdmissionController
+from src.adapter.model_router import (
+    CHAT,
+    LONG_TASK,
+    SHORT_TASK,
+    ModelRoute,
+    ModelRouter,
+)
+from src.adapter.openhands_adapter import OpenHandsAdapter, build_chat_prompt
+from src.adapter.records import BatchRecord, TaskRecord, TaskResult
+from src.adapter.sandbox import LocalRuntimeProvider, SandboxPool
+from src.adapter.usage import GUILD, USER, UsageQuota, UsageTracker
+from src.config import TASK_RETENTION_SECONDS, THREAD_IDLE_TIMEOUT_SECONDS
+from src.utils.tracing import BatchSpanProcessor, SpanExporter, Tracer
+
+
+class ListExporter(SpanExporter):
+    """Keep exported spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def make_adapter(**kwargs):
+    """Create an adapter with small, distinct routes."""
+    router = ModelRouter(
+        routes=[
+            ModelRoute(CHAT, "cheap-model", "key", 1, 60),
+            ModelRoute(SHORT_TASK, "fast-model", "key", 1, 300),
+            ModelRoute(LONG_TASK, "heavy-model", "key", 1, 1200),
+        ],
+        short_task_max_chars=20,
+    )
+    # Host memory must not decide the outcome of unit tests
+    kwargs.setdefault("admission", AdmissionController(min_free_memory_mb=0))
+    kwargs.setdefault("router", router)
+    return OpenHandsAdapter(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_create_task_uses_route_queue():
+    """Tasks are queued on the pool of the route chosen for them."""
+    # Given
+    adapter = make_adapter()
+
+    # When
+    short = await adapter.create_task("1", "fix typo")
+    long = await adapter.create_task("1", "x" * 100)
+    forced = await adapter.create_task("1", "fix typo", model=LONG_TASK)
+
+    # Then
+    assert short["model"] == "fast-model"
+    assert long["model"] == "heavy-model"
+    assert forced["model"] == "heavy-model"
+    assert adapter.task_queues[SHORT_TASK].qsize() == 1
+    assert adapter.task_queues[LONG_TASK].qsize() == 2
+    assert adapter.active_sessions[short["task_id"]].route == SHORT_TASK
+    assert CHAT not in adapter.task_queues
+    with pytest.raises(ValueError):
+        await adapter.create_task("1", "fix typo", model=CHAT)
+
+
+@pytest.fixture
+def fake_cli(monkeypatch, tmp_path):
+    """Run the fake OpenHands CLI in a temporary workspace root."""
+    monkeypatch.setattr(
+        "src.adapter.backends.OPENHANDS_CLI_PATH",
+        "tests.fixtures.fake_openhands_cli",
+    )
+    monkeypatch.setattr("src.adapter.openhands_adapter.OPENHANDS_WORKDIR", tmp_path)
+    monkeypatch.setattr(
+        "src.adapter.openhands_adapter.SPOOL_DIR", str(tmp_path / ".spool")
+    )
+
+
+@pytest.mark.asyncio
+async def test_execute_parses_structured_events(fake_cli):
+    """Task results hold the parsed events instead of the raw output."""
+    # Given
+    adapter = make_adapter()
+    task = TaskRecord("task_1", "1", "hello", SHORT_TASK, "fast-model")
+    task.timeout_seconds = 30
+
+    # When
+    result = await adapter._execute_openhands_cli(task, adapter.router.get(SHORT_TASK))
+
+    # Then
+    assert result["success"] is True
+    assert result["output"] == "Done: hello"
+    assert result["events"]["counts"]["action"] == 1
+    assert "INFO" not in result["output"]
+    assert result["resources"]["wall_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_chat_reports_failures(fake_cli):
+    """Chat returns the worker's stderr when it fails."""
+    # Given
+    adapter = make_adapter()
+
+    # When
+    ok = await adapter.chat("1", "plain legacy answer")
+    failed = await adapter.chat("2", "fail")
+
+    # Then
+    assert ok == "legacy answer"
+    assert failed == "Error: something went wrong\n"
+
+
+@pytest.mark.asyncio
+async def test_task_records_changed_files(fake_cli):
+    """Files written by a task are recorded and offered as artifacts."""
+    # Given
+    adapter = make_adapter()
+    task = TaskRecord("task_1", "1", "write out.txt", SHORT_TASK, "fast-model")
+    task.timeout_seconds = 30
+    adapter.active_sessions["task_1"] = task
+
+    # When
+    result = await adapter._execute_openhands_cli(task, adapter.router.get(SHORT_TASK))
+    artifacts = await adapter.get_task_artifacts("task_1", "1")
+    other_user = await adapter.get_task_artifacts("task_1", "2")
+
+    # Then
+    assert result["success"] is True
+    assert [c["path"] for c in task.changes["added"]] == ["out.txt"]
+    assert [relpath for relpath, _ in artifacts["files"]] == ["out.txt"]
+    assert "error" in other_user
+
+
+@pytest.mark.asyncio
+async def test_overlapping_runs_keep_their_own_changes(fake_cli):
+    """Runs sharing a workspace only report the files they changed themselves."""
+    # Given
+    adapter = make_adapter()
+    first = TaskRecord("task_1", "1", "write first.txt", SHORT_TASK, "fast-model")
+    second = TaskRecord("task_2", "1", "write second.txt", LONG_TASK, "heavy-model")
+    first.timeout_seconds = second.timeout_seconds = 30
+
+    # When
+    await asyncio.gather(
+        adapter._execute_openhands_cli(first, adapter.router.get(SHORT_TASK)),
+        adapter._execute_openhands_cli(second, adapter.router.get(LONG_TASK)),
+        adapter.chat("1", "write chat.txt"),
+    )
+
+    # Then
+    assert [c["path"] for c in first.changes["added"]] == ["first.txt"]
+    assert [c["path"] for c in second.changes["added"]] == ["second.txt"]
+
+
+@pytest.mark.asyncio
+async def test_create_task_sheds_load_when_queue_is_full():
+    """Tasks beyond the queue limit get a friendly rejection."""
+    # Given
+    adapter = make_adapter(
+        admission=AdmissionController(max_queue_length=2, min_free_memory_mb=0)
+    )
+
+    # When
+    first = await adapter.create_task("1", "one")
+    second = await adapter.create_task("1", "two")
+    third = await adapter.create_task("1", "three")
+
+    # Then
+    assert first["queue_position"] == 1
+    assert second["queue_position"] == 2
+    assert third["status"] == "rejected"
+    assert "queue is full" in third["error"]
+    assert adapter.queue_length() == 2
+
+
+@pytest.mark.asyncio
+async def test_batches_are_admitted_as_a_whole():
+    """A batch that does not fit in the queue is rejected without queuing any task."""
+    # Given
+    adapter = make_adapter(
+        admission=AdmissionController(max_queue_length=3, min_free_memory_mb=0)
+    )
+    await adapter.create_task("1", "one")
+
+    # When
+    rejected = await adapter.create_tasks("1", ["two", "three", "four"])
+    accepted = await adapter.create_tasks("1", ["two", "x" * 100])
+
+    # Then
+    assert rejected["status"] == "rejected"
+    assert [task["model"] for task in accepted["tasks"]] == [
+        "fast-model",
+        "heavy-model",
+    ]
+    assert adapter.queue_length() == 3
+
+
+@pytest.mark.asyncio
+async def test_threads_have_isolated_sessions_and_run_in_parallel(fake_cli):
+    """Conversations in different threads do not share context or wait on each other."""
+    # Given
+    adapter = make_adapter(
+        router=ModelRouter(
+            routes=[
+                ModelRoute(CHAT, "cheap-model", "key", 2, 60),
+                ModelRoute(SHORT_TASK, "fast-model", "key", 1, 300),
+                ModelRoute(LONG_TASK, "heavy-model", "key", 1, 1200),
+            ]
+        )
+    )
+    loop = asyncio.get_running_loop()
+
+    # When
+    started = loop.time()
+    await asyncio.gather(
+        adapter.chat("1", "sleep 0.5", thread_id="100"),
+        adapter.chat("1", "sleep 0.5", thread_id="200"),
+    )
+    elapsed = loop.time() - started
+
+    # Then
+    assert elapsed < 0.95
+    assert len(adapter.chat_sessions["thread_100"].context) == 2
+    assert len(adapter.chat_sessions["thread_200"].context) == 2
+    assert await adapter.get_user_tasks("1") == []
+
+
+@pytest.mark.asyncio
+async def test_busy_session_rejects_further_messages(fake_cli):
+    """A session answers one message at a time instead of queueing the rest."""
+    # Given
+    adapter = make_adapter()
+    first = asyncio.create_task(adapter.chat("1", "sleep 0.3"))
+    await asyncio.sleep(0.05)
+
+    # When
+    second = await adapter.chat("1", "hello")
+    other_user = await adapter.chat("2", "hello")
+    await first
+    after = await adapter.chat("1", "hello")
+
+    # Then
+    assert second.startswith("🚦 Still answering your last message")
+    assert other_user == "Done: hello"
+    assert not after.startswith("🚦")
+    assert len(adapter.chat_sessions["chat_1"].context) == 4
+    assert adapter.admission.stats()["rejections"]["chat"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_chat_pool_bounds_waiting_messages(fake_cli):
+    """Chat beyond the chat pool and its waiting room is rejected."""
+    # Given
+    adapter = make_adapter(
+        admission=AdmissionController(max_chat_waiting=1, min_free_memory_mb=0)
+    )
+    running = asyncio.create_task(adapter.chat("1", "sleep 0.3"))
+    await asyncio.sleep(0.05)
+    waiting = asyncio.create_task(adapter.chat("2", "hello"))
+    await asyncio.sleep(0.05)
+
+    # When
+    rejected = await adapter.chat("3", "hello")
+
+    # Then
+    assert rejected.startswith("🚦 OpenHands is busy")
+    assert adapter.admission.active_subprocesses < adapter.admission.max_subprocesses
+    assert await waiting == "Done: hello"
+    await running
+
+
+@pytest.mark.asyncio
+async def test_idle_thread_sessions_are_evicted(fake_cli):
+    """Idle thread sessions are dropped while the main chat session is kept."""
+    # Given
+    adapter = make_adapter()
+    await adapter.chat("1", "hello", thread_id="100")
+    await adapter.chat("1", "hello")
+    now = adapter.chat_sessions["thread_100"].last_active
+
+    # When
+    kept = adapter.evict_idle_sessions(now + 1)
+    evicted = adapter.evict_idle_sessions(now + THREAD_IDLE_TIMEOUT_SECONDS + 1)
+
+    # Then
+    assert kept == 0
+    assert evicted == 1
+    assert list(adapter.chat_sessions) == ["chat_1"]
+
+
+@pytest.mark.asyncio
+async def test_expired_tasks_are_evicted_with_their_files(tmp_path, monkeypatch):
+    """Finished tasks past their retention are dropped and their files deleted."""
+    # Given
+    monkeypatch.setattr("src.adapter.records.RESULT_SPILL_DIR", str(tmp_path))
+    monkeypatch.setattr("src.adapter.records.RESULT_SPILL_MIN_BYTES", 16)
+    adapter = make_adapter()
+    output = "".join(f"{i:x}" for i in range(20000))
+    finished = TaskRecord("task_1", "1", "old", SHORT_TASK, "fast-model")
+    finished.status = "completed"
+    finished.completed_at = 0.0
+    spool = tmp_path / "task_1.stdout.log"
+    spool.write_text(output)
+    finished.result = TaskResult(
+        True, output=output, spool={"stdout": str(spool)}, spill_name="task_1"
+    )
+    pending = TaskRecord("task_2", "1", "new", SHORT_TASK, "fast-model")
+    adapter.active_sessions = {"task_1": finished, "task_2": pending}
+    adapter.batches["batch_1"] = BatchRecord("batch_1", "1", task_ids=["task_1"])
+
+    # When
+    kept = await adapter.evict_expired_tasks(TASK_RETENTION_SECONDS - 1)
+    evicted = await adapter.evict_expired_tasks(TASK_RETENTION_SECONDS)
+
+    # Then
+    assert kept == 0
+    assert evicted == 1
+    assert list(adapter.active_sessions) == ["task_2"]
+    assert adapter.batches == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_build_chat_prompt_keeps_recent_history_within_budget():
+    """Only the most recent turns that fit in the budget are included."""
+    # Given
+    context = deque(
+        [
+            {"role": "user", "content": "old question " * 10},
+            {"role": "assistant", "content": "recent answer"},
+        ]
+    )
+
+    # When
+    prompt = build_chat_prompt(context, "next", max_chars=40)
+
+    # Then
+    assert "recent answer" in prompt
+    assert "old question" not in prompt
+    assert prompt.endswith("user: next")
+    assert build_chat_prompt(deque(), "first") == "first"
+
+
+@pytest.mark.asyncio
+async def test_finished_tasks_notify_listeners(fake_cli):
+    """Task listeners are called once the task finishes."""
+    # Given
+    adapter = make_adapter()
+    finished = asyncio.Queue()
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+
+    # When
+    await adapter.start()
+    try:
+        created = await adapter.create_task("1", "hello", channel_id="42")
+        task = await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await adapter.stop()
+
+    # Then
+    assert task["id"] == created["task_id"]
+    assert task["status"] == "completed"
+    assert task["channel_id"] == "42"
+
+
+@pytest.mark.asyncio
+async def test_task_results_are_built_off_the_event_loop(fake_cli, monkeypatch):
+    """Compressing or spilling a large output does not block the event loop."""
+    # Given
+    adapter = make_adapter()
+    finished = asyncio.Queue()
+    threads = []
+    from_dict = TaskResult.from_dict
+
+    def recording_from_dict(*args):
+        threads.append(threading.current_thread())
+        return from_dict(*args)
+
+    monkeypatch.setattr(TaskResult, "from_dict", recording_from_dict)
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+
+    # When
+    await adapter.start()
+    try:
+        await adapter.create_task("1", "hello")
+        task = await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await adapter.stop()
+
+    # Then
+    assert task["status"] == "completed"
+    assert threads and threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_task_output_is_spooled_to_disk(fake_cli):
+    """The raw streams of a task are kept in spool files, not in the record."""
+    # Given
+    adapter = make_adapter()
+    finished = asyncio.Queue()
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+
+    # When
+    await adapter.start()
+    try:
+        ok = await adapter.create_task("1", "hello")
+        failed = await adapter.create_task("1", "fail")
+        await asyncio.wait_for(finished.get(), timeout=10)
+        await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await adapter.stop()
+    stdout = await adapter.get_task_log(ok["task_id"], "1")
+    stderr = await adapter.get_task_log(failed["task_id"], "1", "stderr")
+    missing = await adapter.get_task_log(ok["task_id"], "1", "stderr")
+
+    # Then
+    assert "INFO starting agent" in stdout["preview"]
+    assert stdout["path"].read_text().endswith('"Done: hello"}\n')
+    assert stderr["preview"] == "something went wrong\n"
+    assert "error" in missing
+    assert "error" in await adapter.get_task_log(ok["task_id"], "2")
+
+
+@pytest.mark.asyncio
+async def test_runs_lease_sandboxes_from_the_pool(fake_cli, tmp_path):
+    """Runs use a pre-started sandbox when a pool is configured."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=1, max_uses=1)
+    adapter = make_adapter(sandbox_pool=pool)
+    await pool.start()
+    task = TaskRecord("task_1", "1", "hello", SHORT_TASK, "fast-model")
+    task.timeout_seconds = 30
+
+    # When
+    result = await adapter._execute_openhands_cli(task, adapter.router.get(SHORT_TASK))
+    await pool.stop()
+
+    # Then
+    assert result["success"] is True
+    assert adapter.metrics()["sandbox_pool"]["hits"] == 1
+    assert adapter.metrics()["sandbox_pool"]["misses"] == 0
+
+
+@pytest.mark.asyncio
+async def test_prepared_sandbox_is_used_by_the_task(fake_cli, tmp_path):
+    """A sandbox leased while the command is parsed is handed to the task."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=1, max_uses=1)
+    adapter = make_adapter(sandbox_pool=pool)
+    await pool.start()
+    finished = asyncio.Queue()
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+
+    # When
+    preparation = adapter.prepare_task("1", "hello")
+    created = await adapter.create_task("1", "hello", preparation=preparation)
+    prepared = adapter.active_sessions[created["task_id"]].runtime
+    await adapter.start()
+    try:
+        task = await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await adapter.stop()
+
+    # Then
+    assert prepared is not None
+    assert task["status"] == "completed"
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["leased"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_task_gives_back_prepared_sandbox(tmp_path):
+    """Speculative resources are released when the task fails validation."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=1, max_uses=5)
+    adapter = make_adapter(
+        sandbox_pool=pool,
+        admission=AdmissionController(max_queue_length=0, min_free_memory_mb=0),
+    )
+    await pool.start()
+
+    # When
+    rejected = await adapter.create_task(
+        "1", "hello", preparation=adapter.prepare_task("1", "hello")
+    )
+    with pytest.raises(ValueError):
+        await adapter.create_task(
+            "1",
+            "hello",
+            model="unknown",
+            preparation=adapter.prepare_task("1", "hello"),
+        )
+
+    # Then
+    assert rejected["status"] == "rejected"
+    assert pool.stats()["leased"] == 0
+    assert pool.stats()["idle"] == 1
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_task_spans_follow_the_task_through_the_queue(fake_cli):
+    """Queue wait, run and subprocess spans of a task share one trace."""
+    # Given
+    exporter = ListExporter()
+    tracer = Tracer(BatchSpanProcessor(exporter), sample_rate=1.0)
+    adapter = make_adapter(tracer=tracer)
+    finished = asyncio.Queue()
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+
+    # When
+    await adapter.start()
+    try:
+        with tracer.span("discord.command") as root:
+            created = await adapter.create_task("1", "hello")
+        await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await adapter.stop()
+    tracer.shutdown()
+
+    # Then
+    spans = {span["name"]: span for span in exporter.spans}
+    assert created["trace_id"] == root.trace_id
+    assert {span["trace_id"] for span in exporter.spans} == {root.trace_id}
+    assert spans["task.queued"]["parent_id"] == root.span_id
+    assert spans["task.run"]["parent_id"] == spans["task.queued"]["span_id"]
+    assert spans["backend.run"]["attributes"]["returncode"] == 0
+    assert "task.notify" in spans
+
+
+@pytest.mark.asyncio
+async def test_drain_finishes_running_tasks_and_resumes_queued_ones(fake_cli, tmp_path):
+    """Running tasks finish during a drain; queued ones resume after a restart."""
+    # Given
+    checkpoint = str(tmp_path / "checkpoint.json")
+    adapter = make_adapter(checkpoint_file=checkpoint)
+    finished = asyncio.Queue()
+
+    async def listener(task):
+        await finished.put(task)
+
+    adapter.add_task_listener(listener)
+    await adapter.start()
+    running = await adapter.create_task("1", "sleep 0.5")
+    await asyncio.sleep(0.2)
+    queued = await adapter.create_task("1", "hello")
+
+    # When
+    status = await adapter.drain(timeout=10)
+    rejected = await adapter.create_task("1", "hello")
+    restarted = make_adapter(checkpoint_file=checkpoint)
+    restarted.add_task_listener(listener)
+    await restarted.start()
+    try:
+        first = await asyncio.wait_for(finished.get(), timeout=10)
+        resumed = await asyncio.wait_for(finished.get(), timeout=10)
+    finally:
+        await restarted.stop()
+
+    # Then
+    assert status == {
+        "state": "drained",
+        "in_flight": 0,
+        "queued": 0,
+        "checkpointed": 1,
+    }
+    assert adapter.active_sessions[queued["task_id"]].status == "checkpointed"
+    assert rejected["status"] == "rejected"
+    assert first["id"] == running["task_id"]
+    assert first["status"] == "completed"
+    assert resumed["id"] == queued["task_id"]
+    assert resumed["status"] == "completed"
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+@pytest.mark.parametrize("content", ["{not json", '{"tasks": 3}', "[]"])
+def test_unreadable_checkpoint_is_kept_aside(tmp_path, content):
+    """A checkpoint that cannot be read is renamed, not deleted."""
+    # Given
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(content)
+    adapter = make_adapter(checkpoint_file=str(checkpoint))
+
+    # When
+    resumed = adapter._resume_checkpoint()
+
+    # Then
+    assert resumed == 0
+    assert not checkpoint.exists()
+    assert (tmp_path / "checkpoint.json.bad").read_text() == content
+
+
+@pytest.mark.asyncio
+async def test_drain_interrupts_tasks_past_the_deadline(fake_cli, tmp_path):
+    """Tasks still running at the deadline are killed and checkpointed."""
+    # Given
+    checkpoint = tmp_path / "checkpoint.json"
+    adapter = make_adapter(checkpoint_file=str(checkpoint))
+    await adapter.start()
+    created = await adapter.create_task("1", "sleep 30")
+    await asyncio.sleep(0.2)
+
+    # When
+    started = asyncio.get_event_loop().time()
+    status = await adapter.drain(timeout=0.5)
+    elapsed = asyncio.get_event_loop().time() - started
+
+    # Then
+    assert elapsed < 5
+    assert status["checkpointed"] == 1
+    assert adapter.active_sessions[created["task_id"]].status == "checkpointed"
+    assert adapter.admission.active_subprocesses == 0
+    assert created["task_id"] in checkpoint.read_text()
+
+
+@pytest.mark.asyncio
+async def test_batch_is_notified_once_when_every_task_finished(fake_cli):
+    """Tasks of a batch share one notification and can be queried together."""
+    # Given
+    adapter = make_adapter()
+    tasks, batches = [], asyncio.Queue()
+
+    async def task_listener(task):
+        tasks.append(task)
+
+    async def batch_listener(batch):
+        await batches.put(batch)
+
+    adapter.add_task_listener(task_listener)
+    adapter.add_batch_listener(batch_listener)
+
+    # When
+    await adapter.start()
+    try:
+        created = await adapter.create_tasks("1", ["hello", "fail", "x" * 30])
+        batch = await asyncio.wait_for(batches.get(), timeout=10)
+    finally:
+        await adapter.stop()
+    statuses = await adapter.get_tasks_status([created["batch_id"], "task_missing"])
+
+    # Then
+    task_ids = [task["task_id"] for task in created["tasks"]]
+    assert tasks == []
+    assert batches.empty()
+    assert batch["id"] == created["batch_id"]
+    assert [task["id"] for task in batch["tasks"]] == task_ids
+    assert [task["status"] for task in batch["tasks"]] == [
+        "completed",
+        "failed",
+        "completed",
+    ]
+    assert [status["id"] for status in statuses] == task_ids + ["task_missing"]
+    assert statuses[-1]["error"] == "Task not found"
+
+
+@pytest.mark.asyncio
+async def test_usage_quota_rejects_new_work(fake_cli):
+    """Runs are accounted to their user and guild, and quotas stop further work."""
+    # Given
+    adapter = make_adapter(
+        usage=UsageTracker(user_quota=UsageQuota(tokens=100), guild_quota=UsageQuota())
+    )
+
+    # When
+    answer = await adapter.chat("1", "usage 150", guild_id="g")
+    rejected_chat = await adapter.chat("1", "hello", guild_id="g")
+    rejected_task = await adapter.create_task("1", "hello", guild_id="g")
+    other_user = await adapter.create_task("2", "hello", guild_id="g")
+
+    # Then
+    assert answer == "Done: usage 150"
+    assert "LLM token quota" in rejected_chat
+    assert rejected_task["status"] == "rejected"
+    assert "LLM token quota" in rejected_task["error"]
+    assert other_user["status"] == "pending"
+    assert adapter.usage.totals(USER, "1")["tokens"] == 150
+    assert adapter.usage.totals(GUILD, "g")["runs"] == 1
+    assert adapter.usage.totals(GUILD, "g")["output_bytes"] > 0
+    assert adapter.active_sessions[other_user["task_id"]].guild_id == "g"
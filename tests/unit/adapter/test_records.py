@@ -0,0 +1,92 @@
+"""Tests for the records module."""
+
+import pytest
+
+from src.adapter.records import SessionRecord, TaskRecord, TaskResult
+from src.config import RESULT_PREVIEW_CHARS
+
+
+def test_short_output_is_kept_in_the_preview():
+    """Outputs that fit in the preview are neither compressed nor spilled."""
+    # Given
+    result = TaskResult(True, output="all done")
+
+    # When
+    summary = result.to_dict()
+
+    # Then
+    assert result.output == "all done"
+    assert summary["output"] == "all done"
+    assert summary["output_truncated"] is False
+
+
+def test_long_output_is_compressed_behind_a_bounded_preview():
+    """Only the preview of a long output stays readable in memory."""
+    # Given
+    output = "line of build output\n" * 5000
+
+    # When
+    result = TaskResult(True, output=output)
+    summary = result.to_dict()
+
+    # Then
+    assert len(summary["output"]) == RESULT_PREVIEW_CHARS
+    assert summary["output_truncated"] is True
+    assert summary["output_size"] == len(output)
+    assert len(result._body or b"") < len(output) // 10
+    assert result.output == output
+
+
+def test_large_output_is_spilled_to_disk(tmp_path, monkeypatch):
+    """Outputs still large after compression are written to the spill directory."""
+    # Given
+    monkeypatch.setattr("src.adapter.records.RESULT_SPILL_DIR", str(tmp_path))
+    monkeypatch.setattr("src.adapter.records.RESULT_SPILL_MIN_BYTES", 16)
+    output = "".join(f"{i:x}" for i in range(20000))
+
+    # When
+    result = TaskResult(False, output=output, error="boom", spill_name="task_1")
+
+    # Then
+    assert result._body is None
+    assert (tmp_path / "task_1.out").exists()
+    assert result.output == output
+    assert result.to_dict()["error"] == "boom"
+    result.discard()
+    assert not (tmp_path / "task_1.out").exists()
+
+
+@pytest.mark.asyncio
+async def test_records_have_no_instance_dict():
+    """Records use slots, so each retained task carries no per-instance dict."""
+    # Given
+    task = TaskRecord("task_1", "1", "fix typo", "short_task", "fast-model")
+    session = SessionRecord("chat_1", "1")
+
+    # When
+    task.result = TaskResult(True, output="done")
+    snapshot = task.to_dict()
+
+    # Then
+    assert not hasattr(task, "__dict__")
+    assert not hasattr(task.result, "__dict__")
+    assert not hasattr(session, "__dict__")
+    assert snapshot["status"] == "pending"
+    assert snapshot["result"]["output"] == "done"
+    assert "changes" not in snapshot
+
+
+@pytest.mark.asyncio
+async def test_task_version_changes_with_the_record():
+    """Every change of a task bumps the version its renderings are cached by."""
+    # Given
+    task = TaskRecord("task_1", "1", "fix typo", "short_task", "fast-model")
+    created = task.to_dict()["version"]
+
+    # When
+    task.status = "running"
+    running = task.to_dict()["version"]
+    task.status = "completed"
+
+    # Then
+    assert created < running < task.to_dict()["version"]
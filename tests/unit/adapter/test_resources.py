@@ -0,0 +1,96 @@
+"""Tests for the resources module."""
+
+import asyncio
+import logging
+import resource
+import sys
+
+import pytest
+
+from src.adapter.backends import SubprocessBackend, create_backend
+from src.adapter.resources import ResourceLimits, ResourceSampler
+from tests.unit.adapter.test_backends import run
+
+
+def test_unlimited_by_default():
+    """Nothing is applied when nothing is limited."""
+    # Given
+    limits = ResourceLimits()
+
+    # When / Then
+    assert limits.rlimits() == []
+    assert limits.is_set() is False
+
+
+@pytest.mark.asyncio
+async def test_limits_apply_to_child_process():
+    """Limits are applied to the child from the parent, after spawn."""
+    # Given
+    limits = ResourceLimits(open_files=64, cpu_seconds=30)
+    before = resource.getrlimit(resource.RLIMIT_NOFILE)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        "import resource; input(); "
+        "print(resource.getrlimit(resource.RLIMIT_NOFILE)[0], "
+        "resource.getrlimit(resource.RLIMIT_CPU)[0])",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+
+    # When
+    limits.apply(process.pid)
+    stdout, _ = await process.communicate(b"\n")
+
+    # Then
+    assert stdout.decode().split() == ["64", "30"]
+    assert resource.getrlimit(resource.RLIMIT_NOFILE) == before
+
+
+@pytest.mark.asyncio
+async def test_subprocess_backend_measures_short_runs(tmp_path):
+    """CPU time of runs shorter than the sample interval is still reported."""
+    # Given
+    backend = SubprocessBackend(
+        "tests.fixtures.fake_openhands_cli", ResourceLimits(open_files=256)
+    )
+
+    # When
+    outcome, _, _ = await run(backend, "spin 0.3", tmp_path)
+
+    # Then
+    assert outcome.returncode == 0
+    assert outcome.resources["cpu_seconds"] >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_sampler_measures_cpu_time():
+    """The sampler reports the CPU time of a busy process."""
+    # Given
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        "import time\nend = time.process_time() + 0.3\n"
+        "while time.process_time() < end: pass\ntime.sleep(0.2)",
+    )
+    sampler = ResourceSampler(process.pid, interval=0.05)
+
+    # When
+    sampler.start()
+    await process.wait()
+    usage = await sampler.stop()
+
+    # Then
+    assert usage["cpu_seconds"] >= 0.2
+    assert usage["wall_seconds"] >= 0.3
+    assert usage["max_rss_mb"] > 0
+
+
+def test_backends_without_process_per_run_warn_about_limits(caplog):
+    """Configured limits that a backend cannot apply are reported."""
+    # When
+    with caplog.at_level(logging.WARNING, logger="OpenHandsDiscordAdapter"):
+        create_backend("thread", ResourceLimits(cpu_seconds=30), thread_enabled=True)
+
+    # Then
+    assert "ignored by the thread backend" in caplog.text
@@ -0,0 +1,53 @@
+"""Tests for the runtime statistics module."""
+
+import pytest
+
+from src.adapter.runtime_stats import RuntimeHistory, percentile
+
+
+def test_percentile():
+    """Test percentile interpolation."""
+    # Given
+    samples = [10, 20, 30, 40, 50]
+
+    # When / Then
+    assert percentile(samples, 50) == 30
+    assert percentile(samples, 100) == 50
+    assert percentile(samples, 90) == pytest.approx(46)
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_timeout_falls_back_until_enough_samples():
+    """The default timeout is used until the history has enough samples."""
+    # Given
+    history = RuntimeHistory(
+        min_samples=3, multiplier=2.0, min_timeout=5, max_timeout=100
+    )
+    history.record("1", "chat", 10)
+    history.record("1", "chat", 10)
+
+    # When / Then
+    assert history.timeout_for("1", "chat", 300) == 300
+    assert history.estimate("1", "chat") is None
+
+    history.record("1", "chat", 10)
+    assert history.timeout_for("1", "chat", 300) == 20
+    assert history.estimate("1", "chat") == 10
+
+
+def test_timeout_is_clamped_and_per_user_history_wins():
+    """Per-user history takes precedence and timeouts stay within bounds."""
+    # Given
+    history = RuntimeHistory(
+        min_samples=2, multiplier=2.0, min_timeout=30, max_timeout=100
+    )
+    for _ in range(2):
+        history.record("fast", "short_task", 1)
+        history.record("slow", "short_task", 80)
+
+    # When / Then
+    assert history.timeout_for("fast", "short_task", 300) == 30
+    assert history.timeout_for("slow", "short_task", 300) == 100
+    # Users without their own history use the per-kind history
+    assert history.estimate("new", "short_task") == pytest.approx(40.5)
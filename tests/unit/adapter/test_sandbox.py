@@ -0,0 +1,139 @@
+"""Tests for the sandbox pool module."""
+
+import asyncio
+
+import pytest
+
+from src.adapter.sandbox import (
+    DockerRuntimeProvider,
+    LocalRuntimeProvider,
+    SandboxPool,
+    create_provider,
+)
+
+
+class SlowDestroyProvider(LocalRuntimeProvider):
+    """A local provider whose runtimes take a while to destroy."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.destroying = asyncio.Event()
+
+    async def destroy(self, runtime):
+        await self.destroying.wait()
+        await super().destroy(runtime)
+
+
+@pytest.mark.asyncio
+async def test_pool_leases_prestarted_runtimes(tmp_path):
+    """Runs lease warm runtimes, which are reset and returned afterwards."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=2, max_uses=5)
+    await pool.start()
+
+    # When
+    async with pool.lease() as runtime:
+        (tmp_path / runtime.id / "leftover.txt").write_text("from the last run")
+        leased = pool.stats()
+    stats = pool.stats()
+
+    # Then
+    assert leased["idle"] == 1
+    assert leased["leased"] == 1
+    assert stats["idle"] == 2
+    assert stats["hits"] == 1
+    assert stats["created"] == 2
+    assert list((tmp_path / runtime.id).iterdir()) == []
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_single_use_runtimes_are_replaced(tmp_path):
+    """Runtimes are destroyed after their last use and replaced in the background."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=1, max_uses=1)
+    await pool.start()
+
+    # When
+    async with pool.lease() as first:
+        pass
+    async with pool.lease() as second:
+        pass
+    await asyncio.sleep(0.1)
+
+    # Then
+    assert first.id != second.id
+    assert not (tmp_path / first.id).exists()
+    assert pool.stats()["destroyed"] == 2
+    assert pool.stats()["idle"] == 1
+    await pool.stop()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_starts_runtimes_on_demand(tmp_path):
+    """Leases beyond the pool size start a cold runtime instead of waiting."""
+    # Given
+    pool = SandboxPool(LocalRuntimeProvider(str(tmp_path)), size=1, max_uses=5)
+    await pool.start()
+
+    # When
+    async with pool.lease(), pool.lease():
+        stats = pool.stats()
+    await asyncio.sleep(0.1)
+
+    # Then
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert pool.stats()["idle"] == 1
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_release_does_not_wait_for_destroy(tmp_path):
+    """Used-up runtimes are destroyed in the background, not by the run's worker."""
+    # Given
+    provider = SlowDestroyProvider(str(tmp_path))
+    pool = SandboxPool(provider, size=1, max_uses=1)
+    await pool.start()
+    runtime = await pool.acquire()
+
+    # When
+    await asyncio.wait_for(pool.release(runtime), timeout=1)
+    pending = (tmp_path / runtime.id).exists()
+    provider.destroying.set()
+    await pool.stop()
+
+    # Then
+    assert pending
+    assert not (tmp_path / runtime.id).exists()
+
+
+@pytest.mark.asyncio
+async def test_docker_provider_only_pulls_the_image(monkeypatch):
+    """Docker sandboxes pull the image once and pass nothing on to the run."""
+    # Given
+    provider = DockerRuntimeProvider()
+    commands = []
+
+    async def docker(*args):
+        commands.append(args)
+        return ""
+
+    monkeypatch.setattr(provider, "_docker", docker)
+
+    # When
+    first = await provider.create("runtime:1")
+    second = await provider.create("runtime:1")
+    await provider.destroy(first)
+
+    # Then
+    assert commands == [("pull", "--quiet", "runtime:1")]
+    assert first.env == {}
+    assert first.id != second.id
+
+
+def test_unknown_provider_is_rejected():
+    """Only the known providers can be configured."""
+    with pytest.raises(ValueError):
+        create_provider("podman")
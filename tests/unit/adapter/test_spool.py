@@ -0,0 +1,108 @@
+"""Tests for the spool module."""
+
+import asyncio
+
+import pytest
+
+from src.adapter.spool import SpoolWriter, read_range
+
+
+@pytest.mark.asyncio
+async def test_writer_spools_everything_and_keeps_a_bounded_tail(tmp_path):
+    """The spool file holds the whole stream while memory holds only the tail."""
+    # Given
+    writer = SpoolWriter(tmp_path / "task.stdout.log", tail_bytes=4)
+
+    # When
+    writer.write(b"hello ")
+    writer.write(b"world")
+    await writer.close()
+
+    # Then
+    assert (tmp_path / "task.stdout.log").read_bytes() == b"hello world"
+    assert writer.tail == "orld"
+    assert writer.size == 11
+    assert writer.truncated is False
+
+
+@pytest.mark.asyncio
+async def test_writer_stops_spooling_at_the_cap(tmp_path):
+    """Output beyond the spool cap is dropped from disk but still counted."""
+    # Given
+    writer = SpoolWriter(tmp_path / "task.stdout.log", tail_bytes=0, max_bytes=5)
+
+    # When
+    writer.write(b"abc")
+    writer.write(b"defgh")
+    await writer.close()
+
+    # Then
+    assert (tmp_path / "task.stdout.log").read_bytes() == b"abcde"
+    assert writer.tail == ""
+    assert writer.truncated is True
+
+
+@pytest.mark.asyncio
+async def test_empty_spool_is_removed(tmp_path):
+    """Streams that produced nothing leave no spool file behind."""
+    # Given
+    writer = SpoolWriter(tmp_path / "task.stderr.log", tail_bytes=10)
+
+    # When
+    await writer.close()
+
+    # Then
+    assert writer.path is None
+    assert not (tmp_path / "task.stderr.log").exists()
+
+
+@pytest.mark.asyncio
+async def test_writer_buffers_output_and_writes_it_off_the_loop(tmp_path):
+    """Small chunks stay in memory; full buffers are written by a worker thread."""
+    # Given
+    path = tmp_path / "task.stdout.log"
+    writer = SpoolWriter(path, tail_bytes=0, buffer_bytes=8)
+
+    # When
+    writer.write(b"abc")
+    buffered = path.exists()
+    writer.write(b"defghij")
+    writer.write(b"klm")
+    await asyncio.sleep(0.1)
+    flushed = path.read_bytes()
+    await writer.close()
+
+    # Then
+    assert buffered is False
+    assert flushed.startswith(b"abcdefghij")
+    assert path.read_bytes() == b"abcdefghijklm"
+
+
+@pytest.mark.asyncio
+async def test_discarded_spool_is_removed(tmp_path):
+    """The spool of a run that failed to finish is deleted on close."""
+    # Given
+    path = tmp_path / "task.stdout.log"
+    writer = SpoolWriter(path, tail_bytes=0, buffer_bytes=1)
+    writer.write(b"partial output")
+    await asyncio.sleep(0.1)
+
+    # When
+    await writer.close(discard=True)
+
+    # Then
+    assert writer.path is None
+    assert not path.exists()
+
+
+def test_read_range_reads_from_either_end(tmp_path):
+    """Ranges can be read from the start or counted back from the end."""
+    # Given
+    path = tmp_path / "log"
+    path.write_bytes(b"0123456789")
+
+    # When / Then
+    assert read_range(path, 2, 3) == b"234"
+    assert read_range(path, -4, 100) == b"6789"
+    assert read_range(path, -100, 2) == b"01"
+    assert read_range(tmp_path / "missing", 0, 10) == b""
@@ -0,0 +1,128 @@
+"""Tests for the usage accounting module."""
+
+import pytest
+
+from src.adapter.usage import GUILD, USER, QuotaExceeded, UsageQuota, UsageTracker
+
+
+class FakeClock:
+    """A clock the test moves by hand."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_tracker(clock, **kwargs):
+    """Create a tracker over four one-hour buckets, without quotas by default."""
+    kwargs.setdefault("user_quota", UsageQuota())
+    kwargs.setdefault("guild_quota", UsageQuota())
+    return UsageTracker(4 * 3600, 3600, clock=clock, **kwargs)
+
+
+def test_usage_is_summed_per_user_and_guild():
+    """Runs count towards their user and, outside DMs, their guild."""
+    # Given
+    tracker = make_tracker(FakeClock())
+
+    # When
+    tracker.record("1", "g", {"runs": 1, "wall_seconds": 10, "tokens": 100})
+    tracker.record("1", None, {"runs": 1, "wall_seconds": 5, "tokens": 50})
+    tracker.record("2", "g", {"runs": 1, "cpu_seconds": 2, "output_bytes": 512})
+
+    # Then
+    assert tracker.totals(USER, "1") == {
+        "runs": 2,
+        "wall_seconds": 15,
+        "cpu_seconds": 0,
+        "output_bytes": 0,
+        "tokens": 150,
+    }
+    assert tracker.totals(GUILD, "g")["runs"] == 2
+    assert tracker.totals(GUILD, "g")["output_bytes"] == 512
+    assert tracker.totals(USER, "3")["runs"] == 0
+
+
+def test_usage_leaves_the_window_a_bucket_at_a_time():
+    """Usage older than the window no longer counts."""
+    # Given
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    tracker.record("1", None, {"runs": 1, "wall_seconds": 10})
+    clock.now += 2 * 3600
+    tracker.record("1", None, {"runs": 1, "wall_seconds": 20})
+
+    # When
+    clock.now += 2 * 3600
+    after_first = tracker.totals(USER, "1")
+    clock.now += 2 * 3600
+    after_both = tracker.totals(USER, "1")
+
+    # Then
+    assert after_first["wall_seconds"] == 20
+    assert after_both["wall_seconds"] == 0
+    assert tracker.report()["users"] == []
+    assert tracker.stats()["users"] == 0
+
+
+def test_quotas_reject_until_usage_expires():
+    """Users and guilds over a quota are rejected until the window moves on."""
+    # Given
+    clock = FakeClock()
+    tracker = make_tracker(
+        clock,
+        user_quota=UsageQuota(tokens=1000),
+        guild_quota=UsageQuota(wall_seconds=60),
+    )
+    tracker.record("1", "g", {"runs": 1, "wall_seconds": 30, "tokens": 1000})
+    tracker.record("2", "g", {"runs": 1, "wall_seconds": 30})
+
+    # When / Then
+    with pytest.raises(QuotaExceeded, match="LLM token quota"):
+        tracker.check("1")
+    with pytest.raises(QuotaExceeded, match="This server"):
+        tracker.check("2", "g")
+    tracker.check("2")
+    tracker.check("3", "other")
+    assert tracker.stats()["rejections"] == {USER: 1, GUILD: 1}
+
+    clock.now += 4 * 3600
+    tracker.check("1", "g")
+
+
+def test_report_ranks_subjects_by_wall_time():
+    """The report lists the heaviest users first."""
+    # Given
+    tracker = make_tracker(FakeClock())
+    for user, seconds in [("1", 5), ("2", 50), ("3", 20)]:
+        tracker.record(user, "g", {"runs": 1, "wall_seconds": seconds})
+
+    # When
+    report = tracker.report(limit=2)
+
+    # Then
+    assert [user for user, _ in report["users"]] == ["2", "3"]
+    assert report["guilds"][0] == ("g", tracker.totals(GUILD, "g"))
+    assert report["window_seconds"] == 4 * 3600
+
+
+def test_prune_forgets_subjects_without_usage_in_the_window():
+    """Users and guilds that stopped using the bot are dropped without a report."""
+    # Given
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    tracker.record("1", "g", {"runs": 1})
+    clock.now += 3 * 3600
+    tracker.record("2", None, {"runs": 1})
+
+    # When
+    clock.now += 2 * 3600
+    forgotten = tracker.prune()
+
+    # Then
+    assert forgotten == 2
+    assert list(tracker.windows) == [(USER, "2")]
+    assert tracker.stats()["users"] == 1
+    assert tracker.stats()["guilds"] == 0
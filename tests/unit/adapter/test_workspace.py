@@ -0,0 +1,67 @@
+"""Tests for the workspace module."""
+
+import os
+
+from src.adapter.workspace import WorkspaceIndex
+
+
+def test_refresh_reports_changes_since_baseline(tmp_path):
+    """Added, modified and deleted files are reported after a run."""
+    # Given
+    (tmp_path / "keep.txt").write_text("keep")
+    (tmp_path / "edit.txt").write_text("before")
+    (tmp_path / "gone.txt").write_text("gone")
+    (tmp_path / ".git").mkdir()
+    index = WorkspaceIndex(tmp_path, ignore=[".git"])
+    baseline = index.refresh(hash_changes=False)
+
+    # When
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.txt").write_text("new")
+    (tmp_path / "edit.txt").write_text("after!")
+    (tmp_path / "gone.txt").unlink()
+    (tmp_path / ".git" / "HEAD").write_text("ignored")
+    changes = index.refresh()
+
+    # Then
+    assert baseline["total"] == 0
+    assert [c["path"] for c in changes["added"]] == ["sub/new.txt"]
+    assert [c["path"] for c in changes["modified"]] == ["edit.txt"]
+    assert changes["deleted"] == ["gone.txt"]
+    assert changes["total"] == 3
+
+
+def test_touched_file_with_same_content_is_not_modified(tmp_path):
+    """Files whose stat changed but content did not are not reported."""
+    # Given
+    path = tmp_path / "same.txt"
+    path.write_text("same")
+    index = WorkspaceIndex(tmp_path)
+    index.refresh(hash_changes=False)
+    (tmp_path / "other.txt").write_text("x")
+    index.refresh()  # hashes other.txt only
+    path.write_text("changed")
+    index.refresh()  # same.txt is now hashed
+
+    # When
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    changes = index.refresh()
+
+    # Then
+    assert changes["total"] == 0
+
+
+def test_resolve_stays_inside_workspace(tmp_path):
+    """Manifest paths cannot escape the workspace."""
+    # Given
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "a.txt").write_text("a")
+    (tmp_path / "secret.txt").write_text("secret")
+    index = WorkspaceIndex(workspace)
+
+    # When / Then
+    assert index.resolve("a.txt") == (workspace / "a.txt").resolve()
+    assert index.resolve("../secret.txt") is None
+    assert index.resolve("missing.txt") is None
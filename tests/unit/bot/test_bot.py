@@ -0,0 +1,183 @@
+"""Tests for the Discord bot."""
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.adapter.openhands_adapter import OpenHandsAdapter
+from src.bot import health
+from src.bot.bot import OpenHandsCommands, RateLimited, create_bot
+from src.bot.health import HealthServer
+from src.config import Config, validate_config
+
+
+def make_bot(tmp_path, name="bot"):
+    """Build a bot with its own adapter and a free health check port."""
+    config = Config()
+    adapter = OpenHandsAdapter(checkpoint_file=str(tmp_path / f"{name}.json"))
+    return create_bot(config, adapter, HealthServer(0, host="127.0.0.1"))
+
+
+def get(port, path):
+    """Request a path from a health check server."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_bots_do_not_share_state(tmp_path):
+    """Every bot gets the dependencies it was built with."""
+    # When
+    first = make_bot(tmp_path, "first")
+    second = make_bot(tmp_path, "second")
+
+    # Then
+    assert first.adapter is not second.adapter
+    assert first.rate_limiter is not second.rate_limiter
+    assert first.health_server is not second.health_server
+    assert first.notify_task_done in first.adapter.task_listeners
+    assert first.notify_task_done not in second.adapter.task_listeners
+
+
+def test_default_adapter_and_limits_follow_the_config(tmp_path):
+    """Bots built from different configs keep their files and limits apart."""
+    # Given
+    configs = []
+    for name in ("first", "second"):
+        config = Config()
+        config.openhands_workdir = str(tmp_path / name / "workspace")
+        config.checkpoint_file = str(tmp_path / name / "checkpoint.json")
+        config.spool_dir = str(tmp_path / name / "spool")
+        config.result_spill_dir = str(tmp_path / name / "results")
+        configs.append(config)
+    configs[1].rate_limit_user_burst = 1
+
+    # When
+    first, second = (
+        create_bot(config, health_server=HealthServer(0)) for config in configs
+    )
+
+    # Then
+    assert first.adapter.workdir == tmp_path / "first" / "workspace"
+    assert second.adapter.workdir == tmp_path / "second" / "workspace"
+    assert second.adapter.checkpoint_file == str(
+        tmp_path / "second" / "checkpoint.json"
+    )
+    assert second.adapter.spool_dir == tmp_path / "second" / "spool"
+    assert second.adapter.spill_dir == str(tmp_path / "second" / "results")
+    assert first.rate_limiter.limiters["user"].burst == configs[0].rate_limit_user_burst
+    assert second.rate_limiter.limiters["user"].burst == 1
+
+
+def test_validate_config_reports_missing_credentials():
+    """Credentials are checked when asked for, not when the config is imported."""
+    # Given
+    config = Config()
+    config.discord_token = None
+    config.llm_api_key = ""
+
+    # When / Then
+    with pytest.raises(ValueError, match="DISCORD_TOKEN, LLM_API_KEY"):
+        validate_config(config)
+
+
+@pytest.mark.asyncio
+async def test_health_server_reports_draining(tmp_path):
+    """Health checks answer from the bot that started the server."""
+    # Given
+    bot = make_bot(tmp_path)
+    server = HealthServer(0, host="127.0.0.1")
+    server.start(bot.health_status, bot.collect_metrics)
+
+    try:
+        # When
+        healthy = await asyncio.to_thread(get, server.port, "/health")
+        metrics = await asyncio.to_thread(get, server.port, "/metrics")
+        await bot.adapter.drain(0)
+        drained = await asyncio.to_thread(get, server.port, "/health")
+        missing = await asyncio.to_thread(get, server.port, "/missing")
+    finally:
+        server.stop()
+
+    # Then
+    assert server.port != 0
+    assert healthy[0] == 200
+    assert healthy[1]["status"] == "ok"
+    assert healthy[1]["discord_connected"] is False
+    assert metrics[0] == 200
+    assert "render_cache" in metrics[1]
+    assert drained[0] == 503
+    assert drained[1]["status"] == "drained"
+    assert missing[0] == 404
+
+
+def test_health_server_listens_on_loopback_by_default(tmp_path):
+    """Unauthenticated metrics are not exposed beyond the host unless configured."""
+    # Given
+    config = Config()
+    adapter = OpenHandsAdapter(checkpoint_file=str(tmp_path / "bot.json"))
+
+    # When
+    bot = create_bot(config, adapter)
+
+    # Then
+    assert config.health_check_host == "127.0.0.1"
+    assert bot.health_server.host == "127.0.0.1"
+    assert HealthServer().host == "127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_health_server_reports_a_blocked_event_loop(tmp_path, monkeypatch):
+    """Probes run on the event loop, so a blocked loop is reported, not bypassed."""
+    # Given
+    monkeypatch.setattr(health, "PROBE_TIMEOUT_SECONDS", 0.1)
+    bot = make_bot(tmp_path)
+    server = HealthServer(0, host="127.0.0.1")
+    server.start(bot.health_status, bot.collect_metrics)
+
+    try:
+        # When
+        blocked = get(server.port, "/metrics")
+    finally:
+        server.stop()
+
+    # Then
+    assert blocked == (503, {"status": "unresponsive"})
+
+
+@pytest.mark.asyncio
+async def test_commands_use_the_injected_adapter(tmp_path, mock_discord_context):
+    """Commands can be invoked without connecting to Discord."""
+    # Given
+    bot = make_bot(tmp_path)
+    bot.adapter.get_task_status = AsyncMock(
+        return_value={"task_id": "abc", "status": "completed", "description": "x"}
+    )
+    mock_discord_context.send = AsyncMock(return_value=AsyncMock())
+    cog = OpenHandsCommands(bot)
+
+    # When
+    await cog.check_status.callback(cog, mock_discord_context, "abc")
+
+    # Then
+    bot.adapter.get_task_status.assert_awaited_once_with("abc")
+    assert mock_discord_context.send.await_args.kwargs["embed"].title
+
+
+@pytest.mark.asyncio
+async def test_prefix_commands_are_rate_limited(tmp_path, mock_discord_context):
+    """The bot check rejects commands over the rate limit."""
+    # Given
+    bot = make_bot(tmp_path)
+    bot.config.rate_limit_enabled = True
+    bot.rate_limiter.check = MagicMock(return_value=12.0)
+
+    # When / Then
+    with pytest.raises(RateLimited):
+        await bot.bot_check(mock_discord_context)
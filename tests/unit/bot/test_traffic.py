@@ -0,0 +1,168 @@
+"""Tests for recording and replaying Discord traffic."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.bot.replay import ReplayDiscord, replay
+from src.bot.traffic import FLUSH_BYTES, TrafficEvent, TrafficRecorder, read_traffic
+from src.config import Config
+from tests.unit.bot.test_bot import make_bot
+
+
+class FakeClock:
+    """A clock the test moves by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_recording_is_anonymised_and_compact(tmp_path):
+    """Only arrival times, kinds and sizes are stored, with hashed IDs."""
+    # Given
+    path = tmp_path / "traffic.bin"
+    clock = FakeClock()
+    recorder = TrafficRecorder(str(path), clock=clock)
+
+    # When
+    recorder.record("chat", "123456789", "42", size=11)
+    clock.now += 1.5
+    recorder.record("batch", "123456789", "42", size=30, count=3)
+    clock.now += 0.25
+    recorder.record("mystery", "987654321", None)
+    await recorder.close()
+    # A restart appends a new segment
+    restart = TrafficRecorder(str(path))
+    restart.record("task", "123456789", "42", size=7)
+    await restart.close()
+    events = read_traffic(str(path))
+    restarted = [event for event in events if event.kind == "task"]
+    events = [event for event in events if event.kind != "task"]
+
+    # Then
+    assert [event.kind for event in events] == ["chat", "batch", "other"]
+    assert [event.offset for event in events] == [0.0, 1.5, 1.75]
+    assert restarted[0].size == 7
+    assert events[1].size == 30 and events[1].count == 3
+    assert events[0].user == events[1].user != events[2].user
+    assert events[2].conversation == 0
+    assert b"123456789" not in path.read_bytes()
+    assert path.stat().st_size == 6 * 19
+    assert recorder.stats()["events"] == 3
+
+
+def test_non_recordings_are_rejected(tmp_path):
+    """Files without a segment header are not read as recordings."""
+    # Given
+    path = tmp_path / "traffic.bin"
+    path.write_bytes(b"x" * 40)
+
+    # When / Then
+    with pytest.raises(ValueError):
+        read_traffic(str(path))
+
+
+@pytest.mark.asyncio
+async def test_bot_records_chat_messages(tmp_path):
+    """Chat messages are recorded by size when the bot has a recorder."""
+    # Given
+    bot = make_bot(tmp_path)
+    bot.recorder = TrafficRecorder(str(tmp_path / "traffic.bin"))
+    bot.adapter.chat = MagicMock(side_effect=RuntimeError("offline"))
+    discord_mocks = ReplayDiscord(bot.config.openhands_chat_channel)
+    event = TrafficEvent(0.0, "chat", 7, 8, 5)
+
+    # When
+    await bot.on_message(discord_mocks.message(event, "hello"))
+    await bot.recorder.flush()
+
+    # Then
+    [recorded] = read_traffic(str(tmp_path / "traffic.bin"))
+    assert recorded.kind == "chat"
+    assert recorded.size == 5
+    assert bot.collect_metrics()["traffic"]["events"] == 1
+
+
+@pytest.mark.asyncio
+async def test_recorder_buffers_events_and_writes_them_in_order(tmp_path):
+    """Events are written in batches off the loop, through one open handle."""
+    # Given
+    path = tmp_path / "traffic.bin"
+    clock = FakeClock()
+    recorder = TrafficRecorder(str(path), clock=clock)
+
+    # When
+    recorder.record("chat", "1", "1")
+    buffered = path.exists()
+    for i in range(FLUSH_BYTES // 19 + 1):
+        recorder.record("task", "1", "1", size=i)
+    await asyncio.sleep(0.1)
+    flushed = path.stat().st_size
+    recorder.record("status", "1", "1")
+    await recorder.close()
+
+    # Then
+    events = read_traffic(str(path))
+    assert buffered is False
+    assert flushed > 0
+    assert [event.size for event in events if event.kind == "task"] == list(
+        range(FLUSH_BYTES // 19 + 1)
+    )
+    assert events[-1].kind == "status"
+
+
+@pytest.mark.asyncio
+async def test_replay_stays_out_of_the_deployment_paths(tmp_path, monkeypatch):
+    """Replays work in a temporary directory and never record traffic."""
+    # Given
+    workdir = tmp_path / "deployment"
+    monkeypatch.setattr("src.adapter.openhands_adapter.OPENHANDS_WORKDIR", workdir)
+    monkeypatch.setattr(
+        "src.adapter.openhands_adapter.SPOOL_DIR", str(workdir / ".spool")
+    )
+    config = Config()
+    config.rate_limit_enabled = False
+    config.traffic_record_file = str(tmp_path / "traffic.bin")
+    events = [TrafficEvent(0.0, "task", 1, 1, 10), TrafficEvent(0.0, "chat", 2, 2, 5)]
+
+    # When
+    [report] = await replay(
+        events, [1], [1.0], base_seconds=0.01, seconds_per_kchar=0, config=config
+    )
+
+    # Then
+    assert report["tasks"]["finished"] == 1
+    assert report["chat"]["messages"] == 1
+    assert not workdir.exists()
+    assert not (tmp_path / "traffic.bin").exists()
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_queueing_per_concurrency():
+    """More concurrent tasks shorten the queue wait of the same traffic."""
+    # Given
+    config = Config()
+    config.rate_limit_enabled = False
+    events = [TrafficEvent(i * 0.01, "task", i % 3 + 1, 1, 10) for i in range(6)]
+    events.append(TrafficEvent(0.05, "batch", 4, 2, 20, count=2))
+    events.append(TrafficEvent(0.06, "chat", 5, 3, 10))
+    events.append(TrafficEvent(0.07, "help", 5, 3, 0))
+
+    # When
+    serial, parallel = await replay(
+        events, [1, 8], [2.0], base_seconds=0.05, seconds_per_kchar=0, config=config
+    )
+
+    # Then
+    for report in (serial, parallel):
+        assert report["tasks"]["submitted"] == 8
+        assert report["tasks"]["finished"] == 8
+        assert report["chat"]["messages"] == 1
+        assert report["skipped"] == 1
+    assert serial["max_queue_length"] > parallel["max_queue_length"]
+    assert serial["tasks"]["queue_wait"]["max"] > parallel["tasks"]["queue_wait"]["max"]
@@ -2,7 +2,15 @@
 
 import discord
 
-from src.utils.formatter import format_help, format_status, format_tasks_list
+from src.utils.formatter import (
+    RenderCache,
+    format_batch_status,
+    format_help,
+    format_log,
+    format_status,
+    format_tasks_list,
+    format_usage,
+)
 
 
 def test_format_help():
@@ -86,3 +94,151 @@ def test_format_tasks_list():
     assert "test-456" in result.description
     assert "completed" in result.description
     assert "in_progress" in result.description
+
+
+def test_format_status_eta():
+    """Test that unfinished tasks show their ETA."""
+    # Given
+    status = {
+        "id": "task_1",
+        "status": "running",
+        "description": "Test task",
+        "eta_seconds": 125,
+    }
+
+    # When
+    result = format_status(status)
+
+    # Then
+    assert "ETA: ~2m 5s" in result.description
+
+
+def test_format_log_shows_tail():
+    """Test that logs larger than the preview are shown as a tail."""
+    # Given
+    log = {
+        "task_id": "task_1",
+        "stream": "stdout",
+        "size": 5000,
+        "preview": "last lines",
+    }
+
+    # When
+    result = format_log(log)
+
+    # Then
+    assert "5000 bytes" in result.description
+    assert result.fields[0].name == "Tail"
+    assert "last lines" in result.fields[0].value
+
+
+def test_format_batch_status_aggregates_tasks():
+    """Test that the status of several tasks is summarized in one embed."""
+    # Given
+    statuses = [
+        {"id": "task_1", "status": "completed", "description": "one"},
+        {"id": "task_2", "status": "running", "description": "two", "eta_seconds": 30},
+        {
+            "id": "task_3",
+            "status": "failed",
+            "description": "three",
+            "result": {"success": False, "error": "boom"},
+        },
+        {"id": "task_4", "error": "Task not found"},
+    ]
+
+    # When
+    result = format_batch_status(statuses)
+
+    # Then
+    assert result.title == "Batch Status"
+    assert "Total: 4 tasks" in result.description
+    assert "1 completed" in result.description
+    assert "1 not found" in result.description
+    assert [field.name for field in result.fields] == [
+        "✅ task_1",
+        "🔄 task_2",
+        "❌ task_3",
+        "❓ task_4",
+    ]
+    assert "ETA: ~30s" in result.fields[1].value
+    assert "boom" in result.fields[2].value
+    assert result.color == discord.Color.red()
+
+
+def test_format_status_caches_finished_tasks():
+    """Test that finished tasks are rendered once per version."""
+    # Given
+    cache = RenderCache()
+    status = {"id": "task_1", "status": "completed", "description": "x", "version": 3}
+    running = {"id": "task_2", "status": "running", "description": "y", "version": 3}
+
+    # When
+    first = format_status(status, cache)
+    second = format_status(dict(status), cache)
+    changed = format_status(dict(status, version=4, status="failed"), cache)
+
+    # Then
+    assert second is first
+    assert changed is not first
+    assert "failed" in changed.description
+    assert format_status(running, cache) is not format_status(running, cache)
+    assert format_status(status) is not format_status(status)
+
+
+def test_render_cache_clear_resets_metrics():
+    """Test that a cleared cache starts counting from zero."""
+    # Given
+    cache = RenderCache()
+    status = {"id": "task_1", "status": "completed", "description": "x", "version": 1}
+    format_status(status, cache)
+    format_status(status, cache)
+
+    # When
+    cache.clear()
+
+    # Then
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 0}
+
+
+def test_format_tasks_list_fits_hundreds_of_tasks():
+    """Test that the summary of many tasks stays within Discord's limit."""
+    # Given
+    tasks = [
+        {"id": f"task_{i:04d}", "status": "completed", "created_at": i}
+        for i in range(500)
+    ]
+
+    # When
+    result = format_tasks_list(tasks)
+
+    # Then
+    assert len(result.description) <= 4096
+    assert "more" in result.description
+    assert result.fields[0].name == "Task: task_0499"
+    assert len(result.fields) == 11
+
+
+def test_format_usage():
+    """Test that the usage report lists users and servers."""
+    # Given
+    usage = {
+        "runs": 3,
+        "wall_seconds": 200,
+        "cpu_seconds": 12.5,
+        "output_bytes": 4096,
+        "tokens": 1500,
+    }
+    report = {"window_seconds": 86400, "users": [("42", usage)], "guilds": []}
+
+    # When
+    result = format_usage(report)
+    empty = format_usage({"window_seconds": 86400, "users": [], "guilds": []})
+
+    # Then
+    assert isinstance(result, discord.Embed)
+    assert [field.name for field in result.fields] == ["Users"]
+    assert result.fields[0].value == (
+        "<@42>: 3 runs · Wall 3m 20s · CPU 12.5s · 4 KB · 1500 tokens"
+    )
+    assert empty.fields[0].value == "No usage in this window"
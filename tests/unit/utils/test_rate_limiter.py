@@ -0,0 +1,69 @@
+"""Tests for the rate limiter module."""
+
+from src.utils.rate_limiter import RateLimiter, TokenBucketLimiter
+
+
+class FakeClock:
+    """A manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_burst_and_refill():
+    """A bucket allows a burst and then refills at the configured rate."""
+    # Given
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=2, clock=clock)
+
+    # When / Then
+    for _ in range(2):
+        assert limiter.retry_after("u", 1, clock.now) == 0
+        limiter.consume("u", 1, clock.now)
+    assert limiter.retry_after("u", 1, clock.now) == 1.0
+    clock.now = 1.0
+    assert limiter.retry_after("u", 1, clock.now) == 0
+
+
+def test_rejection_does_not_consume_other_scopes():
+    """A request rejected by one scope leaves the other buckets untouched."""
+    # Given
+    clock = FakeClock()
+    limiter = RateLimiter(user=(60, 5), channel=(60, 5), guild=(60, 1), clock=clock)
+
+    # When
+    first = limiter.check("u1", "c1", "g1")
+    second = limiter.check("u2", "c1", "g1")
+    dm = limiter.check("u2", "dm", None)
+
+    # Then
+    assert first == 0
+    assert second > 0
+    assert dm == 0
+    stats = limiter.stats()
+    assert stats["allowed"] == 2
+    assert stats["rejected"]["guild"] == 1
+    # u2 still has its full burst because the rejected request took nothing
+    assert limiter.limiters["user"].retry_after("u2", 4, clock.now) == 0
+
+
+def test_compaction_drops_idle_keys():
+    """Keys whose buckets have refilled are removed periodically."""
+    # Given
+    clock = FakeClock()
+    limiter = RateLimiter(
+        user=(60, 2), channel=(60, 2), guild=(60, 2), compact_interval=10, clock=clock
+    )
+    limiter.check("u1", "c1", "g1")
+
+    # When
+    clock.now = 1.0
+    limiter.check("u2", "c2", "g2")
+    clock.now = 20.0
+    limiter.check("u3", None, None)
+
+    # Then
+    assert limiter.stats()["tracked_keys"] == {"user": 1, "channel": 0, "guild": 0}
@@ -0,0 +1,114 @@
+"""Tests for the tracing module."""
+
+import json
+
+import pytest
+
+from src.utils.tracing import (
+    BatchSpanProcessor,
+    JsonLinesExporter,
+    OtlpHttpExporter,
+    SpanExporter,
+    Tracer,
+    current_span,
+)
+
+
+class ListExporter(SpanExporter):
+    """Keep exported spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def test_child_spans_share_the_trace_of_their_parent():
+    """Nested spans form one trace and restore the current span on exit."""
+    # Given
+    exporter = ListExporter()
+    tracer = Tracer(BatchSpanProcessor(exporter), sample_rate=1.0)
+
+    # When
+    with tracer.span("discord.message") as root:
+        with tracer.span("adapter.chat", route="chat") as child:
+            inner = current_span()
+    outer = current_span()
+    tracer.shutdown()
+
+    # Then
+    assert inner is child
+    assert outer is None
+    assert child.trace_id == root.trace_id
+    spans = {span["name"]: span for span in exporter.spans}
+    assert spans["adapter.chat"]["parent_id"] == root.span_id
+    assert spans["adapter.chat"]["attributes"] == {"route": "chat"}
+    assert spans["discord.message"]["parent_id"] is None
+
+
+def test_unsampled_traces_are_not_exported():
+    """Spans of traces that lose the sampling draw are never recorded."""
+    # Given
+    exporter = ListExporter()
+    tracer = Tracer(BatchSpanProcessor(exporter), sample_rate=0.0)
+
+    # When
+    with tracer.span("discord.message") as root:
+        with tracer.span("adapter.chat") as child:
+            child.set("ignored", True)
+    tracer.shutdown()
+
+    # Then
+    assert root.trace_id
+    assert child.sampled is False
+    assert child.traceparent.endswith("-00")
+    assert exporter.spans == []
+
+
+def test_failed_spans_are_marked_and_written_as_json_lines(tmp_path):
+    """Exceptions mark the span as failed before they propagate."""
+    # Given
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(BatchSpanProcessor(JsonLinesExporter(str(path))), sample_rate=1.0)
+
+    # When
+    with pytest.raises(RuntimeError):
+        with tracer.span("subprocess.run"):
+            raise RuntimeError("boom")
+    tracer.shutdown()
+
+    # Then
+    [span] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert span["name"] == "subprocess.run"
+    assert span["status"] == "error"
+    assert span["attributes"]["error"] == "RuntimeError: boom"
+    assert span["duration_ms"] >= 0
+
+
+def test_otlp_payload_groups_spans_by_service():
+    """Span records are encoded as an OTLP/JSON export request."""
+    # Given
+    span = {
+        "service": "bot",
+        "trace_id": "a" * 32,
+        "span_id": "b" * 16,
+        "parent_id": None,
+        "name": "task.run",
+        "start_ns": 1,
+        "end_ns": 2,
+        "status": "ok",
+        "attributes": {"route": "short_task", "success": True, "pid": 7},
+    }
+
+    # When
+    payload = OtlpHttpExporter("http://collector").encode([span])
+
+    # Then
+    [resource] = payload["resourceSpans"]
+    [otlp_span] = resource["scopeSpans"][0]["spans"]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "bot"}
+    assert otlp_span["traceId"] == "a" * 32
+    assert "parentSpanId" not in otlp_span
+    assert {"key": "pid", "value": {"intValue": "7"}} in otlp_span["attributes"]
+    assert {"key": "success", "value": {"boolValue": True}} in otlp_span["attributes"]